@@ -8,6 +8,11 @@ const corsHeaders = {
   'Access-Control-Max-Age': '86400'
 }
 
+// The bot's gateway only answers /api/* with its ACTIVITY_GATEWAY_API_KEY
+const botHeaders = process.env.ACTIVITY_GATEWAY_API_KEY
+  ? { Authorization: `Bearer ${process.env.ACTIVITY_GATEWAY_API_KEY}` }
+  : {}
+
 export default async function handler(req, res) {
   // Set CORS headers
   Object.keys(corsHeaders).forEach(key => {
@@ -50,7 +55,7 @@ export default async function handler(req, res) {
         try {
           const botResponse = await fetch('http://localhost:8000/api/music/command', {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
+            headers: { 'Content-Type': 'application/json', ...botHeaders },
             body: JSON.stringify({
               action: 'play',
               query,
@@ -100,7 +105,7 @@ export default async function handler(req, res) {
         try {
           const botResponse = await fetch('http://localhost:8000/api/music/command', {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
+            headers: { 'Content-Type': 'application/json', ...botHeaders },
             body: JSON.stringify({
               action: 'stop',
               user_id: userId,
@@ -138,6 +143,7 @@ export default async function handler(req, res) {
         
         try {
           const botResponse = await fetch(`http://localhost:8000/api/music/status?guild_id=${guildId}`, {
+            headers: botHeaders,
             timeout: 5000
           })
           
@@ -14,30 +14,35 @@ import yt_dlp
 import os
 import logging
 
+from core.activity_gateway import ActivityGateway
+
 class ActivityMusicAPIServer:
     def __init__(self, bot, port=8000):
         self.bot = bot
         self.port = port
-        self.app = None
-        self.runner = None
-        self.site = None
+        self.gateway = None
+        self.owns_gateway = False
         self.logger = logging.getLogger('ActivityAPI')
         
         # Guild and channel config
         self.GUILD_ID = 1362815996557263049
         self.DEFAULT_VOICE_CHANNEL_ID = 1362815996557263052  # General voice channel
         
+    def attach(self, gateway: ActivityGateway):
+        """Serve the API routes from the shared Activity gateway (call before it starts)"""
+        self.gateway = gateway
+        self.port = gateway.port
+        self.setup_routes(gateway.app.router)
+
     async def start_server(self):
         """Start the HTTP server for Activity API"""
         try:
-            self.app = web.Application()
-            self.setup_routes()
-            
-            self.runner = web.AppRunner(self.app)
-            await self.runner.setup()
-            
-            self.site = web.TCPSite(self.runner, 'localhost', self.port)
-            await self.site.start()
+            if self.gateway is None:
+                # Standalone: run a gateway of our own
+                self.attach(ActivityGateway(host='localhost', port=self.port, extra_ports=()))
+                self.owns_gateway = True
+            if self.owns_gateway:
+                await self.gateway.start()
             
             self.bot.add_log(f"🎵 Activity Music API Server started on http://localhost:{self.port}")
             print(f"🎵 Activity Music API Server started on http://localhost:{self.port}")
@@ -46,37 +51,13 @@ class ActivityMusicAPIServer:
             self.bot.add_error(f"Failed to start Activity API server: {e}")
             print(f"❌ Failed to start Activity API server: {e}")
 
-    def setup_routes(self):
-        """Setup API routes"""
-        # CORS middleware
-        async def cors_handler(request, handler):
-            response = await handler(request)
-            response.headers['Access-Control-Allow-Origin'] = '*'
-            response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
-            response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
-            return response
-
-        # Add routes
-        self.app.router.add_post('/api/music/command', self.handle_music_command)
-        self.app.router.add_get('/api/music/status/{guild_id}', self.handle_get_status)
-        self.app.router.add_post('/api/lavalink/play', self.handle_lavalink_play)
-        self.app.router.add_get('/api/discord/user/{user_id}/voice', self.handle_get_user_voice)
-        self.app.router.add_get('/health', self.handle_health)
-        
-        # OPTIONS handler for CORS
-        async def options_handler(request):
-            return web.Response(
-                headers={
-                    'Access-Control-Allow-Origin': '*',
-                    'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
-                    'Access-Control-Allow-Headers': 'Content-Type, Authorization'
-                }
-            )
-        
-        self.app.router.add_options('/{path:.*}', options_handler)
-        
-        # Add CORS middleware
-        self.app.middlewares.append(cors_handler)
+    def setup_routes(self, router: web.UrlDispatcher):
+        """Setup API routes (CORS and OPTIONS are handled by the gateway)"""
+        router.add_post('/api/music/command', self.handle_music_command)
+        router.add_get('/api/music/status/{guild_id}', self.handle_get_status)
+        router.add_post('/api/lavalink/play', self.handle_lavalink_play)
+        router.add_get('/api/discord/user/{user_id}/voice', self.handle_get_user_voice)
+        router.add_get('/health', self.handle_health)
 
     async def handle_music_command(self, request):
         """Handle music commands from Discord Activity"""
@@ -110,11 +91,11 @@ class ActivityMusicAPIServer:
                 }, status=400)
                 
         except Exception as e:
-            self.bot.add_error(f"Activity API command error: {e}")
+            # The traceback goes to the bot's log, not to the caller
+            self.bot.add_error(f"Activity API command error: {e}\n{traceback.format_exc()}")
             return web.json_response({
                 'success': False,
-                'error': str(e),
-                'trace': traceback.format_exc()
+                'error': str(e)
             }, status=500)
 
     async def handle_play_command(self, query, user_id, guild_id, voice_channel_id=None):
@@ -423,8 +404,6 @@ class ActivityMusicAPIServer:
 
     async def stop_server(self):
         """Stop the HTTP server"""
-        if self.site:
-            await self.site.stop()
-        if self.runner:
-            await self.runner.cleanup()
+        if self.gateway and self.owns_gateway:
+            await self.gateway.stop()
         self.bot.add_log("🛑 Activity Music API Server stopped")
\ No newline at end of file
@@ -2,7 +2,6 @@
 
 import os
 import asyncio
-import re
 try:
     import aiosqlite
 except ImportError:
@@ -51,11 +50,21 @@ console = Console(force_terminal=True, legacy_windows=False, width=120)
 # Import new systems
 from core.websocket_integration import setup_websocket_integration
 from core.production_optimizer import setup_production_optimizer
+from core.database_manager import OpureDatabase
+from core.write_batcher import WriteBatcher
 
 # New Hub System, AI Engine, and Real-Time Sync
 from core.command_hub_system import NewAIEngine, initialize_hub_manager
 from core.realtime_sync_system import initialize_sync_manager
 from core.sync_integration import SyncIntegrationLayer
+from core.playlist_store import PlaylistStore
+from core.activity_gateway import ActivityGateway
+from api_server import ActivityMusicAPIServer
+try:
+    from websocket_server import DashboardWebSocketServer
+except ImportError as e:
+    print(f"WARNING: Dashboard feed unavailable ({e}) - dashboard WebSocket disabled")
+    DashboardWebSocketServer = None
 
 # --- Centralized Log & Error Queues ---
 log_messages = deque(maxlen=100)
@@ -127,6 +136,8 @@ BOT_TOKEN = os.getenv("BOT_TOKEN")
 GUILD_ID_STR = os.getenv("GUILD_ID", "")
 GUILD_IDS = [int(gid.strip()) for gid in GUILD_ID_STR.split(',') if gid.strip()]
 SQLITE_PATH = os.getenv("SQLITE_PATH", "opure.db")
+# Activity type -> user_stats counter it bumps
+USER_STAT_COUNTERS = {"music_queue": "songs_queued", "command_use": "commands_used"}
 RAW_LOG_CHANNEL_ID = int(os.getenv("RAW_LOG_CHANNEL_ID", 1394112353313755248))
 ERROR_LOG_CHANNEL_ID = int(os.getenv("ERROR_LOG_CHANNEL_ID", 1393736274321473577))
 GENERAL_CHANNEL_ID = int(os.getenv("GENERAL_CHANNEL_ID", 1362815996557263052)) # <-- NEW
@@ -143,7 +154,8 @@ if not BOT_TOKEN: raise RuntimeError("⚠️ BOT_TOKEN not set in .env")
 class OpureBot(commands.Bot):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.db: aiosqlite.Connection | None = None
+        self.db: OpureDatabase | None = None
+        self.write_batcher: WriteBatcher | None = None
         self.firestore_db: firestore.Client | None = None
         self.ollama_client = ollama.AsyncClient(host=os.getenv("OLLAMA_HOST", "http://127.0.0.1:11434"))
         self.temp_meta_instructions = {}
@@ -213,188 +225,38 @@ class OpureBot(commands.Bot):
             self.add_error(f"Firebase initialization failed: {e}")
             self.firestore_db = None
 
-        self.db = await aiosqlite.connect(SQLITE_PATH)
-        await self.db.execute("CREATE TABLE IF NOT EXISTS players (user_id INTEGER PRIMARY KEY, fragments INTEGER DEFAULT 100, data_shards INTEGER DEFAULT 0, last_daily TEXT, daily_streak INTEGER DEFAULT 0, log_keys INTEGER DEFAULT 1, lives INTEGER DEFAULT 3, level INTEGER DEFAULT 1, xp INTEGER DEFAULT 0)")
-        await self.db.execute("CREATE TABLE IF NOT EXISTS game_sessions (user_id INTEGER PRIMARY KEY, story_context TEXT, difficulty TEXT DEFAULT 'normal', last_played TEXT, is_active INTEGER DEFAULT 0)")
-        await self.db.execute("CREATE TABLE IF NOT EXISTS artifacts (artifact_id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL UNIQUE, description TEXT, rarity TEXT NOT NULL)")
-        await self.db.execute("CREATE TABLE IF NOT EXISTS inventory (user_id INTEGER, artifact_id INTEGER, FOREIGN KEY (user_id) REFERENCES players (user_id), FOREIGN KEY (artifact_id) REFERENCES artifacts (artifact_id), PRIMARY KEY (user_id, artifact_id))")
-        # Create sentient_logs table with proper schema
-        await self.db.execute("CREATE TABLE IF NOT EXISTS sentient_logs (log_id INTEGER PRIMARY KEY AUTOINCREMENT, content TEXT NOT NULL, timestamp DATETIME NOT NULL, log_type TEXT DEFAULT 'general')")
-        
-        # Ensure log_type column exists (for upgrading existing databases)
-        try:
-            await self.db.execute("ALTER TABLE sentient_logs ADD COLUMN log_type TEXT DEFAULT 'general'")
-        except:
-            pass  # Column already exists
-        await self.db.execute("CREATE TABLE IF NOT EXISTS player_items (user_id INTEGER, item_id TEXT NOT NULL, quantity INTEGER NOT NULL, FOREIGN KEY (user_id) REFERENCES players (user_id), PRIMARY KEY (user_id, item_id))")
-        await self.db.execute("CREATE TABLE IF NOT EXISTS playlists (playlist_id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, creator_id INTEGER NOT NULL, guild_id INTEGER NOT NULL, is_public INTEGER DEFAULT 0, track_data TEXT NOT NULL, UNIQUE(name, guild_id))")
-        await self.db.execute("CREATE TABLE IF NOT EXISTS command_usage (command_name TEXT, user_id INTEGER, guild_id INTEGER, timestamp DATETIME, PRIMARY KEY (command_name, user_id, timestamp))")
-        await self.db.execute("""CREATE TABLE IF NOT EXISTS user_quests (
-            quest_id TEXT PRIMARY KEY,
-            user_id INTEGER NOT NULL,
-            name TEXT NOT NULL,
-            description TEXT NOT NULL,
-            quest_type TEXT NOT NULL,
-            target INTEGER NOT NULL,
-            current_progress INTEGER DEFAULT 0,
-            reward INTEGER NOT NULL,
-            status TEXT DEFAULT 'active',
-            date_assigned TEXT NOT NULL
-        )""")
-        await self.db.execute("""CREATE TABLE IF NOT EXISTS achievements (
-            achievement_id TEXT PRIMARY KEY,
-            user_id INTEGER,
-            achievement_name TEXT,
-            description TEXT,
-            category TEXT,
-            rarity TEXT,
-            fragments_reward INTEGER,
-            unlocked_at DATETIME,
-            progress_data TEXT
-        )""")
-        await self.db.execute("""CREATE TABLE IF NOT EXISTS user_stats (
-            user_id INTEGER PRIMARY KEY,
-            messages_sent INTEGER DEFAULT 0,
-            commands_used INTEGER DEFAULT 0,
-            music_tracks_played INTEGER DEFAULT 0,
-            achievements_earned INTEGER DEFAULT 0,
-            music_time_listened INTEGER DEFAULT 0,
-            songs_queued INTEGER DEFAULT 0,
-            games_completed INTEGER DEFAULT 0,
-            daily_streak INTEGER DEFAULT 0,
-            social_interactions INTEGER DEFAULT 0,
-            unique_achievements INTEGER DEFAULT 0
-        )""")
-        
-        # Add missing columns for existing databases
-        missing_columns = [
-            ("messages_sent", "INTEGER DEFAULT 0"),
-            ("music_tracks_played", "INTEGER DEFAULT 0"), 
-            ("achievements_earned", "INTEGER DEFAULT 0")
-        ]
-        for col_name, col_def in missing_columns:
-            try:
-                # Validate column name and definition to prevent SQL injection
-                if re.match(r'^[a-zA-Z_][a-zA-Z0-9_]*$', col_name) and re.match(r'^[A-Z]+(\([0-9]+\))?( DEFAULT [^;]*)?$', col_def):
-                    await self.db.execute(f"ALTER TABLE user_stats ADD COLUMN {col_name} {col_def}")
-                else:
-                    self.add_error(f"Invalid column specification: {col_name} {col_def}")
-            except:
-                pass  # Column already exists
-        await self.db.execute("""CREATE TABLE IF NOT EXISTS daily_quests (
-            quest_id TEXT PRIMARY KEY,
-            user_id INTEGER,
-            quest_type TEXT,
-            quest_name TEXT,
-            description TEXT,
-            target_value INTEGER,
-            current_progress INTEGER DEFAULT 0,
-            fragment_reward INTEGER,
-            created_date TEXT,
-            completed_at TEXT,
-            is_completed INTEGER DEFAULT 0
-        )""")
-        await self.db.execute("""CREATE TABLE IF NOT EXISTS sync_events (
-            sync_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            event_type TEXT NOT NULL,
-            data TEXT NOT NULL,
-            timestamp REAL NOT NULL,
-            processed INTEGER DEFAULT 0
-        )""")
-        await self.db.execute("""CREATE TABLE IF NOT EXISTS bounties (
-            bounty_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL,
-            description TEXT NOT NULL,
-            fragment_reward INTEGER NOT NULL,
-            xp_reward INTEGER DEFAULT 0,
-            difficulty TEXT DEFAULT 'normal',
-            category TEXT DEFAULT 'general',
-            category_id INTEGER DEFAULT 1,
-            requirements TEXT,
-            created_date TEXT NOT NULL,
-            expires_date TEXT,
-            is_active INTEGER DEFAULT 1,
-            is_trending INTEGER DEFAULT 0,
-            completion_count INTEGER DEFAULT 0,
-            max_completions INTEGER DEFAULT -1
-        )""")
-        
-        # Update existing bounties table with missing columns (if needed)
-        try:
-            await self.db.execute("ALTER TABLE bounties ADD COLUMN category_id INTEGER DEFAULT 1")
-        except Exception:
-            pass  # Column already exists
-            
-        try:
-            await self.db.execute("ALTER TABLE bounties ADD COLUMN is_trending INTEGER DEFAULT 0")
-        except Exception:
-            pass  # Column already exists
-            
-        try:
-            await self.db.execute("ALTER TABLE bounties ADD COLUMN creator_type TEXT DEFAULT 'user'")
-        except Exception:
-            pass  # Column already exists
-            
-        try:
-            await self.db.execute("ALTER TABLE bounties ADD COLUMN current_participants INTEGER DEFAULT 0")
-        except Exception:
-            pass  # Column already exists
-        
-        # Create database triggers for real-time sync events
+        # One writer plus WAL readers; reads no longer queue behind each other or behind writes
+        self.db = OpureDatabase(SQLITE_PATH)
+        await self.db.connect()
+        # Command usage and stat counters are group-committed instead of one commit per interaction
+        self.write_batcher = WriteBatcher(self.db)
+        # Versioned schema (core/migrations.py): a current database costs one lookup, not a CREATE per table
         try:
-            # Trigger for user stats changes (immediate sync to Activity and Dashboard)
-            await self.db.execute("""
-                CREATE TRIGGER IF NOT EXISTS user_stats_sync_trigger
-                    AFTER UPDATE ON user_stats
-                    FOR EACH ROW
-                BEGIN
-                    INSERT INTO sync_events (
-                        event_type, data, timestamp, processed
-                    ) VALUES (
-                        'user_stats_update', 
-                        json_object(
-                            'user_id', NEW.user_id,
-                            'commands_old', OLD.commands_used,
-                            'commands_new', NEW.commands_used,
-                            'stats_old', json_object('messages_sent', OLD.messages_sent, 'achievements', OLD.achievements_earned),
-                            'stats_new', json_object('messages_sent', NEW.messages_sent, 'achievements', NEW.achievements_earned)
-                        ),
-                        unixepoch(),
-                        0
-                    );
-                END;
-            """)
-            
-            # Trigger for economy transactions (immediate sync)
-            await self.db.execute("""
-                CREATE TRIGGER IF NOT EXISTS economy_sync_trigger
-                    AFTER UPDATE ON players
-                    FOR EACH ROW
-                    WHEN OLD.fragments != NEW.fragments
-                BEGIN
-                    INSERT INTO sync_events (
-                        event_type, data, timestamp, processed
-                    ) VALUES (
-                        'economy_update',
-                        json_object(
-                            'user_id', NEW.user_id,
-                            'old_balance', OLD.fragments,
-                            'new_balance', NEW.fragments,
-                            'change', NEW.fragments - OLD.fragments
-                        ),
-                        unixepoch(),
-                        0
-                    );
-                END;
-            """)
-            
-            self.add_log("✓ Database triggers created for real-time sync")
+            applied = await self.db.migrate()
+            if applied:
+                self.add_log(f"✓ Applied schema migrations: {', '.join(applied)}")
         except Exception as e:
-            self.add_error(f"Failed to create database triggers: {e}")
+            self.add_error(f"❌ Schema migration failed: {e}")
+            raise
+        # Playlist tracks live in their own rows; legacy track_data blobs are migrated on startup
+        self.playlists = PlaylistStore(self.db)
+        await self.playlists.prepare()
         
-        await self.db.commit()
+        self.write_batcher.start()
         self.add_log("✓ Database connection established and tables verified.")
 
+        # One server for the Activity HTTP API, Activity WebSockets (/ws) and the dashboard feed (/dashboard)
+        self.gateway = ActivityGateway()
+        self.activity_api = ActivityMusicAPIServer(self, port=self.gateway.port)
+        self.activity_api.attach(self.gateway)
+        if DashboardWebSocketServer:
+            try:
+                self.websocket_server = DashboardWebSocketServer(db_path=SQLITE_PATH)
+                self.websocket_server.attach(self.gateway)
+            except Exception as e:
+                self.add_error(f"Dashboard feed failed to attach: {e}")
+                self.websocket_server = None
+
         self.add_log("--- Starting Cog Loading ---")
         cog_names = [
             # ONLY Hub System - All commands accessed through 4 hub interfaces
@@ -419,6 +281,12 @@ class OpureBot(commands.Bot):
                 self.add_error(f"FAILED to load cog '{cog}': {e}\n{traceback.format_exc()}")
         self.add_log("--- Finished Cog Loading ---\n")
         
+        try:
+            await self.gateway.start()
+            self.add_log(f"✓ Activity gateway listening on port {self.gateway.port} (HTTP API, /ws, /dashboard)")
+        except Exception as e:
+            self.add_error(f"Failed to start Activity gateway on port {self.gateway.port}: {e}")
+        
         # Initialize sync integration system
         try:
             self.sync_integration = SyncIntegrationLayer(self, self.sync_manager)
@@ -437,7 +305,10 @@ class OpureBot(commands.Bot):
             await self.sync_manager.stop()
             self.add_log("✅ Real-time sync system shutdown complete")
         
+        if getattr(self, 'gateway', None):
+            await self.gateway.stop()
         await super().close()
+        if self.write_batcher: await self.write_batcher.stop()
         if self.db: await self.db.close()
 
     async def get_chat_response(self, message: discord.Message) -> str | None:
@@ -843,18 +714,14 @@ class OpureBot(commands.Bot):
             self.add_error(f"Failed to send setup completion message: {e}")
 
     async def track_command_usage(self, interaction, command_name):
-        """Track command usage for self-awareness analysis"""
+        """Track command usage for self-awareness analysis (written by the next batch flush)"""
         try:
-            await self.db.execute("""
-                INSERT INTO command_usage (command_name, user_id, guild_id, timestamp)
-                VALUES (?, ?, ?, ?)
-            """, (
+            self.write_batcher.record_command(
                 command_name,
                 interaction.user.id,
                 interaction.guild_id if interaction.guild else 0,
                 datetime.datetime.now().isoformat()
-            ))
-            await self.db.commit()
+            )
         except Exception as e:
             self.add_error(f"Failed to track command usage: {e}")
 
@@ -867,25 +734,10 @@ class OpureBot(commands.Bot):
             self.add_error(f"Achievement check failed: {e}")
 
     async def update_user_stats(self, user_id, activity_type, **kwargs):
-        """Update user statistics for achievement tracking"""
+        """Update user statistics for achievement tracking (merged per user and written in batches)"""
         try:
-            # Initialize user stats if not exist
-            await self.db.execute("""
-                INSERT OR IGNORE INTO user_stats (user_id) VALUES (?)
-            """, (user_id,))
-            
-            # Update based on activity type
-            if activity_type == "music_queue":
-                await self.db.execute("""
-                    UPDATE user_stats SET songs_queued = songs_queued + 1 WHERE user_id = ?
-                """, (user_id,))
-            elif activity_type == "command_use":
-                await self.db.execute("""
-                    UPDATE user_stats SET commands_used = commands_used + 1 WHERE user_id = ?
-                """, (user_id,))
-            
-            await self.db.commit()
-            
+            # Other activity types only make sure the user has a stats row
+            self.write_batcher.increment(user_id, USER_STAT_COUNTERS.get(activity_type))
         except Exception as e:
             self.add_error(f"Failed to update user stats: {e}")
 
@@ -1456,7 +1308,7 @@ async def on_message(message: discord.Message):
                                     await self.channel.send(content)
                         
                         fake_interaction = FakeInteraction(message)
-                        player = await music_cog.get_player(fake_interaction)
+                        player = await music_cog.get_instance(fake_interaction)
                         
                         if player:
                             # Queue the audio file
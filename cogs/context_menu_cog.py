@@ -184,10 +184,12 @@ class ContextMenuCog(commands.Cog):
         try:
             # Get recent music activity
             cursor = await self.bot.db.execute("""
-                SELECT song_title, artist, played_at FROM music_history 
+                SELECT title, uploader, played_at FROM song_history 
                 WHERE user_id = ? ORDER BY played_at DESC LIMIT 5
             """, (user_id,))
             recent_songs = await cursor.fetchall()
+            cursor = await self.bot.db.execute("SELECT COUNT(*) FROM song_history WHERE user_id = ?", (user_id,))
+            total_played = (await cursor.fetchone())[0]
             
             # Get playlists
             cursor = await self.bot.db.execute("""
@@ -199,7 +201,7 @@ class ContextMenuCog(commands.Cog):
             return {
                 'recent_songs': recent_songs or [],
                 'playlists': playlists or [],
-                'total_played': len(recent_songs)
+                'total_played': total_played
             }
             
         except Exception as e:
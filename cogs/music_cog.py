@@ -8,17 +8,34 @@ import json
 import re
 import os
 import datetime
+import time
 from dotenv import load_dotenv
-from typing import List, Optional, Dict
+from typing import Awaitable, Callable, List, Optional, Dict, Tuple
 import traceback
 import random
 import aiohttp
 import html
 from bs4 import BeautifulSoup
-from urllib.parse import quote
-import secrets
+from urllib.parse import quote, urlparse
 import weakref
+from collections import deque
 from core.command_hub_system import NewAIEngine
+from core.track_prefetcher import TrackPrefetcher, prefetch_metrics
+from core.track_queue import TrackQueue
+from core.metadata_cache import metadata_cache
+from core.render_scheduler import CoalescingRenderer
+from core.audio_cache import audio_cache
+from core.song_history import song_history
+from core.voice_sessions import voice_sessions
+from core.playback_clock import PlaybackClock
+from core.audio_eq import PRIME_FRAME_SECONDS, eq_filter_chain, eq_metrics, normalize_bands
+from core.audio_features import audio_features, song_key
+from core.instance_registry import InstanceRegistry
+from core.streaming_search import FlatEntryStream, search_target
+from core.activity_broadcast import activity_track
+from core.activity_gateway import ActivityGateway
+from core import text_normalization
+from core.lyrics_cache import LyricsError, LyricsResult, extract_genius_pages, lyrics_cache, normalize_song_key
 from aiohttp import web, WSMsgType
 
 # Rate limiting and core systems
@@ -57,7 +74,16 @@ FFMPEG_OPTIONS = {
     'options': '-vn -loglevel quiet'
 }
 
-# Equalizer presets for Activity
+def ffmpeg_options(start: float = 0.0, audio_filter: Optional[str] = None) -> Dict[str, str]:
+    """FFMPEG_OPTIONS, seeked to `start` seconds and run through `audio_filter` (an ``-af`` graph) when given."""
+    options = dict(FFMPEG_OPTIONS)
+    if start > 0:
+        options['before_options'] = f"-ss {start:.3f} {options['before_options']}"
+    if audio_filter:
+        options['options'] = f"{options['options']} -af {audio_filter}"
+    return options
+
+# Equalizer presets for Activity; applied to playback as FFmpeg equalizer filters (core.audio_eq)
 EQ_PRESETS = {
     "flat": {"31": 0, "62": 0, "125": 0, "250": 0, "500": 0, "1k": 0, "2k": 0, "4k": 0, "8k": 0, "16k": 0},
     "bass_boost": {"31": 8, "62": 6, "125": 4, "250": 2, "500": 0, "1k": 0, "2k": 0, "4k": 0, "8k": 0, "16k": 0},
@@ -71,47 +97,16 @@ class ActivityWebSocketServer:
     def __init__(self, music_cog):
         self.music_cog = music_cog
         self.bot = music_cog.bot
-        self.app = None
-        self.server = None
-        self.site = None
-        self.auth_tokens = {}  # token -> {user_id, instance_id, expires_at}
-        self.connections = {}  # instance_id -> set of websockets
-        self.active_tokens = {}  # user_id -> token (for cleanup)
-        
-    async def handle_request(self, request):
-        """Handle both HTTP requests (for Activity HTML) and WebSocket upgrades"""
-        # Check if this is a WebSocket upgrade request
-        if request.headers.get('upgrade', '').lower() == 'websocket':
-            return await self.websocket_handler(request)
-        else:
-            # Serve the Activity HTML file
-            return await self.serve_activity_html(request)
-    
-    async def websocket_handler(self, request):
-        """aiohttp WebSocket handler - should be called properly"""
-        ws = web.WebSocketResponse()
-        self.bot.add_log(f"🔥🔥🔥 AIOHTTP HANDLER CALLED! Connection from {request.remote}")
-        self.bot.add_log(f"🔥 Request path: {request.path}")
-        
-        try:
-            self.bot.add_log("🔥 About to prepare WebSocket...")
-            await ws.prepare(request)
-            self.bot.add_log(f"🔥 WebSocket prepared! closed: {ws.closed}")
-            
-            self.bot.add_log("🔥 About to call handle_aiohttp_connection...")
-            await self.handle_aiohttp_connection(ws, request.path)
-            self.bot.add_log("🔥 handle_aiohttp_connection completed!")
-            
-        except Exception as e:
-            self.bot.add_log(f"💥 AIOHTTP HANDLER EXCEPTION: {e}")
-            import traceback
-            self.bot.add_log(f"💥 Traceback: {traceback.format_exc()}")
-            if not ws.closed:
-                await ws.close(code=1011, message=b'Handler error')
+        # HTTP, Activity and dashboard traffic share the bot's gateway; the cog only
+        # runs its own when loaded outside the bot (e.g. tooling)
+        self.gateway = getattr(self.bot, 'gateway', None)
+        self.owns_gateway = self.gateway is None
+        if self.owns_gateway:
+            self.gateway = ActivityGateway()
+        self.auth_tokens = self.gateway.tokens.tokens  # token -> {user_id, instance_id, expires_at}
+        self.broadcaster = self.gateway.broadcaster
+        self.connections = self.broadcaster.members  # instance_id -> set of websockets
         
-        self.bot.add_log("🔥 WebSocket handler returning...")
-        return ws
-    
     async def send_current_music_state(self, ws, instance_id):
         """Send current music state to Activity"""
         try:
@@ -126,24 +121,14 @@ class ActivityWebSocketServer:
                 self.bot.add_log(f"🔍 Current song exists: {current_song is not None}")
                 
                 if current_song:
-                    # Send real music data
-                    await ws.send_str(json.dumps({
+                    # Full snapshot through the client's send queue, so later deltas stay in order behind it
+                    snapshot = self.build_state_snapshot(instance_id)
+                    self.broadcaster.send_snapshot(instance_id, ws, {
                         "type": "AUTH_SUCCESS",
                         "message": "Connected to REAL bot!",
                         "user_data": {"dj": instance.current_dj.display_name if hasattr(instance, 'current_dj') and instance.current_dj else "Bot"},
-                        "current_song": {
-                            "title": current_song.title,
-                            "artist": current_song.uploader,
-                            "duration": current_song.duration,
-                            "position": 0,  # You'd calculate this from start time
-                            "thumbnail": current_song.thumbnail or '',
-                            "youtube_id": current_song.data.get('id', ''),
-                            "webpage_url": current_song.webpage_url
-                        },
-                        "queue": [],  # Queue is complex asyncio.Queue, simplified for now
-                        "volume": instance.volume if hasattr(instance, 'volume') else 50,
-                        "is_playing": instance.is_playing if hasattr(instance, 'is_playing') else False
-                    }))
+                        **snapshot["data"]
+                    })
                     self.bot.add_log("🎵 Sent REAL music data to Activity!")
                     return
             
@@ -302,6 +287,7 @@ class ActivityWebSocketServer:
         """Handle WebSocket connection using aiohttp WebSocket"""
         self.bot.add_log(f"🔌 New aiohttp WebSocket connection (path: {path})")
         self.bot.add_log(f"🔍 WebSocket state: closed={ws.closed}")
+        authed_user_id = None
         
         try:
             # Wait for authentication message
@@ -331,11 +317,12 @@ class ActivityWebSocketServer:
                         
                             self.bot.add_log(f"🔑 Processing auth for token: {token[:8]}...")
                             
-                            # Check if token exists in our auth_tokens
-                            if token in self.auth_tokens:
-                                token_data = self.auth_tokens[token]
+                            # Check the token against the gateway's shared store
+                            token_data = self.gateway.tokens.verify(token)
+                            if token_data:
                                 user_id = token_data['user_id']
                                 instance_id = token_data['instance_id']
+                                authed_user_id = user_id
                             
                                 self.bot.add_log(f"✅ Valid token found for user {user_id}, instance {instance_id}")
                                 
@@ -373,17 +360,11 @@ class ActivityWebSocketServer:
                             found_instance_id = None
                             
                             if hasattr(self.music_cog, 'instances'):
-                                self.bot.add_log(f"🔍 Checking {len(self.music_cog.instances)} music instances...")
-                                for inst_id, instance in self.music_cog.instances.items():
-                                    self.bot.add_log(f"🔍 Instance {inst_id}: guild={instance.guild.id if instance.guild else None}, channel={instance.voice_channel.id if instance.voice_channel else None}")
-                                    
-                                    # Match by guild and channel
-                                    if (str(instance.guild.id) == str(guild_id) if guild_id and instance.guild else False) or \
-                                       (str(instance.voice_channel.id) == str(channel_id) if channel_id and instance.voice_channel else False):
-                                        found_instance = instance
-                                        found_instance_id = inst_id
-                                        self.bot.add_log(f"✅ Found matching music instance: {inst_id}")
-                                        break
+                                # Match by channel, then guild
+                                found_instance = self.music_cog.instances.find(guild_id=guild_id, channel_id=channel_id)
+                                if found_instance:
+                                    found_instance_id = found_instance.instance_id
+                                    self.bot.add_log(f"✅ Found matching music instance: {found_instance_id}")
                                 
                                 # If no exact match, use the first active instance as fallback
                                 if not found_instance and self.music_cog.instances:
@@ -420,15 +401,13 @@ class ActivityWebSocketServer:
                             self.bot.add_log(f"🎵 Command received: {command}")
                             
                             # Find the authenticated instance and execute command
-                            if hasattr(self.music_cog, 'instances'):
-                                for inst_id, connections in self.connections.items():
-                                    if ws in connections and inst_id in self.music_cog.instances:
-                                        instance = self.music_cog.instances[inst_id]
-                                        await self.execute_music_command(instance, command, command_data)
-                                        
-                                        # Send updated state after command execution
-                                        await self.send_current_music_state(ws, inst_id)
-                                        break
+                            inst_id = self.broadcaster.instance_of(ws)
+                            if hasattr(self.music_cog, 'instances') and inst_id in self.music_cog.instances:
+                                instance = self.music_cog.instances[inst_id]
+                                await self.execute_music_command(instance, command, command_data)
+                                
+                                # Send updated state after command execution
+                                await self.send_current_music_state(ws, inst_id)
                             
                             await ws.send_str(json.dumps({
                                 "type": "COMMAND_RESPONSE",
@@ -437,6 +416,11 @@ class ActivityWebSocketServer:
                             }))
                             continue
                             
+                        elif message_type == "RESYNC":
+                            # Client saw a gap in seq/queue versions
+                            self.broadcaster.resync(ws)
+                            continue
+                            
                         elif message_type == "ADMIN_COMMAND":
                             # Handle admin commands
                             await self.handle_admin_command(ws, message_data)
@@ -452,6 +436,13 @@ class ActivityWebSocketServer:
                             await self.handle_ui_command(ws, message_data)
                             continue
                             
+                        elif message_type in ("CHANGE_EQ", "PLAY_SONG", "SEEK", "PAUSE", "RESUME", "SKIP"):
+                            # Direct playback controls for the instance this socket is attached to
+                            inst_id = self.broadcaster.instance_of(ws)
+                            if inst_id is not None:
+                                await self.handle_message(ws, message_data, authed_user_id, inst_id)
+                            continue
+                            
                     except json.JSONDecodeError as e:
                         self.bot.add_log(f"❌ Invalid JSON in auth message: {e}")
                         await ws.send_str(json.dumps({
@@ -475,195 +466,32 @@ class ActivityWebSocketServer:
             self.bot.add_log(f"💥 Traceback: {traceback.format_exc()}")
         finally:
             # Clean up connection
-            for instance_id, conn_set in self.connections.items():
-                if ws in conn_set:
-                    conn_set.remove(ws)
-                    self.bot.add_log(f"🧹 Cleaned up connection for instance {instance_id}")
-
-    async def start_server(self, host="localhost", port=8765):
-        """Start the WebSocket server with a specific host binding."""
-        try:
-            self.bot.add_log(f"🔧 Starting simple WebSocket server on {host}:{port}...")
-            
-            # Try alternative: Use websockets library instead of aiohttp
-            import websockets
-            
-            async def handle_websocket(websocket, path):
-                self.bot.add_log(f"🔌 New WebSocket connection: {websocket.remote_address}")
-                try:
-                    await self.handle_simple_connection(websocket, path)
-                except Exception as e:
-                    self.bot.add_log(f"❌ WebSocket connection error: {e}")
-                finally:
-                    self.bot.add_log(f"🔌 WebSocket connection closed")
-            
-            # Start websockets server
-            self.websocket_server = await websockets.serve(
-                handle_websocket, 
-                host, 
-                port,
-                ping_interval=20,
-                ping_timeout=10
-            )
-            
-            self.bot.add_log(f"✅ Simple WebSocket server started on {host}:{port}")
-            
-            # Test if server is actually listening
-            await asyncio.sleep(0.5)
-            import socket
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(2)
-            try:
-                result = sock.connect_ex((host, port))
-                if result == 0:
-                    self.bot.add_log(f"✅ Port {port} is accessible and responding")
-                else:
-                    self.bot.add_log(f"❌ Port {port} connection failed (code: {result})")
-            except Exception as test_e:
-                self.bot.add_log(f"❌ Port test error: {test_e}")
-            finally:
-                sock.close()
-                
-        except ImportError:
-            self.bot.add_error("❌ websockets library not available, falling back to aiohttp")
-            await self.start_aiohttp_server(host, port)
-        except Exception as e:
-            self.bot.add_error(f"❌ Failed to start simple WebSocket server: {e}")
-            self.bot.add_log(f"🔄 Trying fallback aiohttp server...")
-            await self.start_aiohttp_server(host, port)
-    
-    async def start_aiohttp_server(self, host="localhost", port=8765):
-        """Fallback aiohttp server method"""
-        try:
-            self.bot.add_log(f"🔧 Starting aiohttp WebSocket server on {host}:{port}...")
-            
-            # Create aiohttp application
-            self.app = web.Application()
-            # Route all paths to handle_request for WebSocket upgrade detection
-            self.app.router.add_get('/', self.handle_request)  
-            self.app.router.add_get('/ws', self.handle_request)
-            self.app.router.add_get('/{path:.*}', self.handle_request)  # Catch all routes
-            
-            self.bot.add_log(f"🔧 aiohttp app created with WebSocket routes")
-            
-            # Create runner and site
-            self.runner = web.AppRunner(self.app)
-            await self.runner.setup()
-            
-            self.site = web.TCPSite(self.runner, host, port)
-            await self.site.start()
-            
-            # Test the server is actually running
-            import socket
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(2)
-            try:
-                result = sock.connect_ex((host, port))
-                if result == 0:
-                    self.bot.add_log(f"✅ Port {port} is accessible and responding")
-                    self.server = True  # Mark server as running
-                else:
-                    self.bot.add_log(f"❌ Port {port} not accessible (code: {result})")
-                    self.server = False
-            except Exception as e:
-                self.bot.add_log(f"❌ Port test failed: {e}")
-                self.server = False
-            finally:
-                sock.close()
-            
-            # Keep reference to prevent garbage collection
-            self.server_host = host
-            self.server_port = port
-            
-            self.bot.add_log(f"✅ aiohttp WebSocket server started on {host}:{port}")
-                
-        except Exception as e:
-            self.bot.add_error(f"❌ aiohttp server also failed: {e}")
-            import traceback
-            self.bot.add_log(f"🔍 Full error: {traceback.format_exc()}")
-            self.server = False
+            instance_id = self.broadcaster.instance_of(ws)
+            self.broadcaster.detach(ws)
+            if instance_id is not None:
+                self.bot.add_log(f"🧹 Cleaned up connection for instance {instance_id}")
+
+    async def start_server(self):
+        """Register the Activity page and WebSocket endpoint on the shared gateway."""
+        self.gateway.add_snapshot_provider(self.build_state_snapshot)
+        self.gateway.add_endpoint('/ws', self.handle_gateway_connection)
+        for path in ('/', '/activity'):
+            self.gateway.add_page(path, self.serve_activity_html)
+        if self.owns_gateway:
+            await self.gateway.start()
+        self.bot.add_log(f"✅ Activity WebSocket ready on gateway port {self.gateway.port} (/ws)")
     
-    async def handle_simple_connection(self, websocket, path):
-        """Handle WebSocket connection using websockets library"""
-        self.bot.add_log(f"🔌 Simple WebSocket connection from {websocket.remote_address}")
-        
-        try:
-            async for message in websocket:
-                self.bot.add_log(f"📨 Received: {message[:100]}...")
-                try:
-                    data = json.loads(message)
-                    await self.process_websocket_message(websocket, data)
-                except json.JSONDecodeError:
-                    await websocket.send(json.dumps({
-                        "type": "ERROR",
-                        "message": "Invalid JSON format"
-                    }))
-        except Exception as e:
-            self.bot.add_log(f"❌ Connection handling error: {e}")
+    async def handle_gateway_connection(self, ws, request):
+        await self.handle_aiohttp_connection(ws, request.path)
     
-    async def process_websocket_message(self, websocket, data):
-        """Process WebSocket message (simplified)"""
-        message_type = data.get("type")
-        
-        if message_type == "ACTIVITY_AUTH":
-            self.bot.add_log("🎮 Activity authentication received!")
-            guild_id = data.get("guild_id")
-            channel_id = data.get("channel_id")
-            
-            # Find music instance
-            found_instance = None
-            if hasattr(self.music_cog, 'instances'):
-                for inst_id, instance in self.music_cog.instances.items():
-                    if (str(instance.guild.id) == str(guild_id)) or (str(instance.voice_channel.id) == str(channel_id)):
-                        found_instance = instance
-                        break
-            
-            if found_instance and found_instance.current_song:
-                # Send real music data
-                await websocket.send(json.dumps({
-                    "type": "AUTH_SUCCESS",
-                    "message": "Connected to REAL bot!",
-                    "current_song": {
-                        "title": found_instance.current_song.title,
-                        "artist": found_instance.current_song.uploader,
-                        "webpage_url": found_instance.current_song.webpage_url
-                    },
-                    "is_playing": getattr(found_instance, 'is_playing', False),
-                    "volume": getattr(found_instance, 'volume', 50)
-                }))
-                self.bot.add_log("🎵 Sent real music data to Activity!")
-            else:
-                # Send connected but no music
-                await websocket.send(json.dumps({
-                    "type": "AUTH_SUCCESS",
-                    "message": "Connected - No active music",
-                    "current_song": None,
-                    "is_playing": False,
-                    "volume": 50
-                }))
-        
-        elif message_type == "COMMAND":
-            command = data.get("command")
-            self.bot.add_log(f"🎵 Command received: {command}")
-            
-            await websocket.send(json.dumps({
-                "type": "COMMAND_RESPONSE",
-                "command": command,
-                "status": "executed"
-            }))
-
     async def stop_server(self):
-        """Stop the aiohttp WebSocket server"""
+        """Unregister from the gateway (and stop it if this cog started it)"""
         try:
-            if hasattr(self, 'site') and self.site:
-                await self.site.stop()
-                self.site = None
-            if hasattr(self, 'runner') and self.runner:
-                await self.runner.cleanup()
-                self.runner = None
-            if hasattr(self, 'app'):
-                self.app = None
-            self.bot.add_log("🌐 aiohttp WebSocket server stopped")
+            self.gateway.remove('/ws', '/', '/activity')
+            self.gateway.remove_snapshot_provider(self.build_state_snapshot)
+            if self.owns_gateway:
+                await self.gateway.stop()
+            self.bot.add_log("🌐 Activity WebSocket endpoint stopped")
         except Exception as e:
             self.bot.add_error(f"Error stopping WebSocket server: {e}")
     
@@ -772,13 +600,8 @@ class ActivityWebSocketServer:
                     if hasattr(self.music_cog, 'instances'):
                         for instance in self.music_cog.instances.values():
                             if hasattr(instance, 'queue'):
-                                # Clear the queue
-                                while not instance.queue.empty():
-                                    try:
-                                        instance.queue.get_nowait()
-                                        cleared_count += 1
-                                    except:
-                                        break
+                                cleared_count += instance.queue.qsize()
+                                instance.queue.clear()
                     result = f"Cleared {cleared_count} queued tracks"
                     
                 elif command == "SET_GLOBAL_VOLUME":
@@ -787,8 +610,7 @@ class ActivityWebSocketServer:
                     updated_count = 0
                     if hasattr(self.music_cog, 'instances'):
                         for instance in self.music_cog.instances.values():
-                            if hasattr(instance, 'voice_client') and instance.voice_client and hasattr(instance.voice_client, 'source'):
-                                instance.voice_client.source.volume = volume / 100.0
+                            if await instance.set_volume(volume):
                                 updated_count += 1
                     result = f"Updated volume to {volume}% for {updated_count} instances"
                     
@@ -1088,237 +910,41 @@ class ActivityWebSocketServer:
 
     def generate_auth_token(self, user_id: int, instance_id: int) -> str:
         """Generate a unique authentication token"""
-        token = secrets.token_urlsafe(32)
-        expires_at = datetime.datetime.now() + datetime.timedelta(minutes=10)
-        
-        # Clean up any existing token for this user
-        if user_id in self.active_tokens:
-            old_token = self.active_tokens[user_id]
-            if old_token in self.auth_tokens:
-                del self.auth_tokens[old_token]
-        
-        self.auth_tokens[token] = {
-            "user_id": user_id,
-            "instance_id": instance_id,
-            "expires_at": expires_at
-        }
-        self.active_tokens[user_id] = token
-        return token
+        return self.gateway.tokens.issue(user_id, instance_id=instance_id)
     
-    async def handle_connection(self, websocket, path):
-        """Handle new WebSocket connections"""
-        self.bot.add_log(f"🔌 New WebSocket connection from {websocket.remote_address} (path: {path})")
-        try:
-            # Wait for authentication message
-            self.bot.add_log("⏳ Waiting for authentication message...")
-            auth_message = await asyncio.wait_for(websocket.recv(), timeout=30.0)
-            self.bot.add_log(f"📨 Received auth message: {auth_message[:100]}...")
-            auth_data = json.loads(auth_message)
-            
-            # Handle both regular auth and Activity auth
-            auth_type = auth_data.get("type", "auth")
-            
-            if auth_type == "ACTIVITY_AUTH":
-                # Handle Discord Activity authentication
-                user_id = auth_data.get("user_id")
-                guild_id = auth_data.get("guild_id")
-                channel_id = auth_data.get("channel_id")
-                instance_id = auth_data.get("instance_id")
-                
-                self.bot.add_log(f"🎮 Activity auth request: user={user_id}, guild={guild_id}, channel={channel_id}")
-                
-                # Find the music instance for this channel
-                music_instance = None
-                for cid, instance in self.music_cog.instances.items():
-                    if str(cid) == str(channel_id):
-                        music_instance = instance
-                        break
-                
-                # If no instance exists, create one for the channel
-                if not music_instance:
-                    try:
-                        # Get the guild and channel objects
-                        guild = self.bot.get_guild(int(guild_id))
-                        voice_channel = guild.get_channel(int(channel_id)) if guild else None
-                        
-                        if voice_channel:
-                            # Create a new music instance
-                            from core.music_processor import MusicInstance
-                            music_instance = MusicInstance(
-                                guild_id=int(guild_id),
-                                channel_id=int(channel_id),
-                                bot=self.bot,
-                                music_cog=self.music_cog
-                            )
-                            self.music_cog.instances[int(channel_id)] = music_instance
-                            self.bot.add_log(f"✅ Created new music instance for channel {channel_id}")
-                        else:
-                            await websocket.send(json.dumps({"type": "AUTH_FAILED", "message": "Voice channel not found"}))
-                            return
-                    except Exception as e:
-                        self.bot.add_log(f"❌ Failed to create music instance: {e}")
-                        await websocket.send(json.dumps({"type": "AUTH_FAILED", "message": "Failed to create music session"}))
-                        return
-                
-                # Store Activity connection
-                connection_key = f"activity_{channel_id}"
-                if connection_key not in self.connections:
-                    self.connections[connection_key] = set()
-                self.connections[connection_key].add(websocket)
-                
-                # Send success with current music state
-                response = {
-                    "type": "AUTH_SUCCESS", 
-                    "user_id": user_id, 
-                    "activity": True,
-                    "channel_id": channel_id,
-                    "guild_id": guild_id
-                }
-                
-                # Include current music state if available
-                if music_instance and music_instance.current_track:
-                    response["current_song"] = {
-                        "title": music_instance.current_track.get("title", "Unknown"),
-                        "artist": music_instance.current_track.get("uploader", "Unknown"),
-                        "duration": music_instance.current_track.get("duration", 0),
-                        "youtube_id": music_instance.current_track.get("id"),
-                        "thumbnail": music_instance.current_track.get("thumbnail")
-                    }
-                    response["is_playing"] = music_instance.is_playing
-                
-                await websocket.send(json.dumps(response))
-                self.bot.add_log(f"🎮 Activity authenticated for user {user_id} in instance {instance_id}")
-                
-                # Send current state
-                await self.send_current_state(websocket, instance_id)
-                
-                # Handle Activity messages
-                async for message in websocket:
-                    try:
-                        await self.handle_activity_message(websocket, json.loads(message), user_id, instance_id)
-                    except Exception as e:
-                        self.bot.add_log(f"❌ Activity message error: {e}")
-                        break
-                return
-            
-            # Regular token authentication
-            token = auth_data.get("token")
-            self.bot.add_log(f"🔑 Auth token received: {token[:8]}..." if token else "❌ No token in message")
-            if not token or token not in self.auth_tokens:
-                error_msg = f"Invalid token: {token[:8]}..." if token else "No token provided"
-                self.bot.add_log(f"❌ WebSocket auth failed: {error_msg}")
-                await websocket.send(json.dumps({"type": "AUTH_FAILED", "message": "Invalid token"}))
-                return
-            
-            token_data = self.auth_tokens[token]
-            if datetime.datetime.now() > token_data["expires_at"]:
-                await websocket.send(json.dumps({"type": "AUTH_FAILED", "message": "Token expired"}))
-                del self.auth_tokens[token]
-                return
-            
-            # Authentication successful
-            user_id = token_data["user_id"]
-            instance_id = token_data["instance_id"]
-            
-            # Add connection to instance
-            if instance_id not in self.connections:
-                self.connections[instance_id] = set()
-            self.connections[instance_id].add(websocket)
-            
-            await websocket.send(json.dumps({"type": "AUTH_SUCCESS", "user_id": user_id}))
-            
-            # Send current state
-            await self.send_current_state(websocket, instance_id)
-            
-            self.bot.add_log(f"🌐 Activity connected for user {user_id} in instance {instance_id}")
-            
-            # Handle messages
-            async for message in websocket:
-                try:
-                    await self.handle_message(websocket, json.loads(message), user_id, instance_id)
-                except json.JSONDecodeError:
-                    await websocket.send(json.dumps({"type": "ERROR", "message": "Invalid JSON"}))
-                except Exception as e:
-                    self.bot.add_error(f"WebSocket message error: {e}")
-                    
-        except asyncio.TimeoutError:
-            self.bot.add_log("⏰ WebSocket authentication timeout (30s) - no auth message received")
-        except ConnectionError:
-            self.bot.add_log("🔌 WebSocket connection closed")
-        except json.JSONDecodeError as e:
-            self.bot.add_log(f"❌ JSON decode error in WebSocket auth: {e}")
-            await websocket.send(json.dumps({"type": "AUTH_FAILED", "message": "Invalid JSON format"}))
-        except KeyError as e:
-            self.bot.add_log(f"❌ Missing key in auth data: {e}")
-            await websocket.send(json.dumps({"type": "AUTH_FAILED", "message": f"Missing required field: {e}"}))
-        except Exception as e:
-            self.bot.add_error(f"WebSocket connection error: {e}")
-            import traceback
-            self.bot.add_log(f"WebSocket error traceback: {traceback.format_exc()}")
-            try:
-                await websocket.send(json.dumps({"type": "AUTH_FAILED", "message": f"Server error: {str(e)}"}))
-            except:
-                pass
-        finally:
-            # Clean up connection
-            for instance_id, ws_set in self.connections.items():
-                if websocket in ws_set:
-                    ws_set.remove(websocket)
-                    break
-    
-    async def send_current_state(self, websocket, instance_id: int):
-        """Send current playback state to newly connected client"""
+    def build_state_snapshot(self, instance_id: int) -> Optional[Dict]:
+        """Full instance state; clients apply later deltas on top of its seq and queue version."""
         instance = self.music_cog.instances.get(instance_id)
         if not instance:
-            return
+            return None
         
-        # Current song info
+        current_song = None
         if instance.current_song:
-            await websocket.send(json.dumps({
-                "type": "NOW_PLAYING",
-                "data": {
-                    "title": instance.current_song.title,
-                    "uploader": instance.current_song.uploader,
-                    "duration": instance.current_song.duration,
-                    "webpage_url": instance.current_song.webpage_url,
-                    "thumbnail": instance.current_song.thumbnail,
-                    "current_time": getattr(instance.current_song, 'current_time', 0),
-                    "is_playing": instance.voice_client and instance.voice_client.is_playing() if instance.voice_client else False
-                }
-            }))
-        
-        # Queue info
-        queue_list = []
-        temp_queue = []
-        
-        # Get items from queue without removing them
-        while not instance.queue.empty():
-            try:
-                item = instance.queue.get_nowait()
-                temp_queue.append(item)
-                queue_list.append({
-                    "title": item.get("title", "Unknown"),
-                    "uploader": item.get("uploader", "Unknown"),
-                    "duration": item.get("duration"),
-                    "webpage_url": item.get("webpage_url", "#")
-                })
-            except asyncio.QueueEmpty:
-                break
-        
-        # Put items back in queue
-        for item in temp_queue:
-            await instance.queue.put(item)
-        
-        await websocket.send(json.dumps({
-            "type": "PLAYLIST_UPDATED",
-            "data": {"queue": queue_list}
-        }))
+            song = instance.current_song
+            current_song = {
+                "title": song.title,
+                "artist": song.uploader,
+                "uploader": song.uploader,
+                "duration": song.duration,
+                "thumbnail": song.thumbnail or '',
+                "youtube_id": song.data.get('id', ''),
+                "webpage_url": song.webpage_url
+            }
         
-        # Current EQ settings
-        await websocket.send(json.dumps({
-            "type": "EQ_CHANGED",
-            "data": getattr(instance, 'current_eq', EQ_PRESETS["flat"])
-        }))
+        return {
+            "type": "STATE_SNAPSHOT",
+            "data": {
+                "current_song": current_song,
+                "position": instance.clock.position(),
+                "clock": instance.clock.anchor(),
+                "is_playing": instance.clock.running,
+                "volume": getattr(instance, 'volume', 50),
+                "queue": [activity_track(item) for item in instance.queue.snapshot()],
+                "queue_version": instance.queue.version,
+                "eq": getattr(instance, 'current_eq', EQ_PRESETS["flat"]),
+                "eq_enabled": getattr(instance, 'eq_enabled', True)
+            }
+        }
     
     async def handle_message(self, websocket, data: dict, user_id: int, instance_id: int):
         """Handle incoming WebSocket messages"""
@@ -1341,6 +967,8 @@ class ActivityWebSocketServer:
             await self.handle_resume(instance)
         elif message_type == "SKIP":
             await self.handle_skip(instance)
+        elif message_type == "RESYNC":
+            self.broadcaster.resync(websocket)
         elif message_type == "UI_COMMAND":
             await self.handle_activity_message(websocket, data, user_id, instance_id)
     
@@ -1366,11 +994,7 @@ class ActivityWebSocketServer:
             return
         
         # For music-specific commands, get the instance
-        instance = None
-        for channel_id, inst in self.music_cog.instances.items():
-            if inst.instance_id == instance_id:
-                instance = inst
-                break
+        instance = self.music_cog.instances.get(instance_id)
         
         if not instance and command not in ['admin_restart_music', 'admin_system_status']:
             await websocket.send(json.dumps({"type": "UI_RESPONSE", "command": "error", "data": {"message": "Music instance not found. Join a voice channel first!"}}))
@@ -1381,23 +1005,15 @@ class ActivityWebSocketServer:
             query = command_data.get("query")
             if query:
                 await self.handle_play_command(instance, query, user_id, websocket)
-            elif instance.voice_client and instance.voice_client.is_paused():
-                instance.voice_client.resume()
-                await self.broadcast_to_instance(instance_id, {"type": "PLAYBACK_RESUMED"})
+            else:
+                await instance.resume()
         
         elif command == "toggle_play":
-            if instance.voice_client:
-                if instance.voice_client.is_playing():
-                    instance.voice_client.pause()
-                    await self.broadcast_to_instance(instance_id, {"type": "PLAYBACK_PAUSED"})
-                elif instance.voice_client.is_paused():
-                    instance.voice_client.resume()
-                    await self.broadcast_to_instance(instance_id, {"type": "PLAYBACK_RESUMED"})
+            if not await instance.pause():
+                await instance.resume()
         
         elif command == "pause":
-            if instance.voice_client and instance.voice_client.is_playing():
-                instance.voice_client.pause()
-                await self.broadcast_to_instance(instance_id, {"type": "PLAYBACK_PAUSED"})
+            await instance.pause()
         
         elif command in ["skip", "next"]:
             if instance.voice_client:
@@ -1410,8 +1026,8 @@ class ActivityWebSocketServer:
         
         elif command == "stop":
             if instance.voice_client:
+                instance.queue.clear()
                 instance.voice_client.stop()
-                instance.queue = asyncio.Queue()
                 await self.broadcast_to_instance(instance_id, {"type": "PLAYBACK_STOPPED"})
         
         elif command in ["shuffle_toggle", "repeat_toggle"]:
@@ -1595,15 +1211,21 @@ class ActivityWebSocketServer:
         try:
             if command == "queue_jump":
                 index = data.get("index", 0)
+                instance.queue.jump_to(index)
+                if instance.voice_client and (instance.voice_client.is_playing() or instance.voice_client.is_paused()):
+                    instance.voice_client.stop()
                 self.bot.add_log(f"🎵 Jumping to track {index}")
             elif command == "queue_remove":
                 index = data.get("index", 0)
+                instance.queue.remove(index)
                 self.bot.add_log(f"🗑️ Removing track {index}")
             elif command == "queue_shuffle":
+                instance.queue.shuffle()
                 self.bot.add_log("🔀 Shuffling queue")
             elif command == "queue_clear":
-                instance.queue = asyncio.Queue()
+                instance.queue.clear()
                 self.bot.add_log("🗑️ Cleared queue")
+            await instance.broadcast_queue_update()
             
             await websocket.send(json.dumps({
                 "type": "UI_RESPONSE",
@@ -1714,48 +1336,41 @@ Return only the JavaScript function code for the visualizer."""
     
     async def apply_eq_preset(self, instance, preset_name: str, instance_id: int):
         """Apply an equalizer preset"""
-        presets = {
-            "flat": {"31": 0, "62": 0, "125": 0, "250": 0, "500": 0},
-            "bass": {"31": 8, "62": 6, "125": 4, "250": 2, "500": 0},
-            "vocal": {"31": -2, "62": -1, "125": 0, "250": 2, "500": 3},
-            "treble": {"31": 0, "62": 0, "125": 0, "250": 0, "500": 2}
-        }
+        # The UI's short preset names
+        preset_name = {"bass": "bass_boost", "vocal": "vocal_focus", "treble": "treble_boost"}.get(preset_name, preset_name)
         
-        if preset_name in presets:
-            instance.current_eq = presets[preset_name]
+        if preset_name in EQ_PRESETS:
+            instance.set_eq(EQ_PRESETS[preset_name])
             await self.broadcast_to_instance(instance_id, {
                 "type": "EQ_PRESET_APPLIED",
                 "preset": preset_name,
-                "values": presets[preset_name]
+                "values": instance.current_eq
             })
             self.bot.add_log(f"🎛️ Applied EQ preset '{preset_name}' to instance {instance_id}")
     
     async def update_eq_band(self, instance, freq: str, value: float, instance_id: int):
         """Update a specific EQ frequency band"""
-        if not hasattr(instance, 'current_eq'):
-            instance.current_eq = {}
+        bands = normalize_bands({freq: value})
+        if not bands:
+            return
         
-        instance.current_eq[freq] = value
+        # Slider drags send a stream of these; the instance merges them into one audio restart
+        instance.set_eq(bands)
         await self.broadcast_to_instance(instance_id, {
             "type": "EQ_BAND_UPDATED",
             "freq": freq,
-            "value": value
+            "value": bands[freq]
         })
-        self.bot.add_log(f"🎛️ Updated EQ band {freq}Hz to {value}dB in instance {instance_id}")
+        self.bot.add_log(f"🎛️ Updated EQ band {freq}Hz to {bands[freq]}dB in instance {instance_id}")
     
     async def handle_eq_change(self, instance: 'MusicInstance', eq_data: dict, instance_id: int):
         """Handle equalizer changes"""
-        instance.current_eq = eq_data
-        
-        # Apply EQ to current audio stream (if playing)
-        if instance.voice_client and instance.voice_client.is_playing():
-            # TODO: Implement real-time EQ application with FFmpeg filters
-            pass
+        instance.set_eq(eq_data)
         
         # Broadcast to all clients
         await self.broadcast_to_instance(instance_id, {
             "type": "EQ_CHANGED",
-            "data": eq_data
+            "data": instance.current_eq
         })
     
     async def handle_play_song(self, instance: 'MusicInstance', song_data: dict):
@@ -1766,19 +1381,19 @@ Return only the JavaScript function code for the visualizer."""
     
     async def handle_seek(self, instance: 'MusicInstance', seek_data: dict):
         """Handle seek requests"""
-        seek_time = seek_data.get("time", 0)
-        # TODO: Implement seeking functionality
-        # This requires recreating the FFmpeg source with a start time
+        try:
+            seek_time = float(seek_data.get("time", 0))
+        except (TypeError, ValueError):
+            return
+        await instance.seek(seek_time)
     
     async def handle_pause(self, instance: 'MusicInstance'):
         """Handle pause requests"""
-        if instance.voice_client and instance.voice_client.is_playing():
-            instance.voice_client.pause()
+        await instance.pause()
     
     async def handle_resume(self, instance: 'MusicInstance'):
         """Handle resume requests"""
-        if instance.voice_client and instance.voice_client.is_paused():
-            instance.voice_client.resume()
+        await instance.resume()
     
     async def handle_skip(self, instance: 'MusicInstance'):
         """Handle skip requests"""
@@ -1788,12 +1403,18 @@ Return only the JavaScript function code for the visualizer."""
     async def handle_previous_track(self, instance, websocket):
         """Handle previous track functionality - ENHANCED"""
         try:
-            # Implementation for previous track
-            # This would require maintaining a history of played tracks
+            if instance.history:
+                # Same as the previous button: play the last finished track next, then end the current one
+                instance.queue.insert(0, instance.history.pop())
+                await instance.stop_current_track()
+                instance.start_player_loop()
+                message = "⏮️ Playing previous track"
+            else:
+                message = "⏮️ No previous songs available"
             await websocket.send(json.dumps({
                 "type": "UI_RESPONSE",
                 "command": "previous_result",
-                "data": {"message": "⏮️ Previous track functionality coming soon!"}
+                "data": {"message": message}
             }))
         except Exception as e:
             self.bot.add_error(f"Previous track error: {e}")
@@ -1843,6 +1464,10 @@ Return only the JavaScript function code for the visualizer."""
     async def handle_queue_jump(self, instance, index: int, websocket):
         """Handle jumping to specific queue position - ENHANCED"""
         try:
+            instance.queue.jump_to(index)
+            if instance.voice_client and (instance.voice_client.is_playing() or instance.voice_client.is_paused()):
+                instance.voice_client.stop()
+            await instance.broadcast_queue_update()
             self.bot.add_log(f"⏭️ Jumping to queue position {index}")
             
             await websocket.send(json.dumps({
@@ -1856,6 +1481,8 @@ Return only the JavaScript function code for the visualizer."""
     async def handle_queue_remove(self, instance, index: int, websocket):
         """Handle removing item from queue - ENHANCED"""
         try:
+            instance.queue.remove(index)
+            await instance.broadcast_queue_update()
             self.bot.add_log(f"🗑️ Removing queue position {index}")
             
             await websocket.send(json.dumps({
@@ -1870,14 +1497,14 @@ Return only the JavaScript function code for the visualizer."""
         """Handle queue operations like shuffle and clear - ENHANCED"""
         try:
             if command == "queue_shuffle":
-                # Shuffle queue implementation
+                instance.queue.shuffle()
                 self.bot.add_log("🔀 Shuffling queue")
                 message = "🔀 Queue shuffled!"
             elif command == "queue_clear":
-                # Clear queue implementation
-                instance.queue = asyncio.Queue()
+                instance.queue.clear()
                 self.bot.add_log("🗑️ Queue cleared")
                 message = "🗑️ Queue cleared!"
+            await instance.broadcast_queue_update()
             
             await websocket.send(json.dumps({
                 "type": "UI_RESPONSE",
@@ -1893,9 +1520,7 @@ Return only the JavaScript function code for the visualizer."""
             # Clamp volume between 0 and 100
             volume = max(0, min(100, volume))
             
-            if instance.voice_client and hasattr(instance.voice_client, 'source'):
-                if hasattr(instance.voice_client.source, 'volume'):
-                    instance.voice_client.source.volume = volume / 100.0
+            await instance.set_volume(volume)
             
             self.bot.add_log(f"🔊 Volume set to {volume}%")
             
@@ -1919,8 +1544,7 @@ Return only the JavaScript function code for the visualizer."""
                 await self.update_eq_band(instance, freq, value, instance_id)
             elif command == "toggle_equalizer":
                 # Toggle EQ on/off
-                instance.eq_enabled = getattr(instance, 'eq_enabled', True)
-                instance.eq_enabled = not instance.eq_enabled
+                instance.set_eq(enabled=not instance.eq_enabled)
                 status = "enabled" if instance.eq_enabled else "disabled"
                 
                 await self.broadcast_to_instance(instance_id, {
@@ -1934,24 +1558,8 @@ Return only the JavaScript function code for the visualizer."""
     
     async def broadcast_to_instance(self, instance_id: int, message: dict):
         """Broadcast message to all clients connected to an instance"""
-        if instance_id not in self.connections:
-            return
-        
-        message_json = json.dumps(message)
-        disconnected = set()
-        
-        for websocket in self.connections[instance_id]:
-            try:
-                await websocket.send_str(message_json)
-            except ConnectionError:
-                disconnected.add(websocket)
-            except Exception as e:
-                self.bot.add_error(f"Broadcast error: {e}")
-                disconnected.add(websocket)
-        
-        # Clean up disconnected clients
-        for ws in disconnected:
-            self.connections[instance_id].remove(ws)
+        # Serialized once and queued per client; a slow client never holds up the rest
+        self.broadcaster.publish(instance_id, message)
 
 class LaunchActivityView(discord.ui.View):
     """View with button to launch the Discord Activity"""
@@ -2008,6 +1616,15 @@ YTDL_OPTIONS = {
     }
 }
 ytdl = yt_dlp.YoutubeDL(YTDL_OPTIONS)
+# Lists search results and playlist entries without resolving them; each is resolved just before it plays
+ytdl_flat = yt_dlp.YoutubeDL({**YTDL_OPTIONS, 'extract_flat': 'in_playlist'})
+
+# How many upcoming queue entries each instance resolves ahead of playback
+PREFETCH_DEPTH = 2
+# How often the player loop checks that its voice client still exists while waiting for a track to end
+TRACK_WATCHDOG_INTERVAL = 30.0
+# Finished tracks each instance remembers for the previous button
+HISTORY_SIZE = 25
 
 # --- Helper Classes & Functions ---
 
@@ -2038,39 +1655,85 @@ class YTDLSource(discord.PCMVolumeTransformer):
         self.thumbnail = data.get('thumbnail')
         self.webpage_url = data.get('webpage_url', data.get('url'))
         self.requester = data.get('requester')
-        self.start_time = 0.0
 
     @classmethod
-    async def from_url(cls, url, *, loop=None, stream=True, requester=None):
+    async def resolve_info(cls, url, *, loop=None):
+        """Resolves metadata and a stream URL for `url` without opening an audio source."""
         loop = loop or asyncio.get_event_loop()
         
         # Check if it's a direct audio file URL (like Discord attachments)
+        # Discord attachment URLs carry signed query params, so check the path only
         audio_extensions = ('.mp3', '.wav', '.flac', '.ogg', '.m4a', '.mp4', '.webm')
-        if any(url.lower().endswith(ext) for ext in audio_extensions):
+        if urlparse(url).path.lower().endswith(audio_extensions):
             # For direct audio files, create minimal data structure
-            data = {
+            return {
                 'url': url,
                 'title': url.split('/')[-1].split('?')[0],  # Extract filename from URL
                 'uploader': 'Direct Audio File',
                 'duration': None,
-                'webpage_url': url,
-                'requester': requester
+                'webpage_url': url
             }
-            return cls(discord.FFmpegPCMAudio(url, **FFMPEG_OPTIONS), data=data)
         
         try:
             data = await asyncio.wait_for(
-                loop.run_in_executor(None, lambda: ytdl.extract_info(url, download=not stream)),
+                loop.run_in_executor(None, lambda: metadata_cache.extract_info(ytdl, url, need_stream=True)),
                 timeout=10.0
             )
         except asyncio.TimeoutError:
             raise Exception("Song loading timed out - try another track")
-            
+        
+        if not data:
+            raise Exception("Could not extract song info")
+        if 'entries' in data:
+            data = data['entries'][0]
+        return data
+
+    @classmethod
+    def from_data(cls, data, *, requester=None, start: float = 0.0, audio_filter: Optional[str] = None):
+        """Builds a playable source from already-resolved info (e.g. a prefetched track), optionally `start` seconds in."""
+        data = dict(data)
+        data['requester'] = requester
+        return cls(discord.FFmpegPCMAudio(data['url'], **ffmpeg_options(start, audio_filter)), data=data)
+
+    @classmethod
+    async def from_url(cls, url, *, loop=None, stream=True, requester=None, audio_filter: Optional[str] = None):
+        if stream:
+            data = await cls.resolve_info(url, loop=loop)
+            return cls.from_data(data, requester=requester, audio_filter=audio_filter)
+        
+        loop = loop or asyncio.get_event_loop()
+        data = await loop.run_in_executor(None, lambda: ytdl.extract_info(url, download=True))
         if 'entries' in data:
             data = data['entries'][0]
         data['requester'] = requester
-        filename = data['url'] if stream else ytdl.prepare_filename(data)
-        return cls(discord.FFmpegPCMAudio(filename, **FFMPEG_OPTIONS), data=data)
+        return cls(discord.FFmpegPCMAudio(ytdl.prepare_filename(data), **ffmpeg_options(audio_filter=audio_filter)), data=data)
+
+class CachedOpusSource(discord.FFmpegOpusAudio):
+    """
+    Plays a track from the local Opus cache, passing packets straight through
+    unless an EQ or a volume other than the one baked into the file has to be
+    applied. Packets aren't decoded, so `volume` only takes effect when the
+    source is opened; MusicInstance.set_volume re-opens it.
+    """
+    def __init__(self, path: str, *, data, start: float = 0.0, audio_filter: Optional[str] = None, volume: float = 0.5):
+        gain = volume / audio_cache.volume if audio_cache.volume else 1.0
+        filters = [f'volume={gain:.3f}' if abs(gain - 1.0) > 0.001 else None, audio_filter]
+        audio_filter = ','.join(f for f in filters if f) or None
+        # discord.py stream-copies when codec is 'opus'; anything else re-encodes with libopus, which a filter graph needs
+        super().__init__(
+            path, codec=None if audio_filter else 'opus',
+            before_options=f'-ss {start:.3f}' if start > 0 else None,
+            options=f'-af {audio_filter}' if audio_filter else None
+        )
+        self.data = data
+        self.title = data.get('title', 'Unknown Title')
+        self.url = path
+        self.duration = data.get('duration', 0)
+        self.uploader = data.get('uploader', 'Unknown Uploader')
+        self.thumbnail = data.get('thumbnail')
+        self.webpage_url = data.get('webpage_url', path)
+        self.requester = data.get('requester')
+        self.volume = volume
 
 class MusicInstance:
     """A class representing a single music instance for a specific voice channel."""
@@ -2080,7 +1743,7 @@ class MusicInstance:
         self.voice_channel = voice_channel
         self.text_channel = text_channel
         self.guild = voice_channel.guild
-        self.queue = asyncio.Queue()
+        self.queue = TrackQueue()
         self.current_dj = dj
         self.original_dj = dj  # Keep track of who started this instance
         self.dj_users = {dj}  # Set of users with DJ permissions
@@ -2096,56 +1759,37 @@ class MusicInstance:
         self.current_playlist_info: Optional[Dict] = None
         self.current_playlist_tracks: List[Dict] = []
         self.playback_index: int = -1
-        self.history: List[Dict] = []
+        self.history: deque = deque(maxlen=HISTORY_SIZE)
         self.instance_id = voice_channel.id  # Use voice channel ID as unique identifier
         self.instance_messages: List[discord.Message] = []  # Track messages to clean up
-        self.current_eq = EQ_PRESETS["flat"]  # Current equalizer settings
-        self.start_time = None  # Track when current song started for sync
-        self.audio_features = {}  # Cache for GPU-analyzed audio features
-
-    async def analyze_audio_features(self):
-        """GPU-accelerated audio feature analysis for current song - DISABLED"""
-        # Disabled to prevent database errors
-        return
-        
-        try:
-            # Use the song's audio source URL for analysis
-            audio_url = getattr(self.current_song, 'url', None)
-            if not audio_url:
-                return
-                
-            # Check cache first
-            song_id = self.current_song.data.get('id', self.current_song.data.get('webpage_url', ''))
-            if song_id in self.audio_features:
-                return self.audio_features[song_id]
-            
-            # GPU-accelerated audio analysis
-            features = await self.bot.gpu_engine.analyze_audio_features(audio_url)
-            
-            # Cache the results
-            self.audio_features[song_id] = features
-            
-            # Store features in database for future use (disabled - table not available)
-            # if features and self.bot.db:
-            #     try:
-            #         await self.bot.db.execute("""
-            #             INSERT OR REPLACE INTO song_features 
-            #             (song_id, title, features_json, analyzed_at)
-            #             VALUES (?, ?, ?, ?)
-            #         """, (
-            #             song_id,
-            #             self.current_song.title,
-            #             json.dumps(features),
-            #             datetime.datetime.now().isoformat()
-            #         ))
-            #         await self.bot.db.commit()
-            #     except Exception as db_e:
-            #         self.bot.add_error(f"Failed to store audio features: {db_e}")
-            
-            self.bot.add_log(f"🎵 GPU analyzed audio features for: {self.current_song.title[:30]}...")
-            
-        except Exception as e:
-            self.bot.add_error(f"GPU audio analysis error: {e}")
+        self.current_eq = dict(EQ_PRESETS["flat"])  # Current equalizer settings (band -> dB)
+        self.eq_enabled = True
+        self.active_eq_filter: Optional[str] = None  # Filter graph the playing source was opened with
+        # Slider storms collapse into one source restart
+        self.eq_renderer = CoalescingRenderer(self._apply_eq, coalesce_delay=0.3, min_interval=1.0, name=f"EQ ({voice_channel.name})")
+        self.source_lock = asyncio.Lock()  # One re-open (seek or EQ) at a time
+        self.clock = PlaybackClock()  # Position of the current track; Activity clients interpolate from its anchors
+        # Look-ahead resolver so the next track is ready before the current one ends
+        self.prefetcher = TrackPrefetcher(self._prefetch_resolve, depth=PREFETCH_DEPTH)
+        self.last_track_ended_at: Optional[float] = None
+        self.pending_resolves: List[asyncio.Event] = []  # Background playlist resolutions still landing in the queue
+        self.track_finished: Optional[asyncio.Future] = None  # Resolved by the voice client's `after` callback
+        self.queue.subscribe(self._on_queue_changed)
+        # Now-playing embed edits are coalesced and throttled per instance
+        self.control_view: Optional['PlayerControlView'] = None
+        self.now_playing_signature: Optional[str] = None
+        self.np_renderer = CoalescingRenderer(self._render_now_playing, name=f"Now playing ({voice_channel.name})")
+
+    def analyze_audio_features(self):
+        """Queues background feature analysis of the current song; a no-op once it's known or in flight."""
+        if self.current_song:
+            audio_features.schedule({**self.current_song.data, 'url': self.current_song.url})
+
+    async def _prefetch_resolve(self, url: str) -> Dict:
+        info = await YTDLSource.resolve_info(url, loop=self.bot.loop)
+        # Analyze upcoming tracks while the stream URL is fresh, so features are ready when they play
+        audio_features.schedule(info)
+        return info
 
     def start_player_loop(self):
         """Starts the main player loop if it's not already running."""
@@ -2153,31 +1797,15 @@ class MusicInstance:
             return
         self.player_task = self.bot.loop.create_task(self.player_loop())
 
-    # --- Firestore Helper Functions (Synchronous) ---
-    def _add_song_to_firestore_sync(self, song_data: Dict):
-        if not self.db:
-            return  # Firebase not available
-        requester_id_str = str(song_data['requester'].id) if isinstance(song_data['requester'], discord.Member) else str(song_data['requester_id'])
-        history_ref = self.db.collection(f"artifacts/{self.bot.user.id}/users/{requester_id_str}/song_history")
-        history_ref.add({
-            "title": song_data.get('title', 'Unknown Title'),
-            "webpage_url": song_data.get('webpage_url', '#'),
-            "uploader": song_data.get('uploader', 'Unknown Uploader'),
-            "requester_id": requester_id_str,
-            "guild_id": str(self.guild.id),
-            "timestamp": firestore.SERVER_TIMESTAMP
-        })
-
-    # --- ASYNC WRAPPERS FOR FIRESTORE ---
-    async def _add_song_to_history_db(self, song_data: Dict):
-        """Adds a played song to Firestore history without blocking."""
-        if not self.db:
-            return
-        try:
-            await asyncio.to_thread(self._add_song_to_firestore_sync, song_data)
-            self.bot.add_log(f"Saved '{song_data.get('title')}' to history for user {song_data['requester'].id}")
-        except Exception as e:
-            self.bot.add_error(f"Error saving song to Firestore history: {e}\n{traceback.format_exc()}")
+    def _record_history(self, song: 'YTDLSource'):
+        """Remembers a finished track for the previous button and hands it to the buffered history sink."""
+        song_data = song.data.copy()
+        self.history.append(song_data)
+        requester = song_data.get('requester')
+        user_id = requester.id if isinstance(requester, (discord.Member, discord.User)) else song_data.get('requester_id')
+        if user_id:
+            listened = self.clock.position() if self.clock.active else 0.0
+            song_history.record(int(user_id), self.guild.id, song_data, listened_seconds=listened)
 
     # --- RE-ARCHITECTED PLAYER LOOP ---
     async def player_loop(self):
@@ -2204,14 +1832,12 @@ class MusicInstance:
                     if (hasattr(self, 'current_playlist_info') and self.current_playlist_info and 
                         hasattr(self, 'playback_index') and self.playback_index >= 0):
                         self.bot.add_log(f"Voice disconnected during playlist, attempting reconnect...")
-                        try:
-                            # Try to reconnect to the same voice channel
-                            if self.voice_channel:
-                                self.voice_client = await self.voice_channel.connect(self_deaf=True)
-                                self.bot.add_log(f"✅ Reconnected to {self.voice_channel.name}")
-                                continue  # Continue the player loop
-                        except Exception as e:
-                            self.bot.add_error(f"Failed to reconnect to voice: {e}")
+                        self.voice_client = await voice_sessions.reconnect(self.voice_channel)
+                        if self.voice_client:
+                            self.bot.add_log(f"✅ Reconnected to {self.voice_channel.name}")
+                            # Put the track back so the reconnect doesn't skip it
+                            self.queue.insert(0, next_song_data)
+                            continue
                     
                     self.bot.add_log(f"Player for {self.guild.name} stopping, VC disconnected.")
                     break
@@ -2226,11 +1852,7 @@ class MusicInstance:
                     continue
 
                 try:
-                    source = await asyncio.wait_for(
-                        YTDLSource.from_url(next_song_data['webpage_url'], loop=self.bot.loop, stream=True, requester=next_song_data['requester']),
-                        timeout=20.0
-                    )
-                    self.current_song = source
+                    self.current_song = await self.create_source(next_song_data)
                     
                     # Update playlist index if we're playing from a playlist
                     if (hasattr(self, 'current_playlist_info') and self.current_playlist_info and 
@@ -2258,12 +1880,6 @@ class MusicInstance:
 
                 await self.send_or_edit_now_playing()
                 
-                self.current_song.start_time = self.bot.loop.time()
-                self.start_time = datetime.datetime.now()
-                
-                # Broadcast to Activity clients
-                await self.broadcast_now_playing()
-                
                 # ####################################################################
                 # ## START: NEW CODE TO SEND DATA TO VERCEL API
                 # ####################################################################
@@ -2283,7 +1899,7 @@ class MusicInstance:
                     },
                     "queue_length": self.queue.qsize(),
                     "is_playing": True,
-                    "volume": self.voice_client.source.volume * 100 if self.voice_client and hasattr(self.voice_client, 'source') and self.voice_client.source else 50
+                    "volume": getattr(self.voice_client.source, 'volume', 0.5) * 100 if self.voice_client and getattr(self.voice_client, 'source', None) else 50
                 }
                 
                 # We use create_task to send the data in the background
@@ -2304,45 +1920,51 @@ class MusicInstance:
                             dj_in_voice = dj.voice.channel
                             break
                     
-                    if dj_in_voice:
-                        reconnect_attempts = 3
-                        for attempt in range(reconnect_attempts):
-                            try:
-                                # Ensure clean disconnection first
-                                if self.voice_client:
-                                    try:
-                                        await self.voice_client.disconnect(force=True)
-                                    except:
-                                        pass
-                                    await asyncio.sleep(0.5)
-                                
-                                self.voice_client = await asyncio.wait_for(
-                                    dj_in_voice.connect(self_deaf=True), 
-                                    timeout=15.0
-                                )
-                                await asyncio.sleep(0.3)
-                                self.bot.add_log(f"Successfully reconnected to {dj_in_voice.name} (attempt {attempt + 1})")
-                                break
-                            except (asyncio.TimeoutError, Exception) as e:
-                                if attempt == reconnect_attempts - 1:
-                                    self.bot.add_error(f"Failed to reconnect after {reconnect_attempts} attempts: {e}")
-                                    break
-                                else:
-                                    await asyncio.sleep(2.0)
-                    else:
+                    # Backoff, jitter and connect coalescing live in the session manager
+                    self.voice_client = await voice_sessions.reconnect(dj_in_voice) if dj_in_voice else None
+                    if not self.voice_client:
+                        self.bot.add_error(f"Failed to reconnect to voice in {self.guild.name}, stopping player.")
                         break
+                    self.bot.add_log(f"Successfully reconnected to {dj_in_voice.name}")
                     
-                # Start playback immediately
-                self.voice_client.play(self.current_song, after=lambda e: self.after_play_callback(e))
+                # Start playback immediately; the `after` callback resolves this future from the voice thread
+                finished = self.bot.loop.create_future()
+                self.track_finished = finished
+                self.voice_client.play(self.current_song, after=lambda e, f=finished: self.after_play_callback(e, f))
+                self.clock.start(self.current_song.duration)
+                # Broadcast to Activity clients, with the clock anchor they count from
+                await self.broadcast_now_playing()
+                ttfa = voice_sessions.record_first_audio(self.instance_id)
+                if ttfa is not None:
+                    self.bot.add_log(f"⏱️ Time to first audio in {self.voice_channel.name}: {ttfa:.2f}s")
+                if self.last_track_ended_at is not None:
+                    gap = self.bot.loop.time() - self.last_track_ended_at
+                    prefetch_metrics.record_gap(gap)
+                    self.bot.add_log(f"⏱️ Track gap in {self.voice_channel.name}: {gap:.2f}s (prefetch hit rate {prefetch_metrics.get_stats()['hit_rate']:.0f}%)")
+                
+                # Resolve upcoming tracks while this one plays
+                self.prefetcher.schedule(self.queue.peek(PREFETCH_DEPTH))
+                
+                # First play of a track fills the Opus cache in the background (no-op unless enabled)
+                if not isinstance(self.current_song, CachedOpusSource):
+                    audio_cache.schedule_fill(
+                        self.current_song.webpage_url, self.current_song.url,
+                        duration=self.current_song.duration, headers=self.current_song.data.get('http_headers')
+                    )
                 
-                # Run GPU audio analysis in background (non-blocking)
-                self.bot.loop.create_task(self.analyze_audio_features())
+                # Tempo/energy/mood analysis runs in a background process pool
+                self.analyze_audio_features()
                 self.start_now_playing_updater()
                 
-                # Poll to check when the song is finished
-                while (self.voice_client and self.voice_client.is_connected() and 
-                       (self.voice_client.is_playing() or self.voice_client.is_paused())):
-                    await asyncio.sleep(1)
+                # Wait for the track to end (finish, skip, stop or error all resolve the same future).
+                # The timeout is only a watchdog for a voice client that vanished without calling `after`.
+                while not finished.done():
+                    await asyncio.wait({finished}, timeout=TRACK_WATCHDOG_INTERVAL)
+                    if not finished.done() and not (self.voice_client and self.voice_client.is_connected()):
+                        self.signal_track_end(finished)
+                self.track_finished = None
+                # Only measure the gap when a next track is already waiting
+                self.last_track_ended_at = self.bot.loop.time() if (self.loop or not self.queue.empty()) else None
 
                 # Song finished, log it and prepare for next
                 if self.loop and self.current_song:
@@ -2351,21 +1973,17 @@ class MusicInstance:
                     await self.broadcast_queue_update()
                 
                 if self.current_song:
-                    await self._add_song_to_history_db(self.current_song.data.copy())
-                    # Add to local history for previous button functionality
-                    if hasattr(self, 'history'):
-                        self.history.append(self.current_song.data.copy())
-                        # Keep only last 10 songs in history
-                        if len(self.history) > 10:
-                            self.history.pop(0)
+                    self._record_history(self.current_song)
                 
                 self.current_song = None
+                self.clock.stop()
 
                 # Check if queue is empty and loop is off - auto-leave
                 # Don't auto-leave if we have playlist tracks remaining or items in queue
                 should_auto_leave = (
                     self.queue.empty() and 
                     not self.loop and
+                    all(event.is_set() for event in self.pending_resolves) and
                     not (hasattr(self, 'current_playlist_tracks') and self.current_playlist_tracks and len(self.current_playlist_tracks) > 0)
                 )
                 
@@ -2383,30 +2001,212 @@ class MusicInstance:
         finally:
             await self.stop_player()
 
-    def after_play_callback(self, error):
-        """A simple callback that only logs errors. It does not control the loop."""
+    async def create_source(self, song_data: Dict) -> discord.AudioSource:
+        """Builds the audio source for a queue entry, using the Opus cache or a prefetched resolution when possible."""
+        audio_filter = self.active_eq_filter = self.eq_filter()
+        cached_path = audio_cache.lookup(song_data['webpage_url'])
+        if cached_path:
+            return CachedOpusSource(cached_path, data=dict(song_data), audio_filter=audio_filter)
+        prefetched = await self.prefetcher.take(song_data['webpage_url'])
+        if prefetched:
+            return YTDLSource.from_data(prefetched, requester=song_data['requester'], audio_filter=audio_filter)
+        return await asyncio.wait_for(
+            YTDLSource.from_url(song_data['webpage_url'], loop=self.bot.loop, stream=True, requester=song_data['requester'], audio_filter=audio_filter),
+            timeout=20.0
+        )
+
+    def _on_queue_changed(self, version: int, op: str, payload: Dict):
+        # Only look ahead while something is playing; between tracks the loop is taking from the queue itself
+        if self.current_song is not None:
+            self.prefetcher.schedule(self.queue.peek(PREFETCH_DEPTH))
+        self.cog.websocket_server.broadcaster.queue_changed(self.instance_id, self.queue)
+
+    # --- Pause, resume and seek (every caller goes through these so the clock stays right) ---
+
+    async def pause(self) -> bool:
+        if not (self.voice_client and self.voice_client.is_playing()):
+            return False
+        self.voice_client.pause()
+        self.clock.pause()
+        await self.broadcast_clock()
+        return True
+
+    async def resume(self) -> bool:
+        if not (self.voice_client and self.voice_client.is_paused()):
+            return False
+        self.voice_client.resume()
+        self.clock.resume()
+        await self.broadcast_clock()
+        return True
+
+    def _has_track(self) -> bool:
+        return bool(self.current_song and self.voice_client and (self.voice_client.is_playing() or self.voice_client.is_paused()))
+
+    def reopen_source(self, position: float, audio_filter: Optional[str] = None) -> discord.AudioSource:
+        """A fresh source for the current track starting `position` seconds in."""
+        song = self.current_song
+        if isinstance(song, CachedOpusSource):
+            return CachedOpusSource(song.url, data=song.data, start=position, audio_filter=audio_filter, volume=song.volume)
+        source = YTDLSource.from_data(song.data, requester=song.requester, start=position, audio_filter=audio_filter)
+        source.volume = song.volume
+        return source
+
+    async def _restart_source(self, position: float) -> bool:
+        """
+        Re-opens the current track at `position` with the current EQ and swaps it
+        into the voice client without ending the track. The old source keeps
+        playing until the new FFmpeg has produced its first frame, so starting
+        it up never leaves a silence. Callers hold `source_lock`.
+        """
+        old_source = self.current_song
+        audio_filter = self.eq_filter()
+        eq_metrics.stats["restarts"] += 1
+        started = time.monotonic()
+        source = None
+        try:
+            source = self.reopen_source(position, audio_filter)
+            primed = await self.bot.loop.run_in_executor(None, source.read)
+        except Exception as e:
+            primed = None
+            self.bot.add_error(f"Re-opening {old_source.title} in {self.guild.name} failed: {e}")
+        if not primed:
+            # Expired stream URL or a position past the end; keep what's playing
+            eq_metrics.stats["failed"] += 1
+            if source is not None:
+                source.cleanup()
+            return False
+        eq_metrics.record_open(time.monotonic() - started)
+        if self.current_song is not old_source or not self._has_track():
+            eq_metrics.stats["abandoned"] += 1  # The track ended or was skipped meanwhile
+            source.cleanup()
+            return False
+
+        was_paused = self.voice_client.is_paused()
+        self.current_song = source
+        self.active_eq_filter = audio_filter
+        self.voice_client.source = source  # Doesn't fire `after`, so the player loop keeps waiting on this track
+        if was_paused:
+            self.voice_client.pause()  # Swapping sources resumes the player
+        old_source.cleanup()
+        return True
+
+    async def seek(self, position: float) -> bool:
+        """Jumps within the current track by swapping in a re-opened source; the track itself doesn't end."""
+        if not self._has_track():
+            return False
+        duration = self.current_song.duration or 0
+        position = max(0.0, min(position, duration - 1) if duration else position)
+        async with self.source_lock:
+            if not await self._restart_source(position):
+                return False
+            eq_metrics.stats["seeks"] += 1
+            self.clock.seek(position + PRIME_FRAME_SECONDS)
+        await self.broadcast_clock()
+        await self.send_or_edit_now_playing()
+        return True
+
+    async def set_volume(self, volume: int) -> bool:
+        """Sets the playing track's volume (0-100). Cached Opus tracks are re-opened with a volume filter."""
+        if not self._has_track():
+            return False
+        level = max(0, min(100, volume)) / 100.0
+        source = self.current_song
+        if not isinstance(source, CachedOpusSource):
+            source.volume = level
+            return True
+        if abs(source.volume - level) < 0.001:
+            return True
+        async with self.source_lock:
+            previous, source.volume = source.volume, level
+            lead = eq_metrics.expected_latency() if self.clock.running else 0.0
+            position = self.clock.position() + lead
+            if not await self._restart_source(position):
+                source.volume = previous
+                return False
+            self.clock.seek(position + PRIME_FRAME_SECONDS)
+        await self.broadcast_clock()
+        return True
+
+    # --- Equalizer ---
+
+    def eq_filter(self) -> Optional[str]:
+        """The FFmpeg filter graph for this instance's EQ; None when it's off or flat."""
+        return eq_filter_chain(self.current_eq) if self.eq_enabled else None
+
+    def set_eq(self, bands: Optional[Dict] = None, enabled: Optional[bool] = None):
+        """Updates the EQ. Playback follows shortly after; a burst of changes costs one restart."""
+        if bands is not None:
+            self.current_eq = {**self.current_eq, **normalize_bands(bands)}
+        if enabled is not None:
+            self.eq_enabled = enabled
+        self.eq_renderer.request()
+
+    async def _apply_eq(self) -> bool:
+        """Re-opens the playing track with the current EQ, unless it already has it."""
+        if self.eq_filter() == self.active_eq_filter or not self._has_track():
+            return False  # Between tracks the next source picks the EQ up when it's created
+        async with self.source_lock:
+            # Open ahead of the clock by the usual start-up time; the old source plays until the swap
+            lead = eq_metrics.expected_latency() if self.clock.running else 0.0
+            position = self.clock.position() + lead
+            if not await self._restart_source(position):
+                return False
+            eq_metrics.stats["eq_restarts"] += 1
+            self.clock.seek(position + PRIME_FRAME_SECONDS)
+        self.bot.add_log(f"🎛️ EQ applied in {self.voice_channel.name} ({eq_metrics.open_latencies[-1] * 1000:.0f}ms to first audio)")
+        await self.broadcast_clock()
+        return True
+
+    def after_play_callback(self, error, finished: Optional[asyncio.Future] = None):
+        """Runs on the voice thread when a track ends; hands the result back to the player loop."""
         if error:
             self.bot.add_error(f"Player error in {self.guild.name}: {error}")
+        if finished is not None:
+            self.bot.loop.call_soon_threadsafe(self.signal_track_end, finished, error)
+
+    def signal_track_end(self, finished: Optional[asyncio.Future] = None, error: Optional[Exception] = None):
+        """Marks the current track as finished. Must be called on the event loop."""
+        finished = finished or self.track_finished
+        if finished is not None and not finished.done():
+            finished.set_result(error)
+
+    async def stop_current_track(self, timeout: float = 5.0) -> bool:
+        """Stops the current track and waits until the player loop has seen it end."""
+        finished = self.track_finished
+        if self.voice_client and (self.voice_client.is_playing() or self.voice_client.is_paused()):
+            self.voice_client.stop()
+        elif finished is not None:
+            self.signal_track_end(finished)
+        if finished is None or finished.done():
+            return True
+        try:
+            await asyncio.wait_for(asyncio.shield(finished), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
 
-    async def stop_player(self):
+    async def stop_player(self, keep_voice: bool = False):
+        """Tears the instance down. With `keep_voice` the voice session survives for the next instance in this guild."""
+        self.prefetcher.clear()
+        self.np_renderer.cancel()
+        self.eq_renderer.cancel()
         if self.player_task: 
             self.player_task.cancel()
         if self.update_task: 
             self.update_task.cancel()
         
-        while not self.queue.empty():
-            try:
-                self.queue.get_nowait()
-            except asyncio.QueueEmpty:
-                continue
+        self.queue.clear()
 
         if self.voice_client:
             if self.voice_client.is_playing(): 
                 self.voice_client.stop()
-            try: 
-                await self.voice_client.disconnect(force=True)
-            except Exception: 
-                pass
+            if not keep_voice:
+                await voice_sessions.disconnect(self.guild)
+            self.voice_client = None
+        voice_sessions.first_audio_pending.pop(self.instance_id, None)
+        self.clock.stop()
+        await self.broadcast_clock()
+        self.cog.websocket_server.broadcaster.forget_instance(self.instance_id)
         
         if self.now_playing_message:
             try:
@@ -2439,13 +2239,29 @@ class MusicInstance:
                 await self.send_or_edit_now_playing()
 
     async def send_or_edit_now_playing(self):
+        """Requests a now-playing refresh; bursts of requests are merged into one edit."""
         if not self.voice_client or not self.voice_client.is_connected():
             return
+        self.np_renderer.request()
+
+    async def _render_now_playing(self) -> bool:
+        """Renders and sends the now-playing message. Returns False if nothing visible changed."""
+        if not self.voice_client or not self.voice_client.is_connected():
+            return False
 
         embed = self.create_now_playing_embed()
-        view = PlayerControlView(self)
+        if self.control_view is None:
+            self.control_view = PlayerControlView(self)
+        view = self.control_view
         view.update_button_states()
 
+        signature = json.dumps({
+            "embed": embed.to_dict(),
+            "buttons": [(getattr(item, 'custom_id', None), item.disabled, str(getattr(item, 'style', '')), getattr(item, 'label', None)) for item in view.children]
+        }, sort_keys=True, default=str)
+        if self.now_playing_message and signature == self.now_playing_signature:
+            return False
+
         try:
             if self.now_playing_message:
                 await self.now_playing_message.edit(content=None, embed=embed, view=view)
@@ -2457,8 +2273,17 @@ class MusicInstance:
                 self.now_playing_message = await self.text_channel.send(embed=embed, view=view)
             except Exception as e:
                 self.bot.add_error(f"Failed to re-send NP message in {self.guild.name}: {e}")
+                return False
+        except discord.HTTPException as e:
+            if e.status == 429:
+                raise  # Let the renderer back off
+            self.bot.add_error(f"Unexpected error updating NP message in {self.guild.name}: {e}")
+            return False
         except Exception as e:
             self.bot.add_error(f"Unexpected error updating NP message in {self.guild.name}: {e}")
+            return False
+        self.now_playing_signature = signature
+        return True
 
 
     def create_now_playing_embed(self) -> discord.Embed:
@@ -2477,15 +2302,14 @@ class MusicInstance:
         if self.current_song.thumbnail:
             embed.set_thumbnail(url=self.current_song.thumbnail)
         
-        elapsed = self.bot.loop.time() - self.current_song.start_time
-        remaining = self.current_song.duration - elapsed
+        remaining = max(0, (self.current_song.duration or 0) - self.clock.position())
         
         embed.add_field(name="📺 Channel", value=f"`{self.current_song.uploader}`", inline=True)
         embed.add_field(name="👤 Requested by", value=self.current_song.requester.mention, inline=True)
         embed.add_field(name="⏰ Time Left", value=f"`{format_duration(remaining)}`", inline=True)
         embed.add_field(name="🎧 Current DJ", value=self.current_dj.mention, inline=True)
 
-        queue_list = list(self.queue._queue)
+        queue_list = self.queue.snapshot()
         if queue_list:
             songs_per_page = 5
             total_pages = (len(queue_list) + songs_per_page - 1) // songs_per_page
@@ -2521,60 +2345,25 @@ class MusicInstance:
                 "duration": self.current_song.duration,
                 "webpage_url": self.current_song.webpage_url,
                 "thumbnail": self.current_song.thumbnail,
-                "current_time": 0,
-                "is_playing": True,
-                "start_time": self.start_time.isoformat() if self.start_time else None
+                "current_time": self.clock.position(),
+                "is_playing": self.clock.running,
+                "clock": self.clock.anchor(),
+                "features": audio_features.get(song_key(self.current_song.data))
             }
         }
         
         await self.cog.websocket_server.broadcast_to_instance(self.instance_id, message)
     
-    async def broadcast_pause_state(self, is_paused: bool):
-        """Broadcast pause/resume state to Activity clients"""
-        current_time = 0
-        if self.current_song and self.start_time:
-            elapsed = (datetime.datetime.now() - self.start_time).total_seconds()
-            current_time = max(0, elapsed)
-        
-        message = {
-            "type": "PLAYBACK_STATE",
-            "data": {
-                "is_playing": not is_paused,
-                "current_time": current_time
-            }
-        }
-        
-        await self.cog.websocket_server.broadcast_to_instance(self.instance_id, message)
+    async def broadcast_clock(self):
+        """Push a new clock anchor to Activity clients. Only needed on discontinuities; clients interpolate in between."""
+        await self.cog.websocket_server.broadcast_to_instance(self.instance_id, {
+            "type": "PLAYBACK_CLOCK",
+            "data": self.clock.anchor()
+        })
     
     async def broadcast_queue_update(self):
-        """Broadcast queue updates to Activity clients"""
-        queue_list = []
-        temp_queue = []
-        
-        # Get items from queue without removing them
-        while not self.queue.empty():
-            try:
-                item = self.queue.get_nowait()
-                temp_queue.append(item)
-                queue_list.append({
-                    "title": item.get("title", "Unknown"),
-                    "uploader": item.get("uploader", "Unknown"),
-                    "duration": item.get("duration"),
-                    "webpage_url": item.get("webpage_url", "#")
-                })
-            except asyncio.QueueEmpty:
-                break
-        
-        # Put items back in queue
-        for item in temp_queue:
-            await self.queue.put(item)
-        
-        message = {
-            "type": "PLAYLIST_UPDATED",
-            "data": {"queue": queue_list}
-        }
-        
-        await self.cog.websocket_server.broadcast_to_instance(self.instance_id, message)
+        """Push any queue changes Activity clients haven't seen yet as a delta"""
+        self.cog.websocket_server.broadcaster.flush_queue(self.instance_id, self.queue)
 
 class JumpToTrackModal(discord.ui.Modal, title="Jump to Track"):
     track_number = discord.ui.TextInput(
@@ -2594,22 +2383,13 @@ class JumpToTrackModal(discord.ui.Modal, title="Jump to Track"):
         except ValueError:
             return await interaction.response.send_message("Please enter a valid number.", ephemeral=True)
 
-        queue_list = list(self.player.queue._queue)
-        if not (1 <= track_num <= len(queue_list)):
-            return await interaction.response.send_message(f"Invalid track number. Please enter a number between 1 and {len(queue_list)}.", ephemeral=True)
+        queue_size = self.player.queue.qsize()
+        if not (1 <= track_num <= queue_size):
+            return await interaction.response.send_message(f"Invalid track number. Please enter a number between 1 and {queue_size}.", ephemeral=True)
 
         await interaction.response.send_message(f"Jumping to track #{track_num}...", ephemeral=True)
 
-        track_index = track_num - 1
-        
-        track_to_play = queue_list[track_index]
-        
-        while not self.player.queue.empty():
-            self.player.queue.get_nowait()
-
-        await self.player.queue.put(track_to_play)
-        for track in queue_list[track_index + 1:]:
-            await self.player.queue.put(track)
+        self.player.queue.jump_to(track_num - 1)
 
         if self.player.voice_client and self.player.voice_client.is_playing():
             self.player.voice_client.stop()
@@ -2646,37 +2426,6 @@ class EnhancedLyricsView(discord.ui.View):
         self.artist_name = ""
         self.track_art_url = ""
         
-    def format_lyrics_sections(self, lyrics_text: str) -> str:
-        import re
-        
-        section_patterns = {
-            r'\[Verse.*?\]': '🎤 **Verse**',
-            r'\[Chorus.*?\]': '🎵 **Chorus**', 
-            r'\[Bridge.*?\]': '🌉 **Bridge**',
-            r'\[Intro.*?\]': '🚀 **Intro**',
-            r'\[Outro.*?\]': '🏁 **Outro**',
-            r'\[Pre-Chorus.*?\]': '🎶 **Pre-Chorus**',
-            r'\[Hook.*?\]': '🪝 **Hook**',
-            r'\[Interlude.*?\]': '🎼 **Interlude**',
-            r'\[Refrain.*?\]': '🔄 **Refrain**'
-        }
-        
-        formatted_lyrics = lyrics_text
-        
-        formatted_lyrics = re.sub(r'\n\s*\n\s*\n+', '\n\n', formatted_lyrics)
-        formatted_lyrics = re.sub(r'^\s+|\s+$', '', formatted_lyrics, flags=re.MULTILINE)
-        
-        for pattern, replacement in section_patterns.items():
-            formatted_lyrics = re.sub(pattern, f'\n{replacement}\n', formatted_lyrics, flags=re.IGNORECASE)
-        
-        formatted_lyrics = re.sub(r'\n{3,}', '\n\n', formatted_lyrics)
-        
-        formatted_lyrics = re.sub(r'(\*\*[^*]+\*\*)\n([^\n])', r'\1\n\n\2', formatted_lyrics)
-        
-        formatted_lyrics = re.sub(r'\[([^\]]*?)\]', r'**\1**', formatted_lyrics)
-        
-        return formatted_lyrics.strip()
-
     async def fetch_and_display_lyrics(self, interaction: discord.Interaction):
         if not self.music_cog.genius_api_key:
             return await interaction.followup.send("🚫 Lyrics feature is not configured. Please provide a Genius API key.", ephemeral=True)
@@ -2685,98 +2434,34 @@ class EnhancedLyricsView(discord.ui.View):
             if self.search_query:
                 search_query = self.music_cog.clean_query(self.search_query)
                 original_query = self.search_query
-            elif self.song_data:
-                title = self.music_cog.clean_track_title(self.song_data.get('title', ''))
-                artist = self.music_cog.clean_artist_name(self.song_data.get('uploader', ''))
-                original_query = f"{artist} - {title}"
-                search_query = self.music_cog.clean_query(original_query)
+                cache_key = normalize_song_key("", search_query)
             else:
-                # Find active music instance for this guild
-                player = None
-                for instance in self.music_cog.instances.values():
-                    if instance.guild.id == interaction.guild.id and instance.current_song:
-                        player = instance
-                        break
-                if not player or not player.current_song:
-                    return await interaction.followup.send("🎵 Nothing is currently playing. Use this command with a search query to find lyrics!", ephemeral=True)
-                
-                title = self.music_cog.clean_track_title(player.current_song.title)
-                artist = self.music_cog.clean_artist_name(player.current_song.uploader)
+                if self.song_data:
+                    raw_title, raw_artist = self.song_data.get('title', ''), self.song_data.get('uploader', '')
+                else:
+                    # Find active music instance for this guild
+                    player = self.music_cog.instances.find(guild_id=interaction.guild.id, playing=True)
+                    if not player or not player.current_song:
+                        return await interaction.followup.send("🎵 Nothing is currently playing. Use this command with a search query to find lyrics!", ephemeral=True)
+                    raw_title, raw_artist = player.current_song.title, player.current_song.uploader
+
+                title = self.music_cog.clean_track_title(raw_title)
+                artist = self.music_cog.clean_artist_name(raw_artist)
                 original_query = f"{artist} - {title}"
                 search_query = self.music_cog.clean_query(original_query)
+                cache_key = normalize_song_key(artist, title)
 
-            async with self.music_cog.session.get(
-                "https://api.genius.com/search",
-                params={"q": search_query},
-                headers={"Authorization": f"Bearer {self.music_cog.genius_api_key}"},
-                timeout=10
-            ) as resp:
-                if resp.status != 200:
-                    return await interaction.followup.send(f"🚫 Genius API error ({resp.status}). Try again later.", ephemeral=True)
-                data = await resp.json()
-
-            hits = data.get("response", {}).get("hits", [])
-            if not hits:
-                return await interaction.followup.send(f"🔍 No lyrics found for `{original_query}`. Try a different search!", ephemeral=True)
-
-            best_match = hits[0]["result"]
-            query_words = set(search_query.lower().split())
-            for hit in hits:
-                result = hit["result"]
-                hit_artist = self.music_cog.clean_artist_name(result["primary_artist"]["name"])
-                hit_title = self.music_cog.clean_track_title(result["title"])
-                combined = f"{hit_artist} {hit_title}"
-                if len(query_words.intersection(set(combined.lower().split()))) >= 2:
-                    best_match = result
-                    break
-
-            self.song_title = best_match["full_title"]
-            self.song_url = best_match["url"]
-            self.artist_name = best_match["primary_artist"]["name"]
-            self.track_art_url = best_match.get("song_art_image_thumbnail_url") or best_match.get("song_art_image_url")
-
-            async with self.music_cog.session.get(self.song_url, timeout=15) as resp:
-                html_content = await resp.text()
-
-            from bs4 import BeautifulSoup
-            soup = BeautifulSoup(html_content, 'html.parser')
-            lyrics_divs = soup.find_all("div", attrs={"data-lyrics-container": "true"})
-
-            if not lyrics_divs:
-                return await interaction.followup.send("🚫 Couldn't extract lyrics from the page.", ephemeral=True)
-
-            all_lines = []
-            for div in lyrics_divs:
-                text = div.get_text(separator="\n").strip()
-                if text:
-                    all_lines.extend(line.strip() for line in text.splitlines() if line.strip())
-
-            lyrics_text = "\n".join(all_lines)
-            
-            first_marker_match = re.search(r'\[(Verse|Chorus|Intro|Outro|Bridge|Hook|Pre-Chorus|Refrain).*?\]', lyrics_text, re.IGNORECASE)
-            if first_marker_match:
-                lyrics_text = lyrics_text[first_marker_match.start():]
-            
-            lyrics_text = self.format_lyrics_sections(lyrics_text)
-
-            self.pages = []
-            current_page = ""
-            MAX_CHARS = 1500
-
-            lines = lyrics_text.splitlines()
-            for line in lines:
-                if len(current_page) + len(line) + 1 > MAX_CHARS:
-                    if current_page.strip():
-                        self.pages.append(current_page.strip())
-                    current_page = line + "\n"
-                else:
-                    current_page += line + "\n"
-
-            if current_page.strip():
-                self.pages.append(current_page.strip())
+            try:
+                result = await lyrics_cache.get_or_fetch(cache_key, lambda: self._fetch_from_genius(search_query, original_query))
+            except LyricsError as e:
+                return await interaction.followup.send(str(e), ephemeral=True)
 
-            if not self.pages:
-                return await interaction.followup.send("🚫 No lyrics content found.", ephemeral=True)
+            self.song_title = result.title
+            self.song_url = result.url
+            self.artist_name = result.artist
+            self.track_art_url = result.art_url
+            self.pages = list(result.pages)
+            self.current_page = 0
 
             self.update_buttons()
             
@@ -2787,6 +2472,54 @@ class EnhancedLyricsView(discord.ui.View):
             self.music_cog.bot.add_error(f"Enhanced lyrics error: {e}")
             await interaction.followup.send("❌ Failed to fetch lyrics. Please try again.", ephemeral=True)
 
+    async def _fetch_from_genius(self, search_query: str, original_query: str) -> LyricsResult:
+        """Genius search plus page scrape; only runs on a lyrics cache miss."""
+        async with self.music_cog.session.get(
+            "https://api.genius.com/search",
+            params={"q": search_query},
+            headers={"Authorization": f"Bearer {self.music_cog.genius_api_key}"},
+            timeout=10
+        ) as resp:
+            if resp.status != 200:
+                raise LyricsError(f"🚫 Genius API error ({resp.status}). Try again later.")
+            data = await resp.json()
+
+        hits = data.get("response", {}).get("hits", [])
+        if not hits:
+            raise LyricsError(f"🔍 No lyrics found for `{original_query}`. Try a different search!")
+
+        best_match = hits[0]["result"]
+        query_words = set(search_query.lower().split())
+        for hit in hits:
+            result = hit["result"]
+            hit_artist = self.music_cog.clean_artist_name(result["primary_artist"]["name"])
+            hit_title = self.music_cog.clean_track_title(result["title"])
+            combined = f"{hit_artist} {hit_title}"
+            if len(query_words.intersection(set(combined.lower().split()))) >= 2:
+                best_match = result
+                break
+
+        # A different spelling of a song we already scraped
+        cached = await lyrics_cache.get_by_url(best_match["url"])
+        if cached:
+            return cached
+
+        async with self.music_cog.session.get(best_match["url"], timeout=15) as resp:
+            html_content = await resp.text()
+
+        # BeautifulSoup is pure Python and slow on Genius pages; keep it off the event loop
+        pages = await asyncio.get_running_loop().run_in_executor(None, extract_genius_pages, html_content)
+        if not pages:
+            raise LyricsError("🚫 Couldn't extract lyrics from the page.")
+
+        return LyricsResult(
+            title=best_match["full_title"],
+            artist=best_match["primary_artist"]["name"],
+            url=best_match["url"],
+            art_url=best_match.get("song_art_image_thumbnail_url") or best_match.get("song_art_image_url") or "",
+            pages=pages
+        )
+
     def create_lyrics_embed(self) -> discord.Embed:
         embed = discord.Embed(
             title=f"🎤 {self.song_title}",
@@ -2897,14 +2630,14 @@ class PlayerControlView(discord.ui.View):
         
         self.previous.disabled = not (
             (hasattr(self.instance, 'current_playlist_info') and self.instance.current_playlist_info and self.instance.playback_index > 0) or
-            (hasattr(self.instance, 'history') and self.instance.db and len(self.instance.history) > 0)
+            len(self.instance.history) > 0
         )
         
         self.jump.disabled = self.instance.queue.empty() and getattr(self.instance, 'playback_index', -1) == -1
         
-        queue_list = list(self.instance.queue._queue)
+        queue_size = self.instance.queue.qsize()
         songs_per_page = 5
-        total_pages = (len(queue_list) + songs_per_page - 1) // songs_per_page if queue_list else 1
+        total_pages = (queue_size + songs_per_page - 1) // songs_per_page if queue_size else 1
         self.queue_prev.disabled = (self.instance.queue_page == 0)
         self.queue_next.disabled = (self.instance.queue_page >= total_pages - 1)
 
@@ -2936,9 +2669,8 @@ class PlayerControlView(discord.ui.View):
     @discord.ui.button(label="▶️", style=discord.ButtonStyle.secondary, custom_id="queue_next", row=0, emoji=None) 
     async def queue_next(self, interaction: discord.Interaction, button: discord.ui.Button):
         await interaction.response.defer()
-        queue_list = list(self.instance.queue._queue)
         songs_per_page = 5
-        total_pages = (len(queue_list) + songs_per_page - 1) // songs_per_page
+        total_pages = (self.instance.queue.qsize() + songs_per_page - 1) // songs_per_page
         if self.instance.queue_page < total_pages - 1:
             self.instance.queue_page += 1
         await self.instance.send_or_edit_now_playing()
@@ -2954,7 +2686,7 @@ class PlayerControlView(discord.ui.View):
             self.instance.playback_index -= 1
             song_to_play_data = self.instance.current_playlist_tracks[self.instance.playback_index]
             source_type = "playlist"
-        elif hasattr(self.instance, 'history') and self.instance.db and len(self.instance.history) > 0:
+        elif self.instance.history:
             song_to_play_data = self.instance.history[-1]  # Get last song from history
             self.instance.history.pop()  # Remove it from history
             source_type = "history"
@@ -2965,32 +2697,13 @@ class PlayerControlView(discord.ui.View):
         if not song_to_play_data:
             return await interaction.followup.send("Could not retrieve previous song data.", ephemeral=True)
 
-        if self.instance.voice_client and (self.instance.voice_client.is_playing() or self.instance.voice_client.is_paused()):
-            self.instance.voice_client.stop()
-            timeout_seconds = 5 
-            start_time = self.instance.bot.loop.time()
-            while (self.instance.voice_client.is_playing() or self.instance.voice_client.is_paused()) and (self.instance.bot.loop.time() - start_time < timeout_seconds):
-                await asyncio.sleep(0.1) 
-            
-            if self.instance.voice_client.is_playing() or self.instance.voice_client.is_paused():
-                self.instance.bot.add_error(f"Voice client in {self.instance.guild.name} did not stop in time for previous song.")
-                await interaction.followup.send("Failed to stop current song. Please try again.", ephemeral=True)
-                return
-        
-        if self.instance.voice_client and self.instance.voice_client.is_connected():
-            try:
-                current_vc_channel = self.instance.voice_client.channel
-                await self.instance.voice_client.disconnect(force=True)
-                self.instance.voice_client = await current_vc_channel.connect(self_deaf=True)
-                await asyncio.sleep(0.2)
-            except Exception as e:
-                self.instance.bot.add_error(f"Error disconnecting/reconnecting voice client for previous song: {e}\n{traceback.format_exc()}")
-                await interaction.followup.send("Failed to reset voice client for previous song. Please try again.", ephemeral=True)
-                return
-
-        while not self.instance.queue.empty():
-            self.instance.queue.get_nowait()
-        await self.instance.queue.put(song_to_play_data)
+        # Play the previous song next without dropping what's already queued,
+        # then end the current track so the player loop picks it up
+        self.instance.queue.insert(0, song_to_play_data)
+        if not await self.instance.stop_current_track():
+            self.instance.bot.add_error(f"Voice client in {self.instance.guild.name} did not stop in time for previous song.")
+            await interaction.followup.send("Failed to stop current song. Please try again.", ephemeral=True)
+            return
         
         self.instance.start_player_loop()
         await self.instance.send_or_edit_now_playing()
@@ -3001,11 +2714,9 @@ class PlayerControlView(discord.ui.View):
     async def pause_resume(self, interaction: discord.Interaction, button: discord.ui.Button):
         await interaction.response.defer()
         if self.instance.voice_client:
-            if self.instance.voice_client.is_paused(): 
-                self.instance.voice_client.resume()
+            if await self.instance.resume(): 
                 await interaction.followup.send("Resumed playback.", ephemeral=True)
-            elif self.instance.voice_client.is_playing(): 
-                self.instance.voice_client.pause()
+            elif await self.instance.pause(): 
                 await interaction.followup.send("Paused playback.", ephemeral=True)
             else:
                 await interaction.followup.send("No song is currently playing.", ephemeral=True)
@@ -3057,36 +2768,24 @@ class PlayerControlView(discord.ui.View):
         playlist_name = player.current_playlist_info['name']
 
         try:
-            async with player.cog.bot.db.execute("SELECT track_data FROM playlists WHERE playlist_id = ?", (playlist_id,)) as cursor:
-                playlist_row = await cursor.fetchone()
-            
-            if not playlist_row:
+            store = player.cog.bot.playlists
+            if not await store.get(playlist_id):
                 player.current_playlist_info = None
                 await player.send_or_edit_now_playing()
                 return await interaction.followup.send("The original playlist could not be found.", ephemeral=True)
             
-            tracks = json.loads(playlist_row[0])
+            tracks = await store.tracks(playlist_id)
             if not tracks:
                 return await interaction.followup.send(f"Playlist '{playlist_name}' is empty and cannot be restarted.", ephemeral=True)
             
-            while not player.queue.empty():
-                player.queue.get_nowait()
-
             for track in tracks:
                 if track:
                     track['requester'] = interaction.user
-                    await player.queue.put(track)
-            
-            if player.voice_client and (player.voice_client.is_playing() or player.voice_client.is_paused()):
-                player.voice_client.stop()
-                timeout_seconds = 5 
-                start_time = player.bot.loop.time()
-                while (player.voice_client.is_playing() or player.voice_client.is_paused()) and (player.bot.loop.time() - start_time < timeout_seconds):
-                    await asyncio.sleep(0.1) 
-                
-                if player.voice_client.is_playing() or player.voice_client.is_paused():
-                    player.bot.add_error(f"Voice client in {player.guild.name} did not stop in time for playlist restart.")
-                    await interaction.followup.send("Failed to stop current song for playlist restart. Attempting to play from queue.", ephemeral=True)
+            player.queue.replace(track for track in tracks if track)
+            
+            if not await player.stop_current_track():
+                player.bot.add_error(f"Voice client in {player.guild.name} did not stop in time for playlist restart.")
+                await interaction.followup.send("Failed to stop current song for playlist restart. Attempting to play from queue.", ephemeral=True)
             
             if hasattr(player, 'playback_index'):
                 player.playback_index = -1
@@ -3118,26 +2817,35 @@ class PlaylistModal(discord.ui.Modal, title="Create New Playlist"):
         )
 
 class QueuePaginatorView(discord.ui.View):
-    def __init__(self, interaction: discord.Interaction, tracks: list, playlist_name: str, bot_user):
+    """Pages through a saved playlist, reading one page of track rows at a time."""
+
+    def __init__(self, interaction: discord.Interaction, playlist_name: str, bot_user, total_tracks: int,
+                 fetch_page: Callable[[int, int], Awaitable[List[Dict]]]):
         super().__init__(timeout=180)
         self.interaction = interaction
-        self.tracks = tracks
         self.playlist_name = playlist_name
         self.bot_user = bot_user
+        self.total_tracks = total_tracks
+        self.fetch_page = fetch_page
+        self.pages: Dict[int, List[Dict]] = {}
         self.current_page = 0
         self.songs_per_page = 10
 
+    @property
+    def total_pages(self) -> int:
+        return max(1, (self.total_tracks + self.songs_per_page - 1) // self.songs_per_page)
+
     async def create_embed(self) -> discord.Embed:
         start_index = self.current_page * self.songs_per_page
-        end_index = start_index + self.songs_per_page
-        
-        queue_slice = self.tracks[start_index:end_index]
-        total_pages = (len(self.tracks) + self.songs_per_page - 1) // self.songs_per_page
+        if self.current_page not in self.pages:
+            self.pages[self.current_page] = await self.fetch_page(start_index, self.songs_per_page)
+        queue_slice = self.pages[self.current_page]
+        total_pages = self.total_pages
         
         embed = discord.Embed(
             title=f"📋 Queue for '{self.playlist_name}'", 
             color=0x5865F2,
-            description=f"🎵 **{len(self.tracks)}** total songs in this playlist"
+            description=f"🎵 **{self.total_tracks}** total songs in this playlist"
         )
         if queue_slice:
             track_list = [f"`{start_index + i + 1}.` **{s.get('title', 'Unknown Title')}**" for i, s in enumerate(queue_slice)]
@@ -3149,8 +2857,7 @@ class QueuePaginatorView(discord.ui.View):
 
     async def update_message(self):
         self.children[0].disabled = self.current_page == 0
-        total_pages = (len(self.tracks) + self.songs_per_page - 1) // self.songs_per_page
-        self.children[1].disabled = self.current_page >= total_pages - 1
+        self.children[1].disabled = self.current_page >= self.total_pages - 1
         
         embed = await self.create_embed()
         await self.interaction.edit_original_response(embed=embed, view=self)
@@ -3165,15 +2872,14 @@ class QueuePaginatorView(discord.ui.View):
     @discord.ui.button(label="▶️", style=discord.ButtonStyle.secondary)
     async def next_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         await interaction.response.defer()
-        total_pages = (len(self.tracks) + self.songs_per_page - 1) // self.songs_per_page
-        if self.current_page < total_pages - 1:
+        if self.current_page < self.total_pages - 1:
             self.current_page += 1
             await self.update_message()
 
 class MusicCog(commands.Cog, name="music"):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.instances: Dict[int, MusicInstance] = {}  # Key: voice_channel_id, Value: MusicInstance
+        self.instances: InstanceRegistry = InstanceRegistry()  # Key: voice_channel_id, Value: MusicInstance (also indexed by guild)
         self.MAX_INSTANCES_PER_GUILD = 5
         self.genius_api_key = GENIUS_API_KEY
         self.session = aiohttp.ClientSession()
@@ -3195,6 +2901,14 @@ class MusicCog(commands.Cog, name="music"):
 
     async def cog_load(self):
         """Initialize the cog and start the WebSocket server"""
+        if music_processor:
+            await music_processor.start()
+        await song_history.start(
+            getattr(self.bot, 'db', None), firestore_db=self.db,
+            firestore_root=f"artifacts/{self.bot.user.id}" if self.bot.user else None
+        )
+        await audio_features.start(getattr(self.bot, 'db', None))
+        
         # Check if local WebSocket server should be disabled (for production with external domain)
         if os.getenv("DISABLE_LOCAL_WEBSOCKET", "false").lower() == "true":
             self.bot.add_log("🌐 Local WebSocket server disabled - using external domain")
@@ -3202,31 +2916,20 @@ class MusicCog(commands.Cog, name="music"):
             return
             
         try:
-            self.bot.add_log("🔧 Starting Activity WebSocket server...")
-            # Try 0.0.0.0 first to avoid localhost binding issues
-            await self.websocket_server.start_server(host="0.0.0.0", port=8765)
-            self.bot.add_log("✅ Activity WebSocket server started successfully on 0.0.0.0:8765")
+            await self.websocket_server.start_server()
         except Exception as e:
-            self.bot.add_error(f"❌ Failed to start Activity WebSocket server on 0.0.0.0: {e}")
-            # Try localhost as fallback
-            try:
-                self.bot.add_log("🔄 Trying localhost fallback...")
-                await self.websocket_server.start_server(host="localhost", port=8765)
-                self.bot.add_log("✅ Activity WebSocket server started on localhost:8765")
-            except Exception as e2:
-                self.bot.add_error(f"❌ Localhost also failed: {e2}")
-                # Try alternative port
-                try:
-                    self.bot.add_log("🔄 Trying alternative port 8766...")
-                    await self.websocket_server.start_server(host="0.0.0.0", port=8766)
-                    self.bot.add_log("✅ Activity WebSocket server started on alternative port 8766")
-                except Exception as e3:
-                    self.bot.add_error(f"❌ Alternative port also failed: {e3}")
-                    self.bot.add_error("💡 Please check if ports 8765/8766 are available")
+            self.bot.add_error(f"❌ Failed to start Activity WebSocket server: {e}")
     
-    def cog_unload(self):
+    async def cog_unload(self):
         self.bot.loop.create_task(self.session.close())
+        if music_processor:
+            # Awaited so the reloaded cog's start() doesn't race a stop() still in flight
+            await music_processor.stop()
+        audio_cache.cancel_fills()
+        audio_features.stop()
         self.bot.loop.create_task(self.websocket_server.stop_server())
+        # Awaited so buffered history is written before the connection closes
+        await song_history.stop()
 
     async def get_instance(self, interaction: discord.Interaction) -> Optional[MusicInstance]:
         if not interaction.user.voice or not interaction.user.voice.channel:
@@ -3264,18 +2967,13 @@ class MusicCog(commands.Cog, name="music"):
                 return instance
 
         # Clean up any stale instances in this guild
-        stale_instance_ids = []
-        for inst_id, inst in self.instances.items():
-            if inst.guild.id == interaction.guild.id:
-                if not inst.voice_client or not inst.voice_client.is_connected():
-                    stale_instance_ids.append(inst_id)
-        
-        for inst_id in stale_instance_ids:
-            self.bot.add_log(f"Removing stale instance {inst_id}")
-            del self.instances[inst_id]
+        for inst in self.instances.for_guild(interaction.guild.id):
+            if not inst.voice_client or not inst.voice_client.is_connected():
+                self.bot.add_log(f"Removing stale instance {inst.instance_id}")
+                del self.instances[inst.instance_id]
 
         # Check instance limit per guild
-        guild_instances = [inst for inst in self.instances.values() if inst.guild.id == interaction.guild.id]
+        guild_instances = self.instances.for_guild(interaction.guild.id)
         if len(guild_instances) >= self.MAX_INSTANCES_PER_GUILD:
             await interaction.followup.send(f"❌ Maximum of {self.MAX_INSTANCES_PER_GUILD} music instances per server reached.", ephemeral=True)
             return None
@@ -3298,59 +2996,26 @@ class MusicCog(commands.Cog, name="music"):
                 del self.instances[vc_channel.id]
             return None
 
-        # Connect to voice channel with multiple retry attempts
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                # Only clean up voice clients that are NOT in the target channel
-                for existing_vc in self.bot.voice_clients:
-                    if existing_vc.guild.id == interaction.guild.id and existing_vc.channel.id != vc_channel.id:
-                        try:
-                            await existing_vc.disconnect(force=True)
-                            self.bot.add_log(f"Disconnected stale voice client in {existing_vc.channel.name} (moving to {vc_channel.name})")
-                        except:
-                            pass
-                
-                # Check if we're already connected to the target channel
-                existing_connection = None
-                for existing_vc in self.bot.voice_clients:
-                    if existing_vc.guild.id == interaction.guild.id and existing_vc.channel.id == vc_channel.id:
-                        if existing_vc.is_connected():
-                            existing_connection = existing_vc
-                            self.bot.add_log(f"Reusing existing voice connection in {vc_channel.name}")
-                            break
-                
-                if existing_connection:
-                    instance.voice_client = existing_connection
-                else:
-                    # Small delay to ensure cleanup completes
-                    await asyncio.sleep(0.3)
-                    
-                    vc = await asyncio.wait_for(vc_channel.connect(self_deaf=True), timeout=15.0)
-                    instance.voice_client = vc
-                    self.bot.add_log(f"✓ Created new voice connection in {vc_channel.name}")
-                
-                self.bot.add_log(f"✓ Music instance ready in {vc_channel.name} ({interaction.guild.name}) - DJ: {interaction.user} (attempt {attempt + 1})")
-                break
-            except asyncio.TimeoutError:
-                if attempt == max_retries - 1:
-                    await interaction.followup.send("⏱️ Connection to voice channel timed out after multiple attempts. Please try again.", ephemeral=True)
-                    if vc_channel.id in self.instances:
-                        del self.instances[vc_channel.id]
-                    return None
-                else:
-                    self.bot.add_log(f"Voice connection attempt {attempt + 1} timed out, retrying...")
-                    await asyncio.sleep(1.0)
-            except Exception as e:
-                self.bot.add_error(f"Failed to connect to voice channel {vc_channel.name} (attempt {attempt + 1}): {e}")
-                if attempt == max_retries - 1:
-                    await interaction.followup.send(f"❌ Failed to connect to {vc_channel.mention} after {max_retries} attempts. Error: {str(e)}", ephemeral=True)
-                    if vc_channel.id in self.instances:
-                        del self.instances[vc_channel.id]
-                    return None
-                else:
-                    self.bot.add_log(f"Connection attempt {attempt + 1} failed, retrying...")
-                    await asyncio.sleep(1.0)
+        # A guild has a single voice connection; an instance in another channel hands it over
+        session = voice_sessions.get(interaction.guild)
+        if session is not None and session.channel.id != vc_channel.id:
+            previous = self.instances.get(session.channel.id)
+            if previous:
+                self.bot.add_log(f"Moving voice session from {session.channel.name} to {vc_channel.name}")
+                await previous.stop_player(keep_voice=True)
+
+        try:
+            instance.voice_client = await voice_sessions.connect(vc_channel)
+            self.bot.add_log(f"✓ Music instance ready in {vc_channel.name} ({interaction.guild.name}) - DJ: {interaction.user}")
+        except asyncio.TimeoutError:
+            await interaction.followup.send("⏱️ Connection to voice channel timed out after multiple attempts. Please try again.", ephemeral=True)
+            self.instances.pop(vc_channel.id, None)
+            return None
+        except Exception as e:
+            self.bot.add_error(f"Failed to connect to voice channel {vc_channel.name}: {e}")
+            await interaction.followup.send(f"❌ Failed to connect to {vc_channel.mention}. Error: {str(e)}", ephemeral=True)
+            self.instances.pop(vc_channel.id, None)
+            return None
         
         return instance
 
@@ -3369,17 +3034,16 @@ class MusicCog(commands.Cog, name="music"):
         if member.bot: 
             return
 
-        # Handle human voice state changes
-        for channel_id, instance in list(self.instances.items()):
-            if not instance.voice_client:
-                continue
-                
-            # Check if member left this instance's voice channel
-            if before.channel == instance.voice_channel and after.channel != instance.voice_channel:
+        # Handle human voice state changes; instances are keyed by voice channel
+        if before.channel == after.channel:
+            return
+        if before.channel:
+            instance = self.instances.get(before.channel.id)
+            if instance and instance.voice_client:
                 await self._handle_member_left_channel(instance, member)
-            
-            # Check if member joined this instance's voice channel
-            elif after.channel == instance.voice_channel and before.channel != instance.voice_channel:
+        if after.channel:
+            instance = self.instances.get(after.channel.id)
+            if instance and instance.voice_client:
                 await self._handle_member_joined_channel(instance, member)
 
     async def _handle_member_left_channel(self, instance: MusicInstance, member: discord.Member):
@@ -3438,19 +3102,101 @@ class MusicCog(commands.Cog, name="music"):
             self.bot.add_error("Database connection not available for playlist autocomplete.")
             return []
 
-        query = "SELECT playlist_id, name FROM playlists WHERE guild_id = ? AND (is_public = 1 OR creator_id = ?)"
         try:
-            async with self.bot.db.execute(query, (interaction.guild.id, interaction.user.id)) as cursor:
-                seen_playlists = set()
-                async for pid, name in cursor:
-                    if pid not in seen_playlists and current.lower() in name.lower():
-                        choices.append(app_commands.Choice(name=name, value=str(pid)))
-                        seen_playlists.add(pid)
-                        if len(choices) >= 25: break
+            matches = await self.bot.playlists.search(interaction.guild.id, interaction.user.id, current, limit=25)
+            choices = [app_commands.Choice(name=name, value=str(pid)) for pid, name in matches]
         except Exception as e:
             self.bot.add_error(f"Error in playlist_autocomplete: {e}")
         return choices
 
+    @staticmethod
+    def is_playlist_query(query: str) -> bool:
+        """True for playlist/album URLs worth resolving entry by entry."""
+        lowered = query.lower()
+        return lowered.startswith(("http://", "https://")) and any(marker in lowered for marker in ('list=', '/playlist', '/sets/', '/album/'))
+
+    async def queue_sources(self, instance: MusicInstance, urls: List[str], requester: discord.Member) -> asyncio.Event:
+        """
+        Queues a known list of track URLs (saved playlists) in order. They resolve
+        in parallel on the background processor's fair scheduler; this returns
+        once the first one is in the queue, with an event for the rest.
+        """
+        instance.start_player_loop()
+        if not music_processor:
+            # No background processor - queue placeholders for the player loop to resolve
+            instance.queue.extend({'webpage_url': url, 'title': url, 'requester': requester} for url in urls)
+            finished = asyncio.Event()
+            finished.set()
+            return finished
+
+        async def on_ready(index: int, result: Dict):
+            if instance.instance_id not in self.instances:
+                return  # Instance was stopped while we were resolving
+            entry = dict(result)
+            if not entry.get('webpage_url'):
+                entry['webpage_url'] = urls[index]
+            entry['requester'] = requester
+            await instance.queue.put(entry)
+
+        finished = await music_processor.resolve_in_order(urls, requester.id, instance.guild.id, on_ready)
+        instance.pending_resolves = [event for event in instance.pending_resolves if not event.is_set()]
+        instance.pending_resolves.append(finished)
+        return finished
+
+    async def queue_streaming(self, instance: MusicInstance, query: str, requester: discord.Member) -> Optional[Tuple[str, int, bool]]:
+        """
+        Flat-lists a search or playlist and queues lightweight placeholders as
+        yt-dlp pages them in; the player loop and prefetcher resolve each one
+        just before it plays. Returns (name, tracks queued so far, more still
+        loading), or None when full extraction is the better path.
+        """
+        is_search = not query.lower().startswith(("http://", "https://"))
+        if not is_search and not self.is_playlist_query(query):
+            return None  # A single URL needs its full info to start playing anyway
+        cached = await self.bot.loop.run_in_executor(None, lambda: metadata_cache.get(query))
+        if cached:
+            return None  # Already fully resolved, the normal path is instant
+
+        stream = FlatEntryStream(ytdl_flat, search_target(query)).start()
+        try:
+            first_batch = await asyncio.wait_for(stream.next_batch(), timeout=15.0)
+        except BaseException:
+            stream.close()
+            raise
+        if not first_batch:
+            return None
+
+        for entry in first_batch:
+            entry['requester'] = requester
+        instance.queue.extend(first_batch)
+        instance.start_player_loop()
+        self.bot.add_log(f"🔎 First {len(first_batch)} entr{'y' if len(first_batch) == 1 else 'ies'} for '{query[:60]}' after {stream.first_entry_after:.2f}s")
+        name = first_batch[0]['title'] if is_search else (stream.title or 'your playlist')
+        if stream.finished:
+            return name, len(first_batch), False
+
+        finished = asyncio.Event()
+
+        async def drain():
+            try:
+                while instance.instance_id in self.instances:
+                    batch = await stream.next_batch()
+                    if not batch:
+                        break
+                    for entry in batch:
+                        entry['requester'] = requester
+                    instance.queue.extend(batch)
+            except Exception as e:
+                self.bot.add_error(f"Streaming playlist load stopped early: {e}")
+            finally:
+                stream.close()
+                finished.set()
+
+        instance.pending_resolves = [event for event in instance.pending_resolves if not event.is_set()]
+        instance.pending_resolves.append(finished)
+        self.bot.loop.create_task(drain())
+        return name, len(first_batch), True
+
     @app_commands.command(name="play", description="Plays a song or a saved playlist.")
     @app_commands.describe(query="A search term or YouTube URL.", playlist="The name of a saved playlist to play.")
     @app_commands.autocomplete(playlist=playlist_autocomplete)
@@ -3460,6 +3206,7 @@ class MusicCog(commands.Cog, name="music"):
         if query and playlist:
             return await interaction.response.send_message("Please either provide a query or select a playlist, not both.", ephemeral=True)
 
+        requested_at = time.monotonic()
         await interaction.response.defer()
         
         instance = await self.get_instance(interaction)
@@ -3467,6 +3214,8 @@ class MusicCog(commands.Cog, name="music"):
         
         # User becomes DJ when they start playing music
         instance.current_dj = interaction.user
+        if instance.current_song is None:
+            voice_sessions.expect_first_audio(instance.instance_id, requested_at)
 
         entries = []
         playlist_name = ""
@@ -3475,10 +3224,25 @@ class MusicCog(commands.Cog, name="music"):
         is_first_song_batch = instance.queue.empty() and instance.current_song is None 
 
         try:
+            # Searches and playlists queue flat placeholders and resolve lazily
+            streamed = None
+            more_loading = False
             if query:
+                try:
+                    streamed = await self.queue_streaming(instance, query, interaction.user)
+                except Exception as e:
+                    self.bot.add_error(f"Streaming search failed, falling back to full extraction: {e}")
+            
+            if streamed:
+                playlist_name, queued_count, more_loading = streamed
+                instance.current_playlist_info = None
+                instance.current_playlist_tracks = []
+                instance.playback_index = -1
+            
+            elif query:
                 try:
                     data = await asyncio.wait_for(
-                        self.bot.loop.run_in_executor(None, lambda: ytdl.extract_info(query, download=False)),
+                        self.bot.loop.run_in_executor(None, lambda: metadata_cache.extract_info(ytdl, query)),
                         timeout=40.0
                     )
                 except asyncio.TimeoutError:
@@ -3495,13 +3259,12 @@ class MusicCog(commands.Cog, name="music"):
             
             elif playlist:
                 playlist_id = int(playlist)
-                async with self.bot.db.execute("SELECT track_data, name FROM playlists WHERE playlist_id = ?", (playlist_id,)) as cursor:
-                    playlist_row = await cursor.fetchone()
-                if not playlist_row:
+                playlist_info = await self.bot.playlists.get(playlist_id)
+                if not playlist_info:
                     return await interaction.followup.send("Playlist not found.", ephemeral=True)
                 
-                entries = json.loads(playlist_row[0])
-                playlist_name = playlist_row[1]
+                entries = await self.bot.playlists.tracks(playlist_id)
+                playlist_name = playlist_info['name']
                 if hasattr(instance, 'current_playlist_info'):
                     instance.current_playlist_info = {'id': playlist_id, 'name': playlist_name}
                 if hasattr(instance, 'current_playlist_tracks'):
@@ -3510,16 +3273,17 @@ class MusicCog(commands.Cog, name="music"):
                     instance.playback_index = -1
                 
 
-            if not entries:
-                return await interaction.followup.send("Couldn't find anything for that query.", ephemeral=True)
-            
-            # Queue all tracks first (fast)
-            queued_count = 0
-            for entry in entries:
-                if entry:
-                    entry['requester'] = interaction.user
-                    await instance.queue.put(entry)
-                    queued_count += 1
+            if not streamed:
+                if not entries:
+                    return await interaction.followup.send("Couldn't find anything for that query.", ephemeral=True)
+                
+                # Queue all tracks first (fast)
+                queued_count = 0
+                for entry in entries:
+                    if entry:
+                        entry['requester'] = interaction.user
+                        await instance.queue.put(entry)
+                        queued_count += 1
             
             # Process achievements in background to avoid blocking playback
             if queued_count > 0:
@@ -3542,7 +3306,8 @@ class MusicCog(commands.Cog, name="music"):
             
             # Send queue confirmation message that will auto-delete
             try:
-                queue_msg = await instance.text_channel.send(f"🎵 Queued **{queued_count}** track(s) from **{playlist_name}**")
+                more_note = " (more loading...)" if more_loading else ""
+                queue_msg = await instance.text_channel.send(f"🎵 Queued **{queued_count}** track(s) from **{playlist_name}**{more_note}")
                 instance.instance_messages.append(queue_msg)
                 
                 # Auto-delete after 10 seconds
@@ -3569,23 +3334,13 @@ class MusicCog(commands.Cog, name="music"):
             return await interaction.followup.send("An error occurred while fetching song data.", ephemeral=True)
 
     def clean_artist_name(self, artist_name: str) -> str:
-        artist_name = re.sub(r'\s*\(?VEVO\)?|\s*-\s*Official Artist Channel', '', artist_name, flags=re.IGNORECASE)
-        return artist_name.strip()
+        return text_normalization.clean_artist_name(artist_name)
 
     def clean_track_title(self, track_title: str) -> str:
-        track_title = re.sub(r'\(feat\..*?\)|\[feat\..*?\]|\(ft\..*?\)|\[ft\..*?\]', '', track_title, flags=re.IGNORECASE)
-        track_title = re.sub(r'\(prod\..*?\)|\[prod\..*?\]', '', track_title, flags=re.IGNORECASE)
-        track_title = re.sub(r'\(remix\)|\[remix\]', '', track_title, flags=re.IGNORECASE)
-        track_title = re.sub(r'\(explicit\)|\[explicit\]', '', track_title, flags=re.IGNORECASE)
-        track_title = re.sub(r'\(official video\)|\[official video\]', '', track_title, flags=re.IGNORECASE)
-        track_title = re.sub(r'\(lyrics\)|\[lyrics\]', '', track_title, flags=re.IGNORECASE)
-        return track_title.strip()
+        return text_normalization.clean_track_title(track_title)
 
     def clean_query(self, query: str) -> str:
-        query = re.sub(r'\s*\(.*?\)\s*|\s*\[.*?\]\s*', '', query).strip()
-        query = re.sub(r'\s*ft\s*\.?\s*|\s*feat\s*\.?\s*', ' ', query, flags=re.IGNORECASE)
-        query = re.sub(r'\s+-\s+', ' ', query)
-        return query.strip()
+        return text_normalization.clean_query(query)
 
     @app_commands.command(name="lyrics", description="Get lyrics for the current song or search for any song.")
     @app_commands.describe(query="[Optional] Search for lyrics of a specific song. Leave empty for current playing song.")
@@ -3604,17 +3359,18 @@ class MusicCog(commands.Cog, name="music"):
         if playlist:
             try:
                 playlist_id = int(playlist)
-                async with self.bot.db.execute("SELECT track_data, name FROM playlists WHERE playlist_id = ?", (playlist_id,)) as cursor:
-                    playlist_row = await cursor.fetchone()
-                if not playlist_row:
+                playlist_info = await self.bot.playlists.get(playlist_id)
+                if not playlist_info:
                     return await interaction.followup.send("Playlist not found.", ephemeral=True)
                 
-                tracks = json.loads(playlist_row[0])
-                playlist_name = playlist_row[1]
-                if not tracks:
+                playlist_name = playlist_info['name']
+                if not playlist_info['track_count']:
                     return await interaction.followup.send(f"Playlist '{playlist_name}' is empty.", ephemeral=True)
                 
-                paginator = QueuePaginatorView(interaction, tracks, playlist_name, self.bot.user)
+                paginator = QueuePaginatorView(
+                    interaction, playlist_name, self.bot.user, playlist_info['track_count'],
+                    lambda offset, limit: self.bot.playlists.tracks(playlist_id, offset=offset, limit=limit)
+                )
                 embed = await paginator.create_embed()
                 await interaction.followup.send(embed=embed, view=paginator, ephemeral=True)
 
@@ -3623,11 +3379,7 @@ class MusicCog(commands.Cog, name="music"):
                 await interaction.followup.send("Could not display that playlist.", ephemeral=True)
         else:
             # Find active music instance for this guild
-            player = None
-            for instance in self.instances.values():
-                if instance.guild.id == interaction.guild.id:
-                    player = instance
-                    break
+            player = self.instances.find(guild_id=interaction.guild.id)
             if not player or (player.queue.empty() and not player.current_song):
                 return await interaction.followup.send("The active queue is empty.", ephemeral=True)
             
@@ -3641,20 +3393,14 @@ class MusicCog(commands.Cog, name="music"):
     async def _create_playlist_background(self, interaction: discord.Interaction, name: str, url: str, is_public_str: str):
         is_public = 1 if is_public_str.lower() == 'yes' else 0
         try:
-            data = await self.bot.loop.run_in_executor(None, lambda: ytdl.extract_info(url, download=False))
+            data = await self.bot.loop.run_in_executor(None, lambda: metadata_cache.extract_info(ytdl, url))
             tracks = data.get('entries', [])
             if not tracks:
                 return await interaction.followup.send("Could not find any tracks in that playlist URL.", ephemeral=True)
             
-            track_data_json = json.dumps(tracks)
-            
-            async with self.bot.db.execute(
-                "INSERT INTO playlists (name, creator_id, guild_id, is_public, track_data) VALUES (?, ?, ?, ?, ?)",
-                (name, interaction.user.id, interaction.guild.id, is_public, track_data_json)
-            ) as cursor:
-                await self.bot.db.commit()
+            _, stored = await self.bot.playlists.create(name, interaction.user.id, interaction.guild.id, is_public, tracks)
             
-            await interaction.followup.send(f"✅ Successfully created playlist '{name}' with {len(tracks)} tracks!", ephemeral=True)
+            await interaction.followup.send(f"✅ Successfully created playlist '{name}' with {stored} tracks!", ephemeral=True)
         except Exception as e:
             self.bot.add_error(f"Error creating playlist: {e}")
             await interaction.followup.send("An error occurred while creating the playlist.", ephemeral=True)
@@ -3666,19 +3412,17 @@ class MusicCog(commands.Cog, name="music"):
         await interaction.response.defer(ephemeral=True)
         try:
             playlist_id = int(playlist)
-            async with self.bot.db.execute("SELECT name, creator_id FROM playlists WHERE playlist_id = ?", (playlist_id,)) as cursor:
-                playlist_row = await cursor.fetchone()
+            playlist_info = await self.bot.playlists.get(playlist_id)
 
-            if not playlist_row:
+            if not playlist_info:
                 return await interaction.followup.send("Playlist not found.", ephemeral=True)
             
-            if playlist_row[1] != interaction.user.id and not interaction.user.guild_permissions.manage_guild:
+            if playlist_info['creator_id'] != interaction.user.id and not interaction.user.guild_permissions.manage_guild:
                 return await interaction.followup.send("You can only delete your own playlists.", ephemeral=True)
             
-            await self.bot.db.execute("DELETE FROM playlists WHERE playlist_id = ?", (playlist_id,))
-            await self.bot.db.commit()
+            await self.bot.playlists.delete(playlist_id)
             
-            await interaction.followup.send(f"🗑️ Successfully deleted playlist '{playlist_row[0]}'.", ephemeral=True)
+            await interaction.followup.send(f"🗑️ Successfully deleted playlist '{playlist_info['name']}'.", ephemeral=True)
 
         except Exception as e:
             self.bot.add_error(f"Error deleting playlist: {e}")
@@ -3691,25 +3435,21 @@ class MusicCog(commands.Cog, name="music"):
         await interaction.response.defer(ephemeral=True)
         try:
             playlist_id = int(playlist)
-            async with self.bot.db.execute("SELECT track_data, name, creator_id FROM playlists WHERE playlist_id = ?", (playlist_id,)) as cursor:
-                playlist_row = await cursor.fetchone()
+            playlist_info = await self.bot.playlists.get(playlist_id)
             
-            if not playlist_row:
+            if not playlist_info:
                 return await interaction.followup.send("Playlist not found.", ephemeral=True)
             
-            if playlist_row[2] != interaction.user.id:
+            if playlist_info['creator_id'] != interaction.user.id:
                 return await interaction.followup.send("You can only add songs to your own playlists.", ephemeral=True)
 
-            data = await self.bot.loop.run_in_executor(None, lambda: ytdl.extract_info(query, download=False))
+            data = await self.bot.loop.run_in_executor(None, lambda: metadata_cache.extract_info(ytdl, query))
             new_track = data.get('entries', [data])[0]
             
-            tracks = json.loads(playlist_row[0])
-            tracks.append(new_track)
-            
-            await self.bot.db.execute("UPDATE playlists SET track_data = ? WHERE playlist_id = ?", (json.dumps(tracks), playlist_id))
-            await self.bot.db.commit()
+            if not await self.bot.playlists.append(playlist_id, new_track):
+                return await interaction.followup.send("Couldn't find a playable link for that song.", ephemeral=True)
             
-            await interaction.followup.send(f"➕ Added **{new_track['title']}** to playlist '{playlist_row[1]}'.", ephemeral=True)
+            await interaction.followup.send(f"➕ Added **{new_track['title']}** to playlist '{playlist_info['name']}'.", ephemeral=True)
 
         except Exception as e:
             self.bot.add_error(f"Error adding to playlist: {e}")
@@ -3722,25 +3462,19 @@ class MusicCog(commands.Cog, name="music"):
         await interaction.response.defer(ephemeral=True)
         try:
             playlist_id = int(playlist)
-            async with self.bot.db.execute("SELECT track_data, name, creator_id FROM playlists WHERE playlist_id = ?", (playlist_id,)) as cursor:
-                playlist_row = await cursor.fetchone()
+            playlist_info = await self.bot.playlists.get(playlist_id)
 
-            if not playlist_row:
+            if not playlist_info:
                 return await interaction.followup.send("Playlist not found.", ephemeral=True)
             
-            if playlist_row[2] != interaction.user.id:
+            if playlist_info['creator_id'] != interaction.user.id:
                 return await interaction.followup.send("You can only remove songs from your own playlists.", ephemeral=True)
 
-            tracks = json.loads(playlist_row[0])
-            if not (1 <= track_number <= len(tracks)):
+            removed_track = await self.bot.playlists.remove_at(playlist_id, track_number - 1)
+            if not removed_track:
                 return await interaction.followup.send("Invalid track number.", ephemeral=True)
-                
-            removed_track = tracks.pop(track_number - 1)
-            
-            await self.bot.db.execute("UPDATE playlists SET track_data = ? WHERE playlist_id = ?", (json.dumps(tracks), playlist_id))
-            await self.bot.db.commit()
             
-            await interaction.followup.send(f"➖ Removed **{removed_track['title']}** from playlist '{playlist_row[1]}'.", ephemeral=True)
+            await interaction.followup.send(f"➖ Removed **{removed_track['title']}** from playlist '{playlist_info['name']}'.", ephemeral=True)
 
         except Exception as e:
             self.bot.add_error(f"Error removing from playlist: {e}")
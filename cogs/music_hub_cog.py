@@ -99,7 +99,7 @@ class PlayButton(discord.ui.Button):
             return
         
         # Get the music cog to handle actual playback
-        music_cog = self.bot.get_cog('MusicCog')
+        music_cog = self.bot.get_cog('music')
         if not music_cog:
             await interaction.followup.send("❌ Music system is not available!", ephemeral=True)
             return
@@ -122,42 +122,21 @@ class PlayButton(discord.ui.Button):
             except:
                 songs = []
             
-            if not songs:
+            song_urls = [song if isinstance(song, str) else song.get('webpage_url') for song in songs if song]
+            song_urls = [url for url in song_urls if url]
+            if not song_urls:
                 await interaction.followup.send("❌ Playlist is empty!", ephemeral=True)
                 return
             
-            # Join voice channel and start playing
-            voice_channel = interaction.user.voice.channel
-            
-            # Connect to voice if not already connected
-            if not interaction.guild.voice_client:
-                voice_client = await voice_channel.connect()
-            else:
-                voice_client = interaction.guild.voice_client
-                if voice_client.channel != voice_channel:
-                    await voice_client.move_to(voice_channel)
-            
-            # Add all songs to queue
-            queued_count = 0
-            for song_url in songs[:20]:  # Limit to prevent spam
-                try:
-                    # Use the existing play command logic
-                    if hasattr(music_cog, 'add_to_queue'):
-                        await music_cog.add_to_queue(song_url, interaction.user)
-                        queued_count += 1
-                except Exception as e:
-                    self.bot.add_error(f"Failed to queue song {song_url}: {e}")
-                    continue
+            # Join voice channel through the music cog so the player loop owns the connection
+            instance = await music_cog.get_instance(interaction)
+            if not instance:
+                return
             
-            if queued_count > 0:
-                # Start playing if not already playing
-                if not voice_client.is_playing() and hasattr(music_cog, 'play_next'):
-                    await music_cog.play_next(interaction.guild)
-                
-                # Send success message with now playing controls
-                await self.send_now_playing(interaction, queued_count)
-            else:
-                await interaction.followup.send("❌ Failed to queue any songs from playlist!", ephemeral=True)
+            # Songs resolve in parallel and land in the queue in playlist order;
+            # playback starts as soon as the first one is ready
+            await music_cog.queue_sources(instance, song_urls, interaction.user)
+            await self.send_now_playing(interaction, len(song_urls))
                 
         except Exception as e:
             await interaction.followup.send(f"❌ Error playing playlist: {str(e)}", ephemeral=True)
@@ -196,11 +175,20 @@ class MusicControlView(discord.ui.View):
         
         voice_client = interaction.guild.voice_client
         if voice_client:
+            # Go through the music instance when there is one so its playback clock follows
+            music_cog = self.bot.get_cog('music')
+            instance = music_cog.instances.find(guild_id=interaction.guild.id, channel_id=voice_client.channel.id) if music_cog else None
             if voice_client.is_playing():
-                voice_client.pause()
+                if instance:
+                    await instance.pause()
+                else:
+                    voice_client.pause()
                 await interaction.response.send_message("⏸️ Music paused", ephemeral=True)
             elif voice_client.is_paused():
-                voice_client.resume()
+                if instance:
+                    await instance.resume()
+                else:
+                    voice_client.resume()
                 await interaction.response.send_message("▶️ Music resumed", ephemeral=True)
             else:
                 await interaction.response.send_message("❌ Nothing is currently playing", ephemeral=True)
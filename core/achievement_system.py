@@ -10,6 +10,8 @@ from datetime import datetime, timedelta
 import json
 import random
 
+from core.text_normalization import is_juice_wrld_track
+
 @dataclass
 class Achievement:
     id: str
@@ -89,13 +91,7 @@ class JuiceWRLDAchievementGenerator:
     @staticmethod
     def is_juice_wrld_track(title: str, artist: str) -> bool:
         """Check if a track is by Juice WRLD"""
-        juice_indicators = [
-            "juice wrld", "juice world", "jarad higgins", "999",
-            "juicewrld", "juice"
-        ]
-        
-        full_text = f"{title} {artist}".lower()
-        return any(indicator in full_text for indicator in juice_indicators)
+        return is_juice_wrld_track(title, artist)
     
     @staticmethod
     def get_juice_achievement(trigger: str, context: Dict = None) -> Optional[Dict]:
@@ -0,0 +1,246 @@
+# core/activity_broadcast.py
+# Versioned, non-blocking state fan-out for Activity WebSocket clients
+
+import asyncio
+import json
+import logging
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set
+
+# Snapshot builder: instance key -> full state message, or None if the instance is gone
+SnapshotProvider = Callable[[Hashable], Optional[Dict[str, Any]]]
+
+
+def activity_track(item: Dict[str, Any]) -> Dict[str, Any]:
+    """The slice of a queue entry Activity clients render."""
+    return {
+        "title": item.get("title", "Unknown"),
+        "uploader": item.get("uploader", "Unknown"),
+        "duration": item.get("duration"),
+        "webpage_url": item.get("webpage_url", "#"),
+    }
+
+
+def queue_delta_ops(changes) -> List[Dict[str, Any]]:
+    """TrackQueue change-log entries as wire operations."""
+    ops = []
+    for version, op, payload in changes:
+        wire = {"version": version, "op": op}
+        if op == "add":
+            wire.update(index=payload["index"], items=[activity_track(item) for item in payload["items"]])
+        elif op == "remove":
+            wire.update(index=payload["index"], count=payload["count"])
+        elif op == "move":
+            wire.update(source=payload["source"], destination=payload["destination"])
+        elif op == "reset":
+            wire.update(items=[activity_track(item) for item in payload["items"]])
+        ops.append(wire)
+    return ops
+
+
+class ClientChannel:
+    """
+    One connected client: a bounded queue of pre-serialized frames and a
+    writer task draining it, so a slow socket only ever delays itself.
+    Works with aiohttp (``send_str``) and ``websockets`` (``send``) sockets.
+    """
+
+    def __init__(self, ws, max_pending: int, send_timeout: float, on_dead: Callable[["ClientChannel"], None]):
+        self.ws = ws
+        self.send_timeout = send_timeout
+        self.on_dead = on_dead
+        self.pending: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self.resyncs = 0
+        self.closed = False
+        self._send = getattr(ws, "send_str", None) or ws.send
+        self._writer = asyncio.create_task(self._write_loop())
+
+    def offer(self, frame: str) -> bool:
+        """Queue a frame without waiting; False if the client is too far behind."""
+        if self.closed:
+            return True
+        try:
+            self.pending.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def reset(self, frame: str):
+        """Throw away everything queued and start over from `frame` (a snapshot)."""
+        while not self.pending.empty():
+            self.pending.get_nowait()
+        self.pending.put_nowait(frame)
+
+    async def _write_loop(self):
+        try:
+            while True:
+                frame = await self.pending.get()
+                await asyncio.wait_for(self._send(frame), timeout=self.send_timeout)
+                if self.pending.empty():
+                    self.resyncs = 0
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logging.debug(f"🌐 Activity client send failed: {e}")
+            self.on_dead(self)
+
+    def close(self, drop_socket: bool = False):
+        if self.closed:
+            return
+        self.closed = True
+        if self._writer is not asyncio.current_task():
+            self._writer.cancel()
+        if drop_socket:
+            close = getattr(self.ws, "close", None)
+            if close is not None:
+                try:
+                    asyncio.ensure_future(close())
+                except Exception:
+                    pass
+
+
+class ActivityBroadcaster:
+    """
+    Fans state out to the clients of each music instance.
+
+    Clients get a full snapshot when they connect, then small versioned
+    messages: every frame carries a per-instance ``seq``, and queue changes
+    travel as ``QUEUE_DELTA`` ops taken from the TrackQueue change log, each
+    tagged with the queue version it produces (clients skip ops at or below
+    the version they already hold). Each message is serialized once for
+    all recipients. A client whose send queue overflows is reset to a fresh
+    snapshot; one that keeps overflowing is disconnected. Clients that spot a
+    gap in ``seq`` or queue versions can send ``RESYNC`` for a new snapshot.
+    """
+
+    def __init__(self, snapshot_provider: SnapshotProvider, max_pending: int = 64,
+                 send_timeout: float = 5.0, max_resyncs: int = 3):
+        self.snapshot_provider = snapshot_provider
+        self.max_pending = max_pending
+        self.send_timeout = send_timeout
+        self.max_resyncs = max_resyncs
+        self.members: Dict[Hashable, Set[Any]] = {}  # instance key -> sockets
+        self.channels: Dict[int, ClientChannel] = {}  # id(socket) -> channel
+        self.seq: Dict[Hashable, int] = {}
+        self.queue_versions: Dict[Hashable, int] = {}
+        self._queue_flush_scheduled: Set[Hashable] = set()
+        self.stats = {"messages": 0, "frames": 0, "deltas": 0, "snapshots": 0, "resyncs": 0, "dropped_clients": 0}
+
+    # --- Membership ---
+
+    def _channel(self, ws) -> ClientChannel:
+        channel = self.channels.get(id(ws))
+        if channel is None or channel.ws is not ws:
+            channel = ClientChannel(ws, self.max_pending, self.send_timeout, self._on_dead)
+            self.channels[id(ws)] = channel
+        return channel
+
+    def instance_of(self, ws) -> Optional[Hashable]:
+        for key, sockets in self.members.items():
+            if ws in sockets:
+                return key
+        return None
+
+    def detach(self, ws):
+        """Forget a socket everywhere; call when its connection handler exits."""
+        for sockets in self.members.values():
+            sockets.discard(ws)
+        channel = self.channels.pop(id(ws), None)
+        if channel is not None and channel.ws is ws:
+            channel.close()
+
+    def _on_dead(self, channel: ClientChannel):
+        self.stats["dropped_clients"] += 1
+        self.detach(channel.ws)
+
+    # --- Sending ---
+
+    def _stamp(self, key: Hashable, message: Dict[str, Any]) -> str:
+        self.seq[key] = self.seq.get(key, 0) + 1
+        self.stats["messages"] += 1
+        return json.dumps({**message, "seq": self.seq[key]})
+
+    def _snapshot_frame(self, key: Hashable, message: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        message = message or self.snapshot_provider(key)
+        if message is None:
+            return None
+        self.stats["snapshots"] += 1
+        # A snapshot carries the current seq without advancing it; deltas continue from there
+        return json.dumps({**message, "seq": self.seq.get(key, 0)})
+
+    def _deliver(self, key: Hashable, channel: ClientChannel, frame: str):
+        if channel.offer(frame):
+            self.stats["frames"] += 1
+            return
+        if channel.resyncs >= self.max_resyncs:
+            logging.info(f"🌐 Dropping Activity client on {key}: still behind after {channel.resyncs} resyncs")
+            self.stats["dropped_clients"] += 1
+            channel.close(drop_socket=True)
+            self.detach(channel.ws)
+            return
+        snapshot = self._snapshot_frame(key)
+        if snapshot is not None:
+            channel.resyncs += 1
+            self.stats["resyncs"] += 1
+            channel.reset(snapshot)
+
+    def publish(self, key: Hashable, message: Dict[str, Any]):
+        """Send `message` to every client of `key`, serialized once. Never waits on a socket."""
+        sockets = self.members.get(key)
+        if not sockets:
+            return
+        frame = self._stamp(key, message)
+        for ws in list(sockets):
+            self._deliver(key, self._channel(ws), frame)
+
+    def send_snapshot(self, key: Hashable, ws, message: Optional[Dict[str, Any]] = None):
+        """Queue a full snapshot for one client, ahead of any later deltas."""
+        frame = self._snapshot_frame(key, message)
+        if frame is not None:
+            self._channel(ws).reset(frame)
+
+    def resync(self, ws):
+        key = self.instance_of(ws)
+        if key is not None:
+            self.stats["resyncs"] += 1
+            self.send_snapshot(key, ws)
+
+    # --- Queue deltas ---
+
+    def queue_changed(self, key: Hashable, queue):
+        """Called on every TrackQueue mutation; bursts collapse into one QUEUE_DELTA."""
+        if key in self._queue_flush_scheduled:
+            return
+        self._queue_flush_scheduled.add(key)
+        asyncio.get_running_loop().call_soon(self.flush_queue, key, queue)
+
+    def flush_queue(self, key: Hashable, queue):
+        self._queue_flush_scheduled.discard(key)
+        base = self.queue_versions.get(key)
+        self.queue_versions[key] = queue.version
+        if not self.members.get(key) or base == queue.version:
+            return
+        changes = queue.changes_since(base) if base is not None else None
+        if changes is None:
+            # Change log overflowed (or first publish): ship the whole queue once
+            self.publish(key, {"type": "QUEUE_RESET", "data": {
+                "version": queue.version,
+                "queue": [activity_track(item) for item in queue.snapshot()]
+            }})
+            return
+        self.stats["deltas"] += 1
+        self.publish(key, {"type": "QUEUE_DELTA", "data": {
+            "base_version": base,
+            "version": queue.version,
+            "ops": queue_delta_ops(changes)
+        }})
+
+    def forget_instance(self, key: Hashable):
+        self.seq.pop(key, None)
+        self.queue_versions.pop(key, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "clients": len(self.channels),
+            "backlogged": sum(1 for channel in self.channels.values() if channel.pending.qsize() > self.max_pending // 2),
+        }
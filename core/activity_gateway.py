@@ -0,0 +1,273 @@
+# core/activity_gateway.py
+# One aiohttp server for the Activity HTTP API, Activity WebSockets and the dashboard feed
+
+import ipaddress
+import logging
+import os
+import secrets
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+from aiohttp import WSMsgType, web
+
+from core.activity_broadcast import ActivityBroadcaster, SnapshotProvider
+
+# The Activity socket used to listen on 0.0.0.0:8765 and the API on localhost:8000; the gateway
+# serves both on 8000 and keeps listening on 8765 so existing Activity clients still connect
+DEFAULT_GATEWAY_HOST = os.getenv("ACTIVITY_GATEWAY_HOST", "0.0.0.0")
+DEFAULT_GATEWAY_PORT = int(os.getenv("ACTIVITY_GATEWAY_PORT", "8000"))
+DEFAULT_EXTRA_PORTS = tuple(int(port) for port in os.getenv("ACTIVITY_GATEWAY_EXTRA_PORTS", "8765").split(",") if port.strip())
+# Bot control and the dashboard feed need a token or an allowlisted peer, whatever the bind address
+PRIVATE_PATH_PREFIXES = ("/api/", "/dashboard")
+GATEWAY_API_KEY = os.getenv("ACTIVITY_GATEWAY_API_KEY") or None
+GATEWAY_ALLOWLIST = os.getenv("ACTIVITY_GATEWAY_ALLOWLIST", "")
+
+SocketHandler = Callable[["GatewaySocket", web.Request], Awaitable[None]]
+PageHandler = Callable[[web.Request], Awaitable[web.StreamResponse]]
+
+_CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type, Authorization',
+}
+
+
+def dashboard_channel(name: str) -> tuple:
+    """Broadcaster key for a dashboard event channel; music instances use their int ids."""
+    return ("dashboard", name)
+
+
+class GatewaySocket:
+    """
+    An aiohttp WebSocketResponse that also speaks the ``websockets`` calls
+    (``send``, ``remote_address``) the older handlers were written against.
+    Iterating yields aiohttp ``WSMessage`` objects.
+    """
+
+    def __init__(self, ws: web.WebSocketResponse, request: web.Request):
+        self.ws = ws
+        self.request = request
+        peer = request.transport.get_extra_info("peername") if request.transport else None
+        self.remote_address = tuple(peer[:2]) if peer else (request.remote or "unknown", 0)
+
+    async def send(self, data: str):
+        await self.ws.send_str(data)
+
+    async def send_str(self, data: str):
+        await self.ws.send_str(data)
+
+    def __aiter__(self):
+        return self.ws.__aiter__()
+
+    def __getattr__(self, name):
+        return getattr(self.ws, name)
+
+
+class TokenStore:
+    """Short-lived Activity tokens shared by every endpoint on the gateway."""
+
+    def __init__(self, ttl: float = 600.0):
+        self.ttl = ttl
+        self.tokens: Dict[str, Dict[str, Any]] = {}  # token -> {user_id, expires_at, ...claims}
+        self.by_user: Dict[int, str] = {}  # user_id -> current token
+
+    def issue(self, user_id: int, **claims) -> str:
+        """A fresh token for `user_id`; any token issued to them before stops working."""
+        self.revoke(self.by_user.get(user_id))
+        token = secrets.token_urlsafe(32)
+        self.tokens[token] = {"user_id": user_id, "expires_at": time.time() + self.ttl, **claims}
+        self.by_user[user_id] = token
+        return token
+
+    def verify(self, token: Optional[str]) -> Optional[Dict[str, Any]]:
+        data = self.tokens.get(token) if token else None
+        if data is None:
+            return None
+        if data["expires_at"] < time.time():
+            self.revoke(token)
+            return None
+        return data
+
+    def revoke(self, token: Optional[str]):
+        data = self.tokens.pop(token, None) if token else None
+        if data is not None and self.by_user.get(data["user_id"]) == token:
+            del self.by_user[data["user_id"]]
+
+
+class ActivityGateway:
+    """
+    Single asyncio server multiplexing everything the Activity and the
+    dashboard talk to: plain HTTP routes, WebSocket endpoints by path, one
+    token store, and one ActivityBroadcaster whose keys are music instance
+    ids or ``dashboard_channel(...)`` names.
+
+    Paths under `private_prefixes` answer only requests carrying a live
+    TokenStore token or the static `api_key` (``Authorization: Bearer ...``
+    or ``?token=``), or peers inside `allowlist` (comma-separated addresses
+    or networks). Being on loopback earns nothing by itself: a reverse proxy
+    or tunnel on this host makes every public request look local.
+
+    Static HTTP routes go on ``app.router`` before ``start()``. WebSocket
+    endpoints, pages and snapshot providers can be added and removed at any
+    time, so a cog reload re-registers without restarting the server.
+    """
+
+    def __init__(self, host: str = DEFAULT_GATEWAY_HOST, port: int = DEFAULT_GATEWAY_PORT, token_ttl: float = 600.0,
+                 extra_ports: tuple = DEFAULT_EXTRA_PORTS, private_prefixes: tuple = PRIVATE_PATH_PREFIXES,
+                 api_key: Optional[str] = GATEWAY_API_KEY, allowlist: str = GATEWAY_ALLOWLIST):
+        self.host = host
+        self.port = port
+        self.extra_ports = tuple(extra for extra in extra_ports if extra != port)
+        self.private_prefixes = private_prefixes
+        self.api_key = api_key
+        self.allowlist = [ipaddress.ip_network(entry.strip(), strict=False) for entry in allowlist.split(",") if entry.strip()]
+        self.app = web.Application(middlewares=[self._cors_middleware, self._access_middleware])
+        self.runner: Optional[web.AppRunner] = None
+        self.site: Optional[web.TCPSite] = None
+        self.extra_sites: List[web.TCPSite] = []
+        self.tokens = TokenStore(token_ttl)
+        self.broadcaster = ActivityBroadcaster(self._snapshot)
+        self.snapshot_providers: List[SnapshotProvider] = []
+        self.endpoints: Dict[str, SocketHandler] = {}
+        self.pages: Dict[str, PageHandler] = {}
+        self.stats = {"http_requests": 0, "ws_connections": 0, "ws_active": 0, "rejected": 0}
+
+    @property
+    def running(self) -> bool:
+        return self.site is not None
+
+    # --- Registration ---
+
+    def add_endpoint(self, path: str, handler: SocketHandler):
+        self.endpoints[path] = handler
+
+    def add_page(self, path: str, handler: PageHandler):
+        self.pages[path] = handler
+
+    def remove(self, *paths: str):
+        for path in paths:
+            self.endpoints.pop(path, None)
+            self.pages.pop(path, None)
+
+    def add_snapshot_provider(self, provider: SnapshotProvider):
+        if provider not in self.snapshot_providers:
+            self.snapshot_providers.append(provider)
+
+    def remove_snapshot_provider(self, provider: SnapshotProvider):
+        if provider in self.snapshot_providers:
+            self.snapshot_providers.remove(provider)
+
+    def _snapshot(self, key: Hashable) -> Optional[Dict[str, Any]]:
+        for provider in self.snapshot_providers:
+            snapshot = provider(key)
+            if snapshot is not None:
+                return snapshot
+        return None
+
+    # --- Fan-out ---
+
+    def subscribe(self, ws, key: Hashable):
+        self.broadcaster.members.setdefault(key, set()).add(ws)
+
+    def unsubscribe(self, ws, key: Hashable):
+        self.broadcaster.members.get(key, set()).discard(ws)
+
+    def publish(self, key: Hashable, message: Dict[str, Any]):
+        self.broadcaster.publish(key, message)
+
+    # --- Serving ---
+
+    @web.middleware
+    async def _cors_middleware(self, request: web.Request, handler):
+        if request.method == "OPTIONS":
+            return web.Response(headers=_CORS_HEADERS)
+        self.stats["http_requests"] += 1
+        response = await handler(request)
+        if not response.prepared:
+            response.headers.update(_CORS_HEADERS)
+        return response
+
+    @web.middleware
+    async def _access_middleware(self, request: web.Request, handler):
+        if request.path.startswith(self.private_prefixes) and not self._trusted(request):
+            self.stats["rejected"] += 1
+            raise web.HTTPUnauthorized(text="Token required")
+        return await handler(request)
+
+    def _trusted(self, request: web.Request) -> bool:
+        auth = request.headers.get("Authorization", "")
+        token = auth[7:] if auth.startswith("Bearer ") else request.query.get("token")
+        if token and self.api_key and secrets.compare_digest(token, self.api_key):
+            return True
+        if self.tokens.verify(token) is not None:
+            return True
+        if self.allowlist and request.remote:
+            try:
+                peer = ipaddress.ip_address(request.remote)
+            except ValueError:
+                return False
+            return any(peer in network for network in self.allowlist)
+        return False
+
+    async def _dispatch(self, request: web.Request) -> web.StreamResponse:
+        if request.headers.get("upgrade", "").lower() == "websocket":
+            handler = self.endpoints.get(request.path)
+            if handler is None:
+                raise web.HTTPNotFound(text="Unknown WebSocket endpoint")
+            return await self._serve_socket(request, handler)
+        page = self.pages.get(request.path)
+        if page is None:
+            raise web.HTTPNotFound()
+        return await page(request)
+
+    async def _serve_socket(self, request: web.Request, handler: SocketHandler) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse(heartbeat=20.0)
+        await ws.prepare(request)
+        socket = GatewaySocket(ws, request)
+        self.stats["ws_connections"] += 1
+        self.stats["ws_active"] += 1
+        try:
+            await handler(socket, request)
+        except Exception as e:
+            logging.error(f"🌐 Gateway handler for {request.path} failed: {e}")
+        finally:
+            self.stats["ws_active"] -= 1
+            self.broadcaster.detach(socket)
+            if not ws.closed:
+                await ws.close()
+        return ws
+
+    async def start(self):
+        if self.running:
+            return
+        # Registered last so explicit routes win; endpoints and pages resolve per request
+        self.app.router.add_route("*", "/{tail:.*}", self._dispatch)
+        self.runner = web.AppRunner(self.app)
+        await self.runner.setup()
+        self.site = web.TCPSite(self.runner, self.host, self.port)
+        await self.site.start()
+        for extra_port in self.extra_ports:
+            site = web.TCPSite(self.runner, self.host, extra_port)
+            await site.start()
+            self.extra_sites.append(site)
+        ports = ", ".join(str(port) for port in (self.port, *self.extra_ports))
+        logging.info(f"🌐 Activity gateway listening on {self.host}:{ports}")
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+        self.runner = None
+        self.site = None
+        self.extra_sites = []
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "endpoints": sorted(self.endpoints), "broadcast": self.broadcaster.get_stats()}
+
+
+async def read_text_messages(socket: GatewaySocket):
+    """Text frames from `socket` until it closes or errors, the way ``websockets`` iterates."""
+    async for msg in socket:
+        if msg.type == WSMsgType.TEXT:
+            yield msg.data
+        elif msg.type in (WSMsgType.ERROR, WSMsgType.CLOSE):
+            break
@@ -0,0 +1,180 @@
+# core/audio_cache.py
+# Opt-in on-disk Opus cache so repeat plays don't re-stream and re-encode
+
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+from core.metadata_cache import normalize_lookup_key
+
+
+class OpusTranscodeCache:
+    """
+    Keeps Ogg/Opus copies of recently played tracks under a size budget.
+
+    A track is transcoded in the background the first time it plays; later
+    plays can hand the file straight to Discord (``FFmpegOpusAudio`` with
+    ``codec='opus'``, which stream-copies) instead of streaming and
+    PCM-encoding it again. Files are encoded with the player's default
+    volume baked in so cached and streamed plays sound the same; any other
+    volume is applied as a ``volume=`` filter on the re-encode path.
+    Least recently played files are evicted once the cache grows past
+    ``max_bytes``.
+    """
+
+    def __init__(self, cache_dir: str = "cache/music/opus", max_bytes: int = 2 * 1024 ** 3,
+                 enabled: bool = False, max_track_seconds: int = 15 * 60, bitrate: str = "128k",
+                 volume: float = 0.5, max_concurrent: int = 2):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.max_track_seconds = max_track_seconds
+        self.bitrate = bitrate
+        self.volume = volume
+        self.max_concurrent = max_concurrent
+        self.entries: "OrderedDict[str, int]" = OrderedDict()  # filename -> size, least recent first
+        self.total_bytes = 0
+        self.filling: Dict[str, asyncio.Task] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loaded = False
+        self.stats = {"hits": 0, "misses": 0, "fills": 0, "fill_failures": 0, "evictions": 0}
+
+    def _load_index(self):
+        """Rebuild the LRU order from file mtimes (touched on every hit)."""
+        if self._loaded:
+            return
+        self._loaded = True
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        files = []
+        for path in self.cache_dir.glob("*.opus"):
+            try:
+                stat = path.stat()
+                files.append((stat.st_mtime, path.name, stat.st_size))
+            except OSError:
+                continue
+        for _, name, size in sorted(files):
+            self.entries[name] = size
+            self.total_bytes += size
+        # Leftovers from a fill interrupted by a restart
+        for path in self.cache_dir.glob("*.part"):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def _filename(self, url: str) -> str:
+        return hashlib.sha1(normalize_lookup_key(url).encode()).hexdigest() + ".opus"
+
+    def lookup(self, url: str) -> Optional[str]:
+        """Path of the cached Opus file for `url`, or None."""
+        if not self.enabled or not url:
+            return None
+        self._load_index()
+        name = self._filename(url)
+        if name not in self.entries:
+            self.stats["misses"] += 1
+            return None
+        path = self.cache_dir / name
+        if not path.exists():
+            self.total_bytes -= self.entries.pop(name)
+            self.stats["misses"] += 1
+            return None
+        self.entries.move_to_end(name)
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        self.stats["hits"] += 1
+        return str(path)
+
+    def schedule_fill(self, url: str, stream_url: Optional[str], duration: Optional[float] = None,
+                      headers: Optional[Dict[str, str]] = None):
+        """Transcode `stream_url` into the cache in the background, if it's worth keeping."""
+        if not self.enabled or not url or not stream_url:
+            return
+        if duration and duration > self.max_track_seconds:
+            return
+        self._load_index()
+        name = self._filename(url)
+        if name in self.entries or name in self.filling:
+            return
+        self.filling[name] = asyncio.create_task(self._fill(name, stream_url, headers))
+
+    async def _fill(self, name: str, stream_url: str, headers: Optional[Dict[str, str]]):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        final_path = self.cache_dir / name
+        part_path = self.cache_dir / (name + ".part")
+        try:
+            async with self._semaphore:
+                args = ["ffmpeg", "-nostdin", "-loglevel", "error", "-y"]
+                if stream_url.startswith(("http://", "https://")):
+                    args += ["-reconnect", "1", "-reconnect_streamed", "1", "-reconnect_delay_max", "5"]
+                    if headers:
+                        args += ["-headers", "".join(f"{k}: {v}\r\n" for k, v in headers.items())]
+                args += [
+                    "-i", stream_url, "-vn", "-t", str(self.max_track_seconds),
+                    "-af", f"volume={self.volume}",
+                    "-c:a", "libopus", "-b:a", self.bitrate, "-ar", "48000", "-ac", "2",
+                    "-f", "ogg", str(part_path)
+                ]
+                process = await asyncio.create_subprocess_exec(
+                    *args, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE
+                )
+                _, stderr = await process.communicate()
+                if process.returncode != 0:
+                    raise RuntimeError(stderr.decode(errors="ignore").strip()[:200] or f"ffmpeg exited {process.returncode}")
+
+            os.replace(part_path, final_path)
+            size = final_path.stat().st_size
+            self.entries[name] = size
+            self.total_bytes += size
+            self.stats["fills"] += 1
+            self._evict()
+        except asyncio.CancelledError:
+            part_path.unlink(missing_ok=True)
+            raise
+        except Exception as e:
+            self.stats["fill_failures"] += 1
+            part_path.unlink(missing_ok=True)
+            logging.warning(f"🎵 Opus cache fill failed for {name}: {e}")
+        finally:
+            self.filling.pop(name, None)
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and self.entries:
+            name, size = self.entries.popitem(last=False)
+            self.total_bytes -= size
+            self.stats["evictions"] += 1
+            try:
+                (self.cache_dir / name).unlink()
+            except OSError:
+                pass
+
+    def cancel_fills(self):
+        for task in self.filling.values():
+            task.cancel()
+        self.filling.clear()
+
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "files": len(self.entries),
+            "total_mb": round(self.total_bytes / 1024 ** 2, 1),
+            "budget_mb": round(self.max_bytes / 1024 ** 2, 1),
+            "filling": len(self.filling),
+        }
+
+
+# Global Opus cache instance - opt in with MUSIC_OPUS_CACHE=true
+audio_cache = OpusTranscodeCache(
+    cache_dir=os.getenv("MUSIC_OPUS_CACHE_DIR", "cache/music/opus"),
+    max_bytes=int(float(os.getenv("MUSIC_OPUS_CACHE_MB", "2048")) * 1024 ** 2),
+    enabled=os.getenv("MUSIC_OPUS_CACHE", "false").lower() == "true",
+)
@@ -0,0 +1,148 @@
+# core/audio_eq.py
+# FFmpeg equalizer filter graphs for music playback, plus restart metrics
+
+import re
+import statistics
+from collections import deque
+from typing import Dict, Mapping, Optional
+
+# Graphic EQ bands are an octave wide, so neighbouring sliders overlap smoothly
+BAND_WIDTH_OCTAVES = 1.0
+MAX_GAIN_DB = 12.0
+# One 20ms PCM frame is read to prime a re-opened source before it's swapped in
+PRIME_FRAME_SECONDS = 0.02
+
+_BAND_NAME = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*(k?)\s*(?:hz)?\s*$', re.IGNORECASE)
+
+
+def band_frequency(name: str) -> Optional[float]:
+    """Hz for an EQ band key: ``"62"`` -> 62.0, ``"1k"`` -> 1000.0; None if it isn't one."""
+    match = _BAND_NAME.match(str(name))
+    if not match:
+        return None
+    value = float(match.group(1)) * (1000 if match.group(2) else 1)
+    return value if 20 <= value <= 20000 else None
+
+
+def normalize_bands(bands: Mapping) -> Dict[str, float]:
+    """Band gains from client input: unknown bands and non-numbers dropped, gains clamped."""
+    normalized = {}
+    for name, gain in (bands or {}).items():
+        if band_frequency(name) is None:
+            continue
+        try:
+            gain = float(gain)
+        except (TypeError, ValueError):
+            continue
+        normalized[str(name)] = max(-MAX_GAIN_DB, min(MAX_GAIN_DB, gain))
+    return normalized
+
+
+def eq_filter_chain(bands: Mapping) -> Optional[str]:
+    """
+    The ``-af`` filter graph for `bands` (key -> gain in dB): one peaking
+    ``equalizer`` per non-zero band, lowest first. None for a flat EQ, so flat
+    playback doesn't pay for a filter graph at all.
+    """
+    filters = []
+    for name, gain in sorted(normalize_bands(bands).items(), key=lambda item: band_frequency(item[0])):
+        if abs(gain) >= 0.1:
+            filters.append(f"equalizer=f={band_frequency(name):g}:t=o:w={BAND_WIDTH_OCTAVES:g}:g={gain:.1f}")
+    return ",".join(filters) or None
+
+
+class EqualizerMetrics:
+    """
+    How long a re-opened source takes to produce audio. The median is used
+    as the lead time for EQ restarts: the new FFmpeg is started that far
+    ahead of the current position, so when it's swapped in (the old one
+    plays until then) the jump is as close to zero as we can guess.
+    """
+
+    def __init__(self, window: int = 50, default_latency: float = 0.5):
+        self.default_latency = default_latency
+        self.open_latencies: deque = deque(maxlen=window)
+        self.stats = {"restarts": 0, "eq_restarts": 0, "seeks": 0, "failed": 0, "abandoned": 0}
+
+    def record_open(self, latency: float):
+        self.open_latencies.append(latency)
+
+    def expected_latency(self) -> float:
+        return statistics.median(self.open_latencies) if self.open_latencies else self.default_latency
+
+    def get_stats(self) -> Dict:
+        latencies = sorted(self.open_latencies)
+        return {
+            **self.stats,
+            "open_latency_median": self.expected_latency(),
+            "open_latency_p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0.0,
+        }
+
+
+# Global equalizer metrics instance
+eq_metrics = EqualizerMetrics()
+
+
+if __name__ == "__main__":
+    # Benchmark: python -m core.audio_eq <audio file or stream URL> [seconds]
+    #   restart gap - time from spawning FFmpeg at an offset to its first 20ms frame,
+    #                 i.e. the silence a restart would cause if it swapped in unprimed
+    #   CPU         - FFmpeg CPU seconds per second of audio, per playing instance
+    import subprocess
+    import sys
+    import time
+
+    if len(sys.argv) < 2:
+        sys.exit("usage: python -m core.audio_eq <audio file or URL> [seconds]")
+    source = sys.argv[1]
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 60.0
+    presets = {
+        "no EQ": None,
+        "bass boost": eq_filter_chain({"31": 8, "62": 6, "125": 4, "250": 2}),
+        "all 10 bands": eq_filter_chain({"31": 3, "62": -2, "125": 4, "250": 1, "500": -3,
+                                         "1k": 2, "2k": -1, "4k": 3, "8k": 4, "16k": -2}),
+    }
+    frame_bytes = 3840  # 20ms of 48kHz stereo s16le, what discord.py reads per packet
+
+    def ffmpeg_args(chain: Optional[str], start: float = 0.0, duration: Optional[float] = None):
+        args = ["ffmpeg", "-nostdin", "-loglevel", "quiet"]
+        if start:
+            args += ["-ss", f"{start:.3f}"]
+        args += ["-i", source, "-vn"]
+        if duration:
+            args += ["-t", f"{duration:.3f}"]
+        if chain:
+            args += ["-af", chain]
+        return args + ["-f", "s16le", "-ar", "48000", "-ac", "2", "pipe:1"]
+
+    def child_cpu() -> float:
+        try:
+            import resource
+        except ImportError:  # Windows: fall back to wall time, an upper bound
+            return time.perf_counter()
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        return usage.ru_utime + usage.ru_stime
+
+    print(f"{'':>14} {'restart gap (median/max)':>26} {'CPU s per audio s':>19} {'% of a core':>12}")
+    baseline = None
+    for name, chain in presets.items():
+        gaps = []
+        for offset in (seconds * 0.1, seconds * 0.3, seconds * 0.5, seconds * 0.7, seconds * 0.9):
+            started = time.perf_counter()
+            proc = subprocess.Popen(ffmpeg_args(chain, start=offset), stdout=subprocess.PIPE)
+            first = proc.stdout.read(frame_bytes)
+            gaps.append(time.perf_counter() - started)
+            proc.kill()
+            proc.wait()
+            if not first:
+                sys.exit(f"FFmpeg produced no audio for {source!r} at {offset}s")
+
+        cpu_before = child_cpu()
+        proc = subprocess.run(ffmpeg_args(chain, duration=seconds), stdout=subprocess.PIPE)
+        cpu = child_cpu() - cpu_before
+        audio_seconds = len(proc.stdout) / (frame_bytes * 50) or seconds
+        per_second = cpu / audio_seconds
+        baseline = per_second if baseline is None else baseline
+        extra = f" (+{(per_second - baseline) * 100:.2f})" if chain else ""
+        print(f"{name:>14} {statistics.median(gaps) * 1000:>13.0f}ms / {max(gaps) * 1000:>5.0f}ms "
+              f"{per_second:>19.4f} {per_second * 100:>7.2f}{extra}")
@@ -0,0 +1,297 @@
+# core/audio_features.py
+# Background audio feature analysis (tempo, energy, spectrum) persisted to song_features
+
+import asyncio
+import datetime
+import json
+import logging
+import os
+import subprocess
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional
+
+from core.text_normalization import is_juice_wrld_track
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    logging.warning("numpy not available - audio feature analysis disabled")
+
+# Mono 22.05kHz is plenty for tempo and spectral shape and halves the decode work
+ANALYSIS_SAMPLE_RATE = 22050
+FRAME_SIZE = 2048
+HOP_SIZE = 512
+MIN_BPM = 60.0
+MAX_BPM = 200.0
+
+
+def song_key(info: Dict[str, Any]) -> Optional[str]:
+    """The ``song_features.song_id`` for a queue entry or yt-dlp info dict."""
+    return info.get('id') or info.get('webpage_url') or None
+
+
+def window_offset(duration: Optional[float], window: float) -> float:
+    """Where to start the analysis window: past the intro, but inside the track."""
+    if not duration or duration <= window * 1.5:
+        return 0.0
+    return min(duration * 0.3, 60.0, duration - window)
+
+
+# --- Worker side (runs in the process pool; no event loop, no bot imports) ---
+
+def decode_window(stream_url: str, offset: float, seconds: float,
+                  headers: Optional[Dict[str, str]] = None) -> "np.ndarray":
+    """`seconds` of mono float32 PCM from `offset`, decoded by FFmpeg straight into a NumPy buffer."""
+    args = ["ffmpeg", "-nostdin", "-loglevel", "error"]
+    if stream_url.startswith(("http://", "https://")):
+        args += ["-reconnect", "1", "-reconnect_streamed", "1", "-reconnect_delay_max", "5"]
+        if headers:
+            args += ["-headers", "".join(f"{k}: {v}\r\n" for k, v in headers.items())]
+    if offset > 0:
+        args += ["-ss", f"{offset:.2f}"]
+    args += ["-i", stream_url, "-vn", "-t", f"{seconds:.2f}",
+             "-ac", "1", "-ar", str(ANALYSIS_SAMPLE_RATE), "-f", "f32le", "pipe:1"]
+    result = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=seconds * 4 + 30)
+    if result.returncode != 0 and not result.stdout:
+        raise RuntimeError(result.stderr.decode(errors="ignore").strip()[:200] or f"ffmpeg exited {result.returncode}")
+    return np.frombuffer(result.stdout, dtype=np.float32)
+
+
+def _estimate_tempo(spectrum: "np.ndarray", sample_rate: int):
+    """BPM and a 0-1 confidence from the autocorrelation of the spectral-flux onset envelope."""
+    flux = np.maximum(0.0, np.diff(np.log1p(spectrum), axis=0)).sum(axis=1)
+    flux -= flux.mean()
+    frames = flux.size
+    fps = sample_rate / HOP_SIZE
+    min_lag = max(1, int(fps * 60.0 / MAX_BPM))
+    max_lag = min(frames - 1, int(fps * 60.0 / MIN_BPM))
+    if max_lag <= min_lag:
+        return 0.0, 0.0
+    # Autocorrelation through the FFT, zero-padded so it doesn't wrap around
+    autocorr = np.fft.irfft(np.abs(np.fft.rfft(flux, 2 * frames)) ** 2)[:frames]
+    if autocorr[0] <= 0:
+        return 0.0, 0.0  # Silence
+    lags = np.arange(min_lag, max_lag + 1)
+    bpm = 60.0 * fps / lags
+    # Log-normal prior around 120 BPM keeps half/double-time peaks from winning
+    prior = np.exp(-0.5 * np.log2(bpm / 120.0) ** 2)
+    best = int(np.argmax(autocorr[lags] * prior))
+    return float(bpm[best]), float(max(0.0, autocorr[lags[best]] / autocorr[0]))
+
+
+def classify_mood(tempo: float, energy: float, centroid: float) -> str:
+    """Same labels the title-based estimate and the old GPU analysis used."""
+    if energy >= 0.6 and tempo >= 115:
+        return "energetic"
+    if (tempo and tempo < 85) or energy < 0.3:
+        return "calm"
+    if centroid > 2500:
+        return "bright"
+    return "neutral"
+
+
+def compute_features(samples: "np.ndarray", sample_rate: int = ANALYSIS_SAMPLE_RATE) -> Dict[str, Any]:
+    """Tempo, loudness/energy and spectral shape of a mono window, all as whole-array NumPy ops."""
+    if samples.size < FRAME_SIZE * 8:
+        raise ValueError(f"only {samples.size / sample_rate:.1f}s of audio decoded")
+    frames = np.lib.stride_tricks.sliding_window_view(samples, FRAME_SIZE)[::HOP_SIZE]
+    spectrum = np.abs(np.fft.rfft(frames * np.hanning(FRAME_SIZE).astype(np.float32), axis=1))
+    freqs = np.fft.rfftfreq(FRAME_SIZE, 1.0 / sample_rate)
+    power = spectrum ** 2
+
+    magnitude = spectrum.sum(axis=1) + 1e-10
+    centroid = (spectrum @ freqs) / magnitude
+    cumulative = np.cumsum(spectrum, axis=1)
+    rolloff = freqs[np.argmax(cumulative >= 0.85 * cumulative[:, -1:], axis=1)]
+    flatness = np.exp(np.log(power + 1e-10).mean(axis=1)) / (power.mean(axis=1) + 1e-10)
+    zero_crossings = ((frames[:, 1:] * frames[:, :-1]) < 0).mean(axis=1)
+
+    rms = np.sqrt((frames ** 2).mean(axis=1))
+    rms_db = 20 * np.log10(rms + 1e-10)
+    loudness_db = float(20 * np.log10(rms.mean() + 1e-10))
+    # -40 dBFS reads as 0, -6 dBFS (loud mastered pop) as 1
+    energy = float(np.clip((loudness_db + 40.0) / 34.0, 0.0, 1.0))
+
+    band_power = power.sum(axis=0)
+    total_power = band_power.sum() + 1e-10
+    tempo, tempo_confidence = _estimate_tempo(spectrum, sample_rate)
+    mean_centroid = float(centroid.mean())
+
+    return {
+        "tempo": round(tempo, 1),
+        "tempo_confidence": round(tempo_confidence, 3),
+        "energy": round(energy, 3),
+        "loudness_db": round(loudness_db, 1),
+        "dynamic_range_db": round(float(np.percentile(rms_db, 95) - np.percentile(rms_db, 10)), 1),
+        "spectral_centroid": round(mean_centroid, 1),
+        "spectral_rolloff": round(float(rolloff.mean()), 1),
+        "spectral_flatness": round(float(flatness.mean()), 4),
+        "zero_crossing_rate": round(float(zero_crossings.mean()), 4),
+        "band_energy": {
+            "low": round(float(band_power[freqs < 250].sum() / total_power), 3),
+            "mid": round(float(band_power[(freqs >= 250) & (freqs < 4000)].sum() / total_power), 3),
+            "high": round(float(band_power[freqs >= 4000].sum() / total_power), 3),
+        },
+        "mood": classify_mood(tempo, energy, mean_centroid),
+        "analyzed_seconds": round(samples.size / sample_rate, 1),
+    }
+
+
+def analyze_stream(stream_url: str, offset: float, seconds: float,
+                   headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Process-pool entry point: decode a window and reduce it to features."""
+    features = compute_features(decode_window(stream_url, offset, seconds, headers))
+    features["window_offset"] = round(offset, 1)
+    return features
+
+
+def _lower_priority():
+    # Analysis is background work; playback FFmpeg processes come first
+    if hasattr(os, "nice"):
+        try:
+            os.nice(10)
+        except OSError:
+            pass
+
+
+# --- Event loop side ---
+
+class AudioFeatureAnalyzer:
+    """
+    Fills ``song_features`` in the background.
+
+    Each song is analyzed once: results are kept in a small LRU and in the
+    database, and concurrent requests for the same ``song_id`` share one
+    job. The decode and the NumPy work run in a low-priority process pool,
+    so the bot's event loop and the playback FFmpeg processes are
+    unaffected. Callers read results with ``get()``, which never waits.
+    """
+
+    def __init__(self, max_workers: int = 1, window_seconds: float = 20.0,
+                 max_cached: int = 2000, max_pending: int = 50):
+        self.max_workers = max_workers
+        self.window_seconds = window_seconds
+        self.max_cached = max_cached
+        self.max_pending = max_pending
+        self.enabled = NUMPY_AVAILABLE
+        self.features: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.inflight: Dict[str, asyncio.Task] = {}
+        self.db = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.stats = {"analyzed": 0, "memory_hits": 0, "db_hits": 0, "deduped": 0, "skipped": 0, "failures": 0}
+
+    async def start(self, db):
+        # song_features and its mood index come from the schema migrations (core/migrations.py)
+        self.db = db
+
+    def stop(self):
+        for task in self.inflight.values():
+            task.cancel()
+        self.inflight.clear()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_lower_priority)
+        return self._pool
+
+    def get(self, song_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Features for `song_id` if they've been analyzed or loaded this session."""
+        features = self.features.get(song_id) if song_id else None
+        if features is not None:
+            self.features.move_to_end(song_id)
+        return features
+
+    def _remember(self, song_id: str, features: Dict[str, Any]):
+        self.features[song_id] = features
+        self.features.move_to_end(song_id)
+        while len(self.features) > self.max_cached:
+            self.features.popitem(last=False)
+
+    def schedule(self, info: Dict[str, Any]) -> Optional[asyncio.Task]:
+        """
+        Analyze the track described by `info` (a resolved yt-dlp info dict or
+        queue entry with a playable ``url``) unless it's known or already running.
+        """
+        song_id = song_key(info)
+        stream_url = info.get('url')
+        if not song_id or not stream_url:
+            return None
+        if song_id in self.features:
+            self.stats["memory_hits"] += 1
+            return None
+        task = self.inflight.get(song_id)
+        if task is not None:
+            self.stats["deduped"] += 1
+            return task
+        if len(self.inflight) >= self.max_pending:
+            self.stats["skipped"] += 1
+            return None
+        task = asyncio.create_task(self._analyze(song_id, stream_url, info))
+        self.inflight[song_id] = task
+        task.add_done_callback(lambda _: self.inflight.pop(song_id, None))
+        return task
+
+    async def _analyze(self, song_id: str, stream_url: str, info: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        try:
+            stored = await self._load(song_id)
+            if stored is not None:
+                self.stats["db_hits"] += 1
+                self._remember(song_id, stored)
+                return stored
+            if not self.enabled:
+                return None
+
+            offset = window_offset(info.get('duration'), self.window_seconds)
+            loop = asyncio.get_running_loop()
+            features = await loop.run_in_executor(
+                self._executor(), analyze_stream, stream_url, offset, self.window_seconds, info.get('http_headers')
+            )
+            self._remember(song_id, features)
+            await self._store(song_id, info, features)
+            self.stats["analyzed"] += 1
+            return features
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.stats["failures"] += 1
+            logging.warning(f"🎵 Audio analysis failed for {info.get('title', song_id)}: {e}")
+            return None
+
+    async def _load(self, song_id: str) -> Optional[Dict[str, Any]]:
+        if self.db is None:
+            return None
+        cursor = await self.db.execute("SELECT features_json FROM song_features WHERE song_id = ?", (song_id,))
+        row = await cursor.fetchone()
+        if not row or not row[0]:
+            return None
+        try:
+            return json.loads(row[0])
+        except ValueError:
+            return None
+
+    async def _store(self, song_id: str, info: Dict[str, Any], features: Dict[str, Any]):
+        if self.db is None:
+            return
+        title = info.get('title', 'Unknown Title')
+        artist = info.get('uploader', 'Unknown Uploader')
+        await self.db.execute(
+            "INSERT OR REPLACE INTO song_features "
+            "(song_id, title, artist, features_json, analyzed_at, is_juice_wrld, mood, energy_level, tempo) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (song_id, title, artist, json.dumps(features), datetime.datetime.now().isoformat(),
+             int(is_juice_wrld_track(title, artist)), features["mood"], features["energy"], int(round(features["tempo"])))
+        )
+        await self.db.commit()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "enabled": self.enabled, "cached": len(self.features), "inflight": len(self.inflight)}
+
+
+# Global audio feature analyzer
+audio_features = AudioFeatureAnalyzer(max_workers=int(os.getenv("MUSIC_ANALYSIS_WORKERS", "1")))
@@ -3,13 +3,29 @@
 
 import aiosqlite
 import asyncio
+import re
 import time
 import logging
 from contextlib import asynccontextmanager
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, Iterable, List, Sequence
 from dataclasses import dataclass
 import json
 
+from core.query_cache import MISS, Dependency, QueryCache, read_tables, written_table
+from core.query_registry import QueryRegistry, Statement, query_registry
+from core.migrations import MigrationRunner
+
+# Statements that only read; everything else goes to the writer connection
+_READ_QUERY = re.compile(r'^\s*(?:SELECT|EXPLAIN)\b|^\s*PRAGMA\s+\w+\s*(?:\([^)]*\))?\s*;?\s*$', re.IGNORECASE)
+_CTE_READ = re.compile(r'^\s*WITH\b(?!.*\b(?:INSERT|UPDATE|DELETE|REPLACE)\b)', re.IGNORECASE | re.DOTALL)
+# Statements EXPLAIN QUERY PLAN says something useful about
+_EXPLAINABLE = re.compile(r'^\s*(?:SELECT|WITH|INSERT|UPDATE|DELETE|REPLACE)\b', re.IGNORECASE)
+
+
+def is_read_query(query: str) -> bool:
+    return bool(_READ_QUERY.match(query) or _CTE_READ.match(query))
+
+
 @dataclass
 class DatabaseStats:
     total_connections: int
@@ -19,116 +35,358 @@ class DatabaseStats:
     avg_query_time: float
     cache_hits: int
     cache_misses: int
+    reads: int = 0
+    writes: int = 0
+    reads_on_writer: int = 0
+    write_lock_waits: int = 0
+    cache_evictions: int = 0
+    cache_expirations: int = 0
+    cache_invalidations: int = 0
+    cache_entries: int = 0
+    cache_bytes: int = 0
+
+
+@dataclass
+class WriteResult:
+    rowcount: int
+    lastrowid: Optional[int]
+
+
+class QueryResult:
+    """
+    What the ``bot.db.execute(...)`` shim returns. Like aiosqlite's, it can be
+    awaited for a cursor or used as ``async with db.execute(...) as cursor``.
+    """
+
+    __slots__ = ("_coro", "_cursor")
+
+    def __init__(self, coro):
+        self._coro = coro
+        self._cursor = None
+
+    def __await__(self):
+        return self._coro.__await__()
+
+    async def __aenter__(self):
+        self._cursor = await self._coro
+        return self._cursor
+
+    async def __aexit__(self, *exc_info):
+        await self._cursor.close()
+
+
+class BufferedCursor:
+    """
+    A read's rows, fetched as part of the query so the reader connection is
+    free straight away and the rows can be counted. Offers the fetch methods
+    of an aiosqlite cursor.
+    """
+
+    def __init__(self, cursor: aiosqlite.Cursor, rows: List[tuple]):
+        self.description = cursor.description
+        self.rowcount = cursor.rowcount
+        self.lastrowid = cursor.lastrowid
+        self.arraysize = 1
+        self._rows = rows
+        self._index = 0
+
+    async def fetchone(self) -> Optional[tuple]:
+        if self._index >= len(self._rows):
+            return None
+        self._index += 1
+        return self._rows[self._index - 1]
+
+    async def fetchmany(self, size: Optional[int] = None) -> List[tuple]:
+        end = self._index + (size or self.arraysize)
+        rows, self._index = self._rows[self._index:end], min(end, len(self._rows))
+        return rows
+
+    async def fetchall(self) -> List[tuple]:
+        rows, self._index = self._rows[self._index:], len(self._rows)
+        return rows
+
+    async def close(self):
+        pass
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> tuple:
+        row = await self.fetchone()
+        if row is None:
+            raise StopAsyncIteration
+        return row
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+
+@dataclass
+class QuerySample:
+    rows: int = 0
+
 
 class DatabasePool:
     """
     Advanced database connection pool for Opure.bot
     Aye, this'll make our database pure dead brilliant!
+
+    SQLite in WAL mode allows one writer alongside any number of readers, so
+    the pool is exactly that: one writer connection that every INSERT/UPDATE/
+    DDL goes through, and `pool_size` read-only connections that SELECTs are
+    spread over (least busy first). Reads never queue behind writes or each
+    other. While the writer has uncommitted changes, reads are sent to the
+    writer instead so callers keep seeing their own writes, which is how the
+    single shared connection behaved.
     """
     
-    def __init__(self, db_path: str, pool_size: int = 10, enable_wal: bool = True):
+    def __init__(self, db_path: str, pool_size: int = 4, enable_wal: bool = True, busy_timeout_ms: int = 5000,
+                 registry: QueryRegistry = query_registry):
         self.db_path = db_path
         self.pool_size = pool_size
         self.enable_wal = enable_wal
-        self.connections = asyncio.Queue(maxsize=pool_size)
+        self.busy_timeout_ms = busy_timeout_ms
+        self.writer: Optional[aiosqlite.Connection] = None
+        self.readers: List[aiosqlite.Connection] = []
+        self.reader_load: List[int] = []
+        self.write_lock = asyncio.Lock()
+        self._transaction_owner: Optional[asyncio.Task] = None
         self.active_connections = 0
         self.total_queries = 0
         self.query_times = []
-        self.cache = {}
-        self.cache_hits = 0
-        self.cache_misses = 0
+        self.cache = QueryCache()
+        self.registry = registry
+        self.counters = {"reads": 0, "writes": 0, "reads_on_writer": 0, "write_lock_waits": 0}
         self.initialized = False
+        self._init_lock = asyncio.Lock()
         
     async def initialize(self):
-        """Initialize the connection pool"""
-        if self.initialized:
-            return
-            
-        for i in range(self.pool_size):
-            conn = await aiosqlite.connect(self.db_path)
+        """Open the writer, switch the file to WAL, then open the readers"""
+        async with self._init_lock:
+            if self.initialized:
+                return
             
-            # Enable WAL mode for better concurrency
+            self.writer = await aiosqlite.connect(self.db_path)
+            # Enable WAL mode so readers and the writer don't block each other
             if self.enable_wal:
-                await conn.execute("PRAGMA journal_mode=WAL")
-                
-            # Optimize SQLite settings
-            await conn.execute("PRAGMA synchronous=NORMAL")
-            await conn.execute("PRAGMA cache_size=10000")
-            await conn.execute("PRAGMA temp_store=MEMORY")
-            await conn.execute("PRAGMA mmap_size=268435456")  # 256MB
-            
-            await self.connections.put(conn)
+                await self.writer.execute("PRAGMA journal_mode=WAL")
+            await self._tune(self.writer)
             
-        self.initialized = True
-        logging.info(f"🚀 Database pool initialized with {self.pool_size} connections")
+            for _ in range(self.pool_size):
+                conn = await aiosqlite.connect(self.db_path)
+                await self._tune(conn)
+                await conn.execute("PRAGMA query_only=ON")
+                self.readers.append(conn)
+                self.reader_load.append(0)
+                
+            self.initialized = True
+            logging.info(f"🚀 Database pool initialized: 1 writer + {self.pool_size} readers ({self.db_path})")
+    
+    async def _tune(self, conn: aiosqlite.Connection):
+        # Optimize SQLite settings
+        await conn.execute("PRAGMA synchronous=NORMAL")
+        await conn.execute("PRAGMA cache_size=10000")
+        await conn.execute("PRAGMA temp_store=MEMORY")
+        await conn.execute("PRAGMA mmap_size=268435456")  # 256MB
+        await conn.execute(f"PRAGMA busy_timeout={self.busy_timeout_ms}")
+    
+    # --- Connections ---
+    
+    @property
+    def in_transaction(self) -> bool:
+        return bool(self.writer and self.writer.in_transaction)
+    
+    def _holds_write_lock(self) -> bool:
+        return self._transaction_owner is not None and self._transaction_owner is asyncio.current_task()
     
     @asynccontextmanager
-    async def get_connection(self):
-        """Get a connection from the pool"""
+    async def reader(self):
+        """The least busy read connection (the writer while it has uncommitted changes)"""
         if not self.initialized:
             await self.initialize()
-            
-        conn = await self.connections.get()
-        self.active_connections += 1
+        if self.in_transaction or not self.readers:
+            self.counters["reads_on_writer"] += 1
+            yield self.writer
+            return
         
+        index = min(range(len(self.readers)), key=self.reader_load.__getitem__)
+        self.reader_load[index] += 1
+        self.active_connections += 1
         try:
-            yield conn
+            yield self.readers[index]
         finally:
+            self.reader_load[index] -= 1
             self.active_connections -= 1
-            await self.connections.put(conn)
     
-    async def execute(self, query: str, params: tuple = (), fetch_one: bool = False, fetch_all: bool = False, cache_key: Optional[str] = None):
-        """Execute a query with optional caching"""
-        start_time = time.time()
-        
-        # Check cache first
-        if cache_key and cache_key in self.cache:
-            self.cache_hits += 1
-            return self.cache[cache_key]
-        
-        if cache_key:
-            self.cache_misses += 1
-        
-        async with self.get_connection() as conn:
-            cursor = await conn.execute(query, params)
-            
-            result = None
-            if fetch_one:
-                result = await cursor.fetchone()
-            elif fetch_all:
-                result = await cursor.fetchall()
+    @asynccontextmanager
+    async def write_access(self):
+        """Exclusive use of the writer for one statement or a whole transaction"""
+        if not self.initialized:
+            await self.initialize()
+        if self._holds_write_lock():
+            yield self.writer
+            return
+        if self.write_lock.locked():
+            self.counters["write_lock_waits"] += 1
+        async with self.write_lock:
+            self._transaction_owner = asyncio.current_task()
+            try:
+                yield self.writer
+            finally:
+                self._transaction_owner = None
+    
+    @asynccontextmanager
+    async def transaction(self):
+        """
+        ``async with pool.transaction() as conn:`` - statements on `conn` commit
+        together, or roll back if the block raises. Other writers wait.
+        """
+        async with self.write_access() as conn:
+            try:
+                yield conn
+            except BaseException:
+                await conn.rollback()
+                # Reads inside the block may have cached rows that no longer exist
+                self.cache.clear()
+                raise
             else:
-                result = cursor
-            
-            await conn.commit()
-            
-        # Cache result if cache_key provided
-        if cache_key and (fetch_one or fetch_all):
-            self.cache[cache_key] = result
-            
-            # Limit cache size
-            if len(self.cache) > 1000:
-                # Remove oldest 20% of cache entries
-                oldest_keys = list(self.cache.keys())[:200]
-                for key in oldest_keys:
-                    del self.cache[key]
+                await conn.commit()
+    
+    # --- Queries ---
+    
+    def invalidate(self, query: Optional[str] = None, invalidates: Optional[Iterable[Dependency]] = None):
+        """Evict cache entries a write touched: the given rows/tables, else the table the query writes"""
+        if invalidates is not None:
+            for dependency in invalidates:
+                if isinstance(dependency, tuple):
+                    self.cache.invalidate(*dependency)
+                else:
+                    self.cache.invalidate(dependency)
+            return
+        table = written_table(query) if query else None
+        if table:
+            self.cache.invalidate(table)
+        elif query:
+            # DDL and anything we can't attribute to one table
+            self.cache.clear()
+    
+    @asynccontextmanager
+    async def measure(self, query: str, params: Sequence = ()):
+        """Time one statement into the query registry; set ``rows`` on the yielded sample"""
+        statement = self.registry.statement_for(query)
+        sample = QuerySample()
+        start_time = time.perf_counter()
+        try:
+            yield sample
+        except BaseException:
+            statement.record(time.perf_counter() - start_time, error=True)
+            raise
         
         # Track performance
-        query_time = time.time() - start_time
-        self.query_times.append(query_time)
+        elapsed = time.perf_counter() - start_time
+        statement.record(elapsed, sample.rows)
+        self.query_times.append(elapsed)
         self.total_queries += 1
         
         # Keep only last 100 query times for avg calculation
         if len(self.query_times) > 100:
             self.query_times = self.query_times[-50:]
         
+        if self.registry.needs_plan(statement) and _EXPLAINABLE.match(query):
+            statement.explaining = True
+            asyncio.create_task(self._explain(statement, query, params))
+    
+    async def _explain(self, statement: Statement, query: str, params: Sequence):
+        """Debug mode: look at the plan once per statement and flag full table scans"""
+        try:
+            async with self.reader() as conn:
+                async with conn.execute(f"EXPLAIN QUERY PLAN {query}", params) as cursor:
+                    plan = await cursor.fetchall()
+            self.registry.record_plan(statement, plan)
+        except Exception as e:
+            statement.plan = [f"unavailable: {e}"]
+        finally:
+            statement.explaining = False
+    
+    async def cursor(self, query: str, params: Sequence = ()):
+        """
+        Run one statement on the right connection without committing. Reads come
+        back as a BufferedCursor holding every row; writes as the real cursor.
+        """
+        async with self.measure(query, params) as sample:
+            if is_read_query(query):
+                self.counters["reads"] += 1
+                async with self.reader() as conn:
+                    cursor = await conn.execute(query, params)
+                    rows = await cursor.fetchall()
+                    await cursor.close()
+                sample.rows = len(rows)
+                return BufferedCursor(cursor, rows)
+            
+            self.counters["writes"] += 1
+            async with self.write_access() as conn:
+                cursor = await conn.execute(query, params)
+            sample.rows = max(cursor.rowcount, 0)
+        self.invalidate(query)
+        return cursor
+    
+    async def execute(self, query: str, params: tuple = (), fetch_one: bool = False, fetch_all: bool = False,
+                      cache_key: Optional[str] = None, depends_on: Optional[Iterable[Dependency]] = None,
+                      cache_ttl: Optional[float] = None, invalidates: Optional[Iterable[Dependency]] = None):
+        """
+        Execute a query with optional caching; writes are committed straight away.
+        
+        Cached reads depend on the tables they select from unless `depends_on`
+        narrows that to rows, e.g. ``[("user_stats", user_id)]``. Writes evict
+        the table they write to unless `invalidates` names the rows they touch.
+        """
+        # Check cache first
+        stamp = None
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not MISS:
+                return cached
+            depends_on = list(depends_on) if depends_on is not None else list(read_tables(query))
+            stamp = self.cache.stamp({d[0] if isinstance(d, tuple) else d for d in depends_on})
+        
+        async with self.measure(query, params) as sample:
+            if is_read_query(query):
+                self.counters["reads"] += 1
+                async with self.reader() as conn:
+                    cursor = await conn.execute(query, params)
+                    result = await cursor.fetchone() if fetch_one else await cursor.fetchall() if fetch_all else cursor
+            else:
+                self.counters["writes"] += 1
+                # Inside transaction() the block commits; on its own a write commits straight away
+                in_transaction_block = self._holds_write_lock()
+                async with self.write_access() as conn:
+                    cursor = await conn.execute(query, params)
+                    result = await cursor.fetchone() if fetch_one else await cursor.fetchall() if fetch_all else cursor
+                    if not in_transaction_block:
+                        await conn.commit()
+                self.invalidate(query, invalidates)
+            sample.rows = (1 if result else 0) if fetch_one else len(result) if fetch_all else max(cursor.rowcount, 0)
+        
+        # Cache result if cache_key provided
+        if cache_key and (fetch_one or fetch_all):
+            self.cache.put(cache_key, result, depends_on, ttl=cache_ttl, stamp=stamp)
+        
         return result
     
     async def execute_many(self, query: str, params_list: List[tuple]):
         """Execute multiple queries efficiently"""
-        async with self.get_connection() as conn:
-            await conn.executemany(query, params_list)
-            await conn.commit()
+        self.counters["writes"] += 1
+        in_transaction_block = self._holds_write_lock()
+        async with self.measure(query) as sample:
+            async with self.write_access() as conn:
+                cursor = await conn.executemany(query, params_list)
+                if not in_transaction_block:
+                    await conn.commit()
+            sample.rows = max(cursor.rowcount, 0)
+        self.invalidate(query)
     
     def clear_cache(self):
         """Clear the query cache"""
@@ -138,22 +396,34 @@ class DatabasePool:
     def get_stats(self) -> DatabaseStats:
         """Get database pool statistics"""
         avg_query_time = sum(self.query_times) / len(self.query_times) if self.query_times else 0
+        cache = self.cache.get_stats()
         
         return DatabaseStats(
-            total_connections=self.pool_size,
+            total_connections=len(self.readers) + (1 if self.writer else 0),
             active_connections=self.active_connections,
             pool_size=self.pool_size,
             total_queries=self.total_queries,
             avg_query_time=avg_query_time,
-            cache_hits=self.cache_hits,
-            cache_misses=self.cache_misses
+            cache_hits=cache["hits"],
+            cache_misses=cache["misses"],
+            cache_evictions=cache["evictions"],
+            cache_expirations=cache["expirations"],
+            cache_invalidations=cache["invalidations"],
+            cache_entries=cache["entries"],
+            cache_bytes=cache["bytes"],
+            **self.counters
         )
     
     async def close(self):
         """Close all connections in the pool"""
-        while not self.connections.empty():
-            conn = await self.connections.get()
+        for conn in self.readers:
             await conn.close()
+        self.readers.clear()
+        self.reader_load.clear()
+        if self.writer:
+            await self.writer.close()
+            self.writer = None
+        self.initialized = False
         
         logging.info("Database pool closed")
 
@@ -167,175 +437,87 @@ class OpureDatabase:
         self.pool = DatabasePool(db_path)
         self.db_path = db_path
     
-    async def initialize(self):
-        """Initialize database with all required tables"""
+    async def initialize(self) -> List[str]:
+        """Open the pool and bring the schema up to date"""
+        await self.connect()
+        return await self.migrate()
+    
+    async def connect(self):
+        """Open the pool without touching the schema"""
         await self.pool.initialize()
-        await self._create_tables()
-        await self._create_indexes()
-        await self._add_new_columns()  # For upgrades
     
-    async def _create_tables(self):
-        """Create all required database tables"""
-        
-        # User profiles table
-        await self.pool.execute("""
-            CREATE TABLE IF NOT EXISTS user_profiles (
-                user_id INTEGER PRIMARY KEY,
-                username TEXT,
-                fragments INTEGER DEFAULT 0,
-                level INTEGER DEFAULT 1,
-                xp INTEGER DEFAULT 0,
-                lives INTEGER DEFAULT 3,
-                daily_streak INTEGER DEFAULT 0,
-                last_daily DATETIME,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Enhanced achievements table
-        await self.pool.execute("""
-            CREATE TABLE IF NOT EXISTS achievements (
-                achievement_id TEXT PRIMARY KEY,
-                user_id INTEGER,
-                achievement_name TEXT,
-                description TEXT,
-                category TEXT,
-                rarity TEXT,
-                fragments_reward INTEGER,
-                unlocked_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                source_activity TEXT,
-                FOREIGN KEY (user_id) REFERENCES user_profiles (user_id)
-            )
-        """)
-        
-        # Enhanced user stats table
-        await self.pool.execute("""
-            CREATE TABLE IF NOT EXISTS user_stats (
-                user_id INTEGER PRIMARY KEY,
-                music_minutes INTEGER DEFAULT 0,
-                songs_queued INTEGER DEFAULT 0,
-                games_completed INTEGER DEFAULT 0,
-                commands_used INTEGER DEFAULT 0,
-                daily_streak INTEGER DEFAULT 0,
-                social_interactions INTEGER DEFAULT 0,
-                unique_achievements INTEGER DEFAULT 0,
-                juice_wrld_tracks_played INTEGER DEFAULT 0,
-                favorite_genres TEXT DEFAULT '[]',
-                last_activity DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES user_profiles (user_id)
-            )
-        """)
-        
-        # Daily quests table
-        await self.pool.execute("""
-            CREATE TABLE IF NOT EXISTS daily_quests (
-                quest_id TEXT PRIMARY KEY,
-                user_id INTEGER,
-                quest_type TEXT,
-                quest_name TEXT,
-                description TEXT,
-                target_value INTEGER,
-                current_progress INTEGER DEFAULT 0,
-                fragment_reward INTEGER,
-                created_date TEXT,
-                completed_at TEXT,
-                is_completed INTEGER DEFAULT 0,
-                FOREIGN KEY (user_id) REFERENCES user_profiles (user_id)
-            )
-        """)
-        
-        # Enhanced music features table
-        await self.pool.execute("""
-            CREATE TABLE IF NOT EXISTS song_features (
-                song_id TEXT PRIMARY KEY,
-                title TEXT,
-                artist TEXT,
-                album TEXT,
-                features_json TEXT,
-                analyzed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                is_juice_wrld INTEGER DEFAULT 0,
-                mood TEXT,
-                energy_level REAL,
-                tempo INTEGER,
-                genre TEXT
-            )
-        """)
-        
-        # User music preferences
-        await self.pool.execute("""
-            CREATE TABLE IF NOT EXISTS user_music_preferences (
-                user_id INTEGER,
-                genre TEXT,
-                play_count INTEGER DEFAULT 1,
-                last_played DATETIME DEFAULT CURRENT_TIMESTAMP,
-                avg_rating REAL DEFAULT 0,
-                PRIMARY KEY (user_id, genre),
-                FOREIGN KEY (user_id) REFERENCES user_profiles (user_id)
-            )
-        """)
-        
-        # Rate limiting table
-        await self.pool.execute("""
-            CREATE TABLE IF NOT EXISTS rate_limits (
-                user_id INTEGER,
-                operation TEXT,
-                request_count INTEGER DEFAULT 1,
-                window_start DATETIME DEFAULT CURRENT_TIMESTAMP,
-                PRIMARY KEY (user_id, operation)
-            )
-        """)
-        
-        # Performance monitoring
-        await self.pool.execute("""
-            CREATE TABLE IF NOT EXISTS performance_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                operation TEXT,
-                execution_time_ms REAL,
-                success INTEGER DEFAULT 1,
-                error_message TEXT,
-                user_id INTEGER,
-                gpu_utilization REAL
-            )
-        """)
+    async def migrate(self) -> List[str]:
+        """Apply pending schema migrations and check hot-path indexes; returns the migrations applied"""
+        return await MigrationRunner(self).run()
     
-    async def _create_indexes(self):
-        """Create database indexes for performance"""
-        indexes = [
-            "CREATE INDEX IF NOT EXISTS idx_achievements_user_id ON achievements (user_id)",
-            "CREATE INDEX IF NOT EXISTS idx_achievements_category ON achievements (category)",
-            "CREATE INDEX IF NOT EXISTS idx_achievements_rarity ON achievements (rarity)",
-            "CREATE INDEX IF NOT EXISTS idx_daily_quests_user_id ON daily_quests (user_id)",
-            "CREATE INDEX IF NOT EXISTS idx_daily_quests_date ON daily_quests (created_date)",
-            "CREATE INDEX IF NOT EXISTS idx_song_features_is_juice ON song_features (is_juice_wrld)",
-            "CREATE INDEX IF NOT EXISTS idx_song_features_mood ON song_features (mood)",
-            "CREATE INDEX IF NOT EXISTS idx_user_music_prefs_user ON user_music_preferences (user_id)",
-            "CREATE INDEX IF NOT EXISTS idx_performance_logs_timestamp ON performance_logs (timestamp)",
-            "CREATE INDEX IF NOT EXISTS idx_user_stats_last_activity ON user_stats (last_activity)"
-        ]
-        
-        for index_sql in indexes:
-            await self.pool.execute(index_sql)
+    # --- aiosqlite.Connection compatibility, so `bot.db` call sites keep working ---
+    
+    def execute(self, query: str, params: Sequence = ()) -> QueryResult:
+        """
+        Like ``aiosqlite.Connection.execute``: await it or ``async with`` it for a
+        cursor. Reads run on a reader; writes wait for the writer and, as before,
+        stay uncommitted until ``commit()``.
+        """
+        return QueryResult(self.pool.cursor(query, params))
+    
+    async def executemany(self, query: str, params_list: Sequence[Sequence]):
+        self.pool.counters["writes"] += 1
+        async with self.pool.measure(query) as sample:
+            async with self.pool.write_access() as conn:
+                cursor = await conn.executemany(query, params_list)
+            sample.rows = max(cursor.rowcount, 0)
+        self.pool.invalidate(query)
+        return cursor
+    
+    async def commit(self):
+        async with self.pool.write_access() as conn:
+            await conn.commit()
+    
+    async def rollback(self):
+        async with self.pool.write_access() as conn:
+            await conn.rollback()
+        self.pool.cache.clear()
+    
+    @property
+    def in_transaction(self) -> bool:
+        return self.pool.in_transaction
+    
+    # --- Typed helpers ---
+    
+    async def fetch_one(self, query: str, params: Sequence = ()) -> Optional[tuple]:
+        return await self.pool.execute(query, tuple(params), fetch_one=True)
     
-    async def _add_new_columns(self):
-        """Add new columns for upgrades (handles existing databases)"""
+    async def fetch_all(self, query: str, params: Sequence = ()) -> List[tuple]:
+        return await self.pool.execute(query, tuple(params), fetch_all=True)
+    
+    async def fetch_value(self, query: str, params: Sequence = (), default: Any = None) -> Any:
+        """First column of the first row, or `default` when there are no rows"""
+        row = await self.fetch_one(query, params)
+        return row[0] if row is not None else default
+    
+    async def fetch_dicts(self, query: str, params: Sequence = ()) -> List[Dict[str, Any]]:
+        cursor = await self.pool.cursor(query, tuple(params))
         try:
-            # Add Juice WRLD tracking to user_stats
-            await self.pool.execute("ALTER TABLE user_stats ADD COLUMN juice_wrld_tracks_played INTEGER DEFAULT 0")
-            await self.pool.execute("ALTER TABLE user_stats ADD COLUMN favorite_genres TEXT DEFAULT '[]'")
-            await self.pool.execute("ALTER TABLE user_stats ADD COLUMN last_activity DATETIME DEFAULT CURRENT_TIMESTAMP")
-            
-            # Add enhanced song features
-            await self.pool.execute("ALTER TABLE song_features ADD COLUMN is_juice_wrld INTEGER DEFAULT 0")
-            await self.pool.execute("ALTER TABLE song_features ADD COLUMN mood TEXT")
-            await self.pool.execute("ALTER TABLE song_features ADD COLUMN energy_level REAL")
-            await self.pool.execute("ALTER TABLE song_features ADD COLUMN tempo INTEGER")
-            await self.pool.execute("ALTER TABLE song_features ADD COLUMN genre TEXT")
-            
-        except Exception as e:
-            # Columns might already exist
-            pass
+            columns = [column[0] for column in cursor.description or ()]
+            return [dict(zip(columns, row)) for row in await cursor.fetchall()]
+        finally:
+            await cursor.close()
+    
+    async def write(self, query: str, params: Sequence = ()) -> WriteResult:
+        """Run and commit one write (unless inside ``transaction()``)"""
+        cursor = await self.pool.execute(query, tuple(params))
+        return WriteResult(rowcount=cursor.rowcount, lastrowid=cursor.lastrowid)
+    
+    async def write_many(self, query: str, params_list: Sequence[Sequence]):
+        await self.pool.execute_many(query, [tuple(params) for params in params_list])
+    
+    def transaction(self):
+        """``async with db.transaction():`` - helpers used inside commit together"""
+        return self.pool.transaction()
+    
+    def invalidate(self, table: str, row: Any = None):
+        """Evict cached reads of `table` (or just of `row` in it) after writing around the helpers"""
+        self.pool.cache.invalidate(table, row)
     
     # User Management
     async def get_user_profile(self, user_id: int) -> Optional[Dict]:
@@ -344,7 +526,8 @@ class OpureDatabase:
             "SELECT * FROM user_profiles WHERE user_id = ?",
             (user_id,),
             fetch_one=True,
-            cache_key=f"user_profile_{user_id}"
+            cache_key=f"user_profile_{user_id}",
+            depends_on=[("user_profiles", user_id)]
         )
         
         if result:
@@ -356,26 +539,22 @@ class OpureDatabase:
     
     async def update_user_stats(self, user_id: int, **kwargs):
         """Update user statistics"""
-        # Clear cache for this user
-        self.pool.cache.pop(f"user_profile_{user_id}", None)
-        self.pool.cache.pop(f"user_stats_{user_id}", None)
-        
         # Build dynamic update query
         set_clauses = []
-        params = []
+        params = [user_id]
         
         for key, value in kwargs.items():
             set_clauses.append(f"{key} = ?")
             params.append(value)
         
         if set_clauses:
-            params.append(user_id)
             query = f"""
                 INSERT OR REPLACE INTO user_stats 
                 (user_id, {', '.join(kwargs.keys())}, last_activity)
                 VALUES (?, {', '.join(['?' for _ in kwargs])}, CURRENT_TIMESTAMP)
             """
-            await self.pool.execute(query, params)
+            # Only this user's cached stats (and table-wide ones like the fan board) go stale
+            await self.pool.execute(query, params, invalidates=[("user_stats", user_id)])
     
     async def track_juice_wrld_play(self, user_id: int):
         """Track when user plays a Juice WRLD song"""
@@ -384,10 +563,7 @@ class OpureDatabase:
             SET juice_wrld_tracks_played = juice_wrld_tracks_played + 1,
                 last_activity = CURRENT_TIMESTAMP
             WHERE user_id = ?
-        """, (user_id,))
-        
-        # Clear cache
-        self.pool.cache.pop(f"user_stats_{user_id}", None)
+        """, (user_id,), invalidates=[("user_stats", user_id)])
     
     async def get_top_juice_wrld_fans(self, limit: int = 10) -> List[Dict]:
         """Get top Juice WRLD fans by play count"""
@@ -397,7 +573,7 @@ class OpureDatabase:
             WHERE juice_wrld_tracks_played > 0
             ORDER BY juice_wrld_tracks_played DESC
             LIMIT ?
-        """, (limit,), fetch_all=True)
+        """, (limit,), fetch_all=True, cache_key=f"top_juice_wrld_fans_{limit}", cache_ttl=60)
         
         return [{"user_id": row[0], "juice_plays": row[1]} for row in result]
     
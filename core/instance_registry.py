@@ -0,0 +1,78 @@
+# core/instance_registry.py
+# Music instance map with a secondary per-guild index
+
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+IdLike = Union[int, str, None]
+
+
+def _as_id(value: IdLike) -> Optional[int]:
+    """Activity/ws payloads send snowflakes as strings; tolerate both."""
+    if value is None or value == "":
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class InstanceRegistry(MutableMapping):
+    """
+    ``voice_channel_id -> MusicInstance`` dict that also indexes instances by guild.
+
+    It behaves exactly like the plain dict MusicCog used to hold (``get``,
+    ``del``, ``pop``, ``items()``...), so every insert and removal keeps the
+    guild index in step, and per-guild lookups no longer scan every instance.
+    """
+
+    def __init__(self):
+        self._by_channel: Dict[int, Any] = {}
+        self._by_guild: Dict[int, Dict[int, Any]] = {}
+
+    # --- MutableMapping ---
+
+    def __getitem__(self, channel_id: int) -> Any:
+        return self._by_channel[channel_id]
+
+    def __setitem__(self, channel_id: int, instance: Any):
+        if channel_id in self._by_channel:
+            del self[channel_id]
+        self._by_channel[channel_id] = instance
+        self._by_guild.setdefault(instance.guild.id, {})[channel_id] = instance
+
+    def __delitem__(self, channel_id: int):
+        instance = self._by_channel.pop(channel_id)
+        guild_instances = self._by_guild.get(instance.guild.id)
+        if guild_instances is not None:
+            guild_instances.pop(channel_id, None)
+            if not guild_instances:
+                del self._by_guild[instance.guild.id]
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._by_channel)
+
+    def __len__(self) -> int:
+        return len(self._by_channel)
+
+    # --- Queries ---
+
+    def for_guild(self, guild_id: IdLike) -> List[Any]:
+        """Instances in a guild, oldest first."""
+        return list(self._by_guild.get(_as_id(guild_id), {}).values())
+
+    def find(self, guild_id: IdLike = None, channel_id: IdLike = None, playing: bool = False) -> Optional[Any]:
+        """
+        The instance for `channel_id` if there is one, otherwise the first one in
+        `guild_id`. With `playing`, only instances with a current song count.
+        """
+        instance = self._by_channel.get(_as_id(channel_id))
+        if instance is not None and (not playing or instance.current_song):
+            return instance
+        for instance in self._by_guild.get(_as_id(guild_id), {}).values():
+            if not playing or instance.current_song:
+                return instance
+        return None
+
+    def guild_count(self) -> int:
+        return len(self._by_guild)
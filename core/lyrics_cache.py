@@ -0,0 +1,254 @@
+# core/lyrics_cache.py
+# Persistent, single-flight lyrics cache for the music cog's lyrics view
+
+import asyncio
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from core.text_normalization import normalize_text
+
+LYRICS_PAGE_CHARS = 1500
+
+_FIRST_SECTION_PATTERN = re.compile(r'\[(Verse|Chorus|Intro|Outro|Bridge|Hook|Pre-Chorus|Refrain).*?\]', re.IGNORECASE)
+_SECTION_PATTERNS = [(re.compile(pattern, re.IGNORECASE), replacement) for pattern, replacement in (
+    (r'\[Verse.*?\]', '🎤 **Verse**'),
+    (r'\[Chorus.*?\]', '🎵 **Chorus**'),
+    (r'\[Bridge.*?\]', '🌉 **Bridge**'),
+    (r'\[Intro.*?\]', '🚀 **Intro**'),
+    (r'\[Outro.*?\]', '🏁 **Outro**'),
+    (r'\[Pre-Chorus.*?\]', '🎶 **Pre-Chorus**'),
+    (r'\[Hook.*?\]', '🪝 **Hook**'),
+    (r'\[Interlude.*?\]', '🎼 **Interlude**'),
+    (r'\[Refrain.*?\]', '🔄 **Refrain**'),
+)]
+
+
+class LyricsError(Exception):
+    """A lookup failure with a message that can be shown to the user as-is."""
+
+
+@dataclass
+class LyricsResult:
+    title: str
+    artist: str
+    url: str
+    art_url: str = ""
+    pages: List[str] = field(default_factory=list)
+
+
+def normalize_song_key(artist: str, title: str) -> str:
+    """Case/punctuation-insensitive key so "Artist - Song" and "artist song!" share an entry."""
+    return f"{normalize_text(artist)}|{normalize_text(title)}"
+
+
+def format_lyrics_sections(lyrics_text: str) -> str:
+    formatted_lyrics = re.sub(r'\n\s*\n\s*\n+', '\n\n', lyrics_text)
+    formatted_lyrics = re.sub(r'^\s+|\s+$', '', formatted_lyrics, flags=re.MULTILINE)
+    for pattern, replacement in _SECTION_PATTERNS:
+        formatted_lyrics = pattern.sub(f'\n{replacement}\n', formatted_lyrics)
+    formatted_lyrics = re.sub(r'\n{3,}', '\n\n', formatted_lyrics)
+    formatted_lyrics = re.sub(r'(\*\*[^*]+\*\*)\n([^\n])', r'\1\n\n\2', formatted_lyrics)
+    formatted_lyrics = re.sub(r'\[([^\]]*?)\]', r'**\1**', formatted_lyrics)
+    return formatted_lyrics.strip()
+
+
+def paginate_lyrics(lyrics_text: str, max_chars: int = LYRICS_PAGE_CHARS) -> List[str]:
+    pages = []
+    current_page = ""
+    for line in lyrics_text.splitlines():
+        if len(current_page) + len(line) + 1 > max_chars:
+            if current_page.strip():
+                pages.append(current_page.strip())
+            current_page = line + "\n"
+        else:
+            current_page += line + "\n"
+    if current_page.strip():
+        pages.append(current_page.strip())
+    return pages
+
+
+def extract_genius_pages(html_content: str, max_chars: int = LYRICS_PAGE_CHARS) -> List[str]:
+    """Parse a Genius song page into formatted, paginated lyrics. CPU bound; run it in an executor."""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html_content, 'html.parser')
+
+    all_lines = []
+    for div in soup.find_all("div", attrs={"data-lyrics-container": "true"}):
+        text = div.get_text(separator="\n").strip()
+        if text:
+            all_lines.extend(line.strip() for line in text.splitlines() if line.strip())
+    if not all_lines:
+        return []
+
+    lyrics_text = "\n".join(all_lines)
+    first_marker_match = _FIRST_SECTION_PATTERN.search(lyrics_text)
+    if first_marker_match:
+        lyrics_text = lyrics_text[first_marker_match.start():]
+    return paginate_lyrics(format_lyrics_sections(lyrics_text), max_chars)
+
+
+class LyricsCache:
+    """
+    Two-level lyrics cache: a small in-memory LRU in front of SQLite.
+
+    Results are stored already paginated, keyed by the Genius song URL, with
+    lookup keys (normalized artist/title or search text) pointing at them so
+    different spellings of the same song share one entry. Concurrent requests
+    for the same key share a single fetch.
+    """
+
+    def __init__(self, db_path: str = "cache/lyrics.db", ttl: float = 30 * 86400,
+                 memory_entries: int = 256, max_entries: int = 5000):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self.memory: "OrderedDict[str, LyricsResult]" = OrderedDict()
+        self.inflight: Dict[str, asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._writes_since_evict = 0
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "shared_fetches": 0, "fetches": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS lyrics (
+                    song_url TEXT PRIMARY KEY,
+                    result_json TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS lyrics_keys (
+                    key TEXT PRIMARY KEY,
+                    song_url TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_lyrics_last_access ON lyrics(last_access);
+            """)
+            self._conn = conn
+        return self._conn
+
+    def _remember(self, key: str, result: LyricsResult):
+        self.memory[key] = result
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    # --- Blocking SQLite access (run in an executor) ---
+
+    def _load_sync(self, key: Optional[str] = None, song_url: Optional[str] = None) -> Optional[LyricsResult]:
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                if key is not None:
+                    row = conn.execute("SELECT song_url FROM lyrics_keys WHERE key = ?", (key,)).fetchone()
+                    if not row:
+                        return None
+                    song_url = row[0]
+                row = conn.execute("SELECT result_json, fetched_at FROM lyrics WHERE song_url = ?", (song_url,)).fetchone()
+                if not row or row[1] + self.ttl < now:
+                    return None
+                conn.execute("UPDATE lyrics SET last_access = ? WHERE song_url = ?", (now, song_url))
+                return LyricsResult(**json.loads(row[0]))
+        except sqlite3.Error as e:
+            logging.error(f"🎤 Lyrics cache read error: {e}")
+            return None
+
+    def _store_sync(self, keys: List[str], result: LyricsResult):
+        now = time.time()
+        with self._lock:
+            try:
+                conn = self._connect()
+                conn.execute("BEGIN")
+                conn.execute(
+                    "INSERT OR REPLACE INTO lyrics (song_url, result_json, fetched_at, last_access) VALUES (?, ?, ?, ?)",
+                    (result.url, json.dumps(asdict(result)), now, now)
+                )
+                conn.executemany("INSERT OR REPLACE INTO lyrics_keys (key, song_url) VALUES (?, ?)",
+                                 [(key, result.url) for key in keys])
+                conn.execute("COMMIT")
+                self._writes_since_evict += 1
+                if self._writes_since_evict >= 50:
+                    self._writes_since_evict = 0
+                    overflow = conn.execute("SELECT COUNT(*) FROM lyrics").fetchone()[0] - self.max_entries
+                    if overflow > 0:
+                        conn.execute("DELETE FROM lyrics WHERE song_url IN (SELECT song_url FROM lyrics ORDER BY last_access LIMIT ?)", (overflow,))
+                        conn.execute("DELETE FROM lyrics_keys WHERE song_url NOT IN (SELECT song_url FROM lyrics)")
+            except sqlite3.Error as e:
+                logging.error(f"🎤 Lyrics cache write error: {e}")
+                if self._conn is not None and self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+
+    # --- Async API ---
+
+    async def get_by_url(self, song_url: str) -> Optional[LyricsResult]:
+        """Cached lyrics for a Genius URL, so a new spelling of a known song skips the page fetch."""
+        for result in self.memory.values():
+            if result.url == song_url:
+                return result
+        return await asyncio.get_running_loop().run_in_executor(None, lambda: self._load_sync(song_url=song_url))
+
+    async def get_or_fetch(self, key: str, fetch: Callable[[], Awaitable[LyricsResult]]) -> LyricsResult:
+        """
+        Return lyrics for `key`, calling `fetch` at most once no matter how many
+        callers ask concurrently. `fetch` raises LyricsError for user-facing failures.
+        """
+        result = self.memory.get(key)
+        if result is not None:
+            self.memory.move_to_end(key)
+            self.stats["memory_hits"] += 1
+            return result
+
+        task = self.inflight.get(key)
+        if task is not None:
+            self.stats["shared_fetches"] += 1
+        else:
+            task = asyncio.create_task(self._load_or_fetch(key, fetch))
+            self.inflight[key] = task
+            task.add_done_callback(lambda _: self.inflight.pop(key, None))
+        # Shielded so one impatient caller can't cancel the fetch for everyone else
+        return await asyncio.shield(task)
+
+    async def _load_or_fetch(self, key: str, fetch: Callable[[], Awaitable[LyricsResult]]) -> LyricsResult:
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(None, lambda: self._load_sync(key=key))
+        if result is not None:
+            self.stats["disk_hits"] += 1
+        else:
+            self.stats["misses"] += 1
+            result = await fetch()
+            self.stats["fetches"] += 1
+            await loop.run_in_executor(None, self._store_sync, [key], result)
+        self._remember(key, result)
+        return result
+
+    def get_stats(self) -> Dict:
+        lookups = self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "memory_entries": len(self.memory),
+            "inflight": len(self.inflight),
+            "hit_rate": ((self.stats["memory_hits"] + self.stats["disk_hits"]) / lookups * 100) if lookups else 0.0
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# Global lyrics cache instance
+lyrics_cache = LyricsCache()
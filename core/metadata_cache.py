@@ -0,0 +1,291 @@
+# core/metadata_cache.py
+# Persistent yt-dlp metadata cache shared by the music cog, hub and background processor
+
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlencode, urlparse
+
+from core.track_prefetcher import stream_url_expiry
+
+_YOUTUBE_HOSTS = ("youtube.com", "youtu.be", "youtube-nocookie.com")
+_VIDEO_ID_PATTERN = re.compile(r'(?:v=|youtu\.be/|/shorts/|/embed/|/live/)([A-Za-z0-9_-]{11})')
+_LIST_ID_PATTERN = re.compile(r'[?&]list=([A-Za-z0-9_-]+)')
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+# Tracking params, plus Discord CDN signing params that change on every fetch of the same attachment
+_TRACKING_PARAMS = {"si", "feature", "pp", "utm_source", "utm_medium", "utm_campaign", "index", "t", "ex", "is", "hm"}
+
+# Only the fields the bot actually reads; yt-dlp info dicts carry hundreds of KB of formats
+STORED_TRACK_FIELDS = (
+    "id", "title", "uploader", "channel", "artist", "track", "album", "duration",
+    "thumbnail", "webpage_url", "upload_date", "view_count", "like_count",
+    "extractor", "extractor_key", "ie_key", "http_headers",
+)
+
+
+def normalize_lookup_key(query: str) -> str:
+    """Collapse equivalent URLs/search strings onto one cache key."""
+    query = (query or "").strip()
+    if not query.lower().startswith(("http://", "https://")):
+        # ytsearch: prefixes and plain text searches share a key
+        text = re.sub(r'^ytsearch\d*:', '', query, flags=re.IGNORECASE)
+        return "search:" + _WHITESPACE_PATTERN.sub(" ", text).casefold()
+
+    parsed = urlparse(query)
+    host = parsed.netloc.lower().removeprefix("www.").removeprefix("m.").removeprefix("music.")
+    if host.endswith(_YOUTUBE_HOSTS):
+        list_match = _LIST_ID_PATTERN.search(query)
+        if list_match and not list_match.group(1).startswith("RD"):
+            return f"ytlist:{list_match.group(1)}"
+        video_match = _VIDEO_ID_PATTERN.search(query)
+        if video_match:
+            return f"yt:{video_match.group(1)}"
+
+    params = {k: v for k, v in parse_qs(parsed.query).items() if k not in _TRACKING_PARAMS}
+    normalized = f"{host}{parsed.path.rstrip('/')}"
+    if params:
+        normalized += "?" + urlencode(sorted(params.items()), doseq=True)
+    return "url:" + normalized
+
+
+def _entry_key(entry: Dict) -> Optional[str]:
+    if entry.get("extractor_key", "").lower().startswith("youtube") and entry.get("id"):
+        return f"yt:{entry['id']}"
+    url = entry.get("webpage_url") or entry.get("original_url")
+    return normalize_lookup_key(url) if url else None
+
+
+class TrackMetadataCache:
+    """
+    SQLite-backed cache of yt-dlp results with LRU eviction.
+
+    Stable metadata (title, duration, thumbnail...) lives for ``metadata_ttl``;
+    the signed stream URL is stored separately and expires a safety margin
+    before its ``expire=`` timestamp (or after ``stream_ttl``), so a metadata
+    hit can still force a fresh stream resolution. Methods are synchronous
+    and thread-safe because callers run extraction inside executors.
+    """
+
+    def __init__(self, db_path: str = "cache/music/metadata.db", max_entries: int = 5000,
+                 metadata_ttl: float = 7 * 86400, stream_ttl: float = 3600,
+                 stream_safety_margin: float = 300):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.metadata_ttl = metadata_ttl
+        self.stream_ttl = stream_ttl
+        self.stream_safety_margin = stream_safety_margin
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._writes_since_evict = 0
+        self.stats = {"hits": 0, "stream_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS tracks (
+                    key TEXT PRIMARY KEY,
+                    data_json TEXT NOT NULL,
+                    stream_url TEXT,
+                    stream_expires_at REAL NOT NULL DEFAULT 0,
+                    metadata_expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS lookups (
+                    key TEXT PRIMARY KEY,
+                    title TEXT,
+                    webpage_url TEXT,
+                    is_list INTEGER NOT NULL,
+                    track_keys TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_tracks_last_access ON tracks(last_access);
+                CREATE INDEX IF NOT EXISTS idx_lookups_last_access ON lookups(last_access);
+            """)
+            self._conn = conn
+        return self._conn
+
+    def _stream_expiry(self, stream_url: Optional[str], now: float) -> float:
+        if not stream_url:
+            return 0
+        expires_at = now + self.stream_ttl
+        signed_expiry = stream_url_expiry(stream_url)
+        if signed_expiry:
+            expires_at = min(expires_at, signed_expiry - self.stream_safety_margin)
+        return expires_at
+
+    def _load_tracks(self, conn: sqlite3.Connection, keys: List[str], need_stream: bool, now: float) -> Optional[List[Dict]]:
+        placeholders = ",".join("?" * len(keys))
+        rows = conn.execute(
+            f"SELECT key, data_json, stream_url, stream_expires_at, metadata_expires_at FROM tracks WHERE key IN ({placeholders})",
+            keys
+        ).fetchall()
+        by_key = {row[0]: row for row in rows}
+
+        entries = []
+        for key in keys:
+            row = by_key.get(key)
+            if not row or row[4] < now:
+                return None
+            entry = json.loads(row[1])
+            if row[2] and row[3] > now:
+                entry["url"] = row[2]
+            elif need_stream:
+                return None
+            entries.append(entry)
+
+        conn.executemany("UPDATE tracks SET last_access = ? WHERE key = ?", [(now, key) for key in keys])
+        return entries
+
+    def _lookup(self, conn: sqlite3.Connection, query: str, need_stream: bool, now: float) -> Optional[Dict[str, Any]]:
+        key = normalize_lookup_key(query)
+        lookup = conn.execute(
+            "SELECT title, webpage_url, is_list, track_keys, expires_at FROM lookups WHERE key = ?", (key,)
+        ).fetchone()
+        if lookup and lookup[4] >= now:
+            track_keys = json.loads(lookup[3])
+            entries = self._load_tracks(conn, track_keys, need_stream, now) if track_keys else None
+            if entries is None:
+                return None
+            conn.execute("UPDATE lookups SET last_access = ? WHERE key = ?", (now, key))
+            if lookup[2]:
+                return {"_type": "playlist", "title": lookup[0], "webpage_url": lookup[1], "entries": entries}
+            return entries[0]
+        entries = self._load_tracks(conn, [key], need_stream, now)
+        return entries[0] if entries is not None else None
+
+    def get(self, query: str, need_stream: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Return a yt-dlp shaped info dict for `query`, or None on a miss.
+        With `need_stream`, only hits whose stream URL is still valid count.
+        """
+        return self.get_many([query], need_stream)[0]
+
+    def get_many(self, queries: List[str], need_stream: bool = False) -> List[Optional[Dict[str, Any]]]:
+        """``get`` for each of `queries` under one lock and one transaction, in order."""
+        results: List[Optional[Dict[str, Any]]] = [None] * len(queries)
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute("BEGIN")
+                try:
+                    for index, query in enumerate(queries):
+                        results[index] = self._lookup(conn, query, need_stream, now)
+                finally:
+                    conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            logging.error(f"🎵 Metadata cache read error: {e}")
+        hits = sum(1 for result in results if result is not None)
+        self.stats["stream_hits" if need_stream else "hits"] += hits
+        self.stats["misses"] += len(queries) - hits
+        return results
+
+    def put(self, query: str, info: Dict[str, Any]):
+        """Store a yt-dlp result (single track, search or playlist) under `query`."""
+        if not info:
+            return
+        now = time.time()
+        is_list = "entries" in info
+        raw_entries = [entry for entry in (info.get("entries") or []) if entry] if is_list else [info]
+
+        track_rows = []
+        track_keys = []
+        for entry in raw_entries:
+            entry_key = _entry_key(entry)
+            if not entry_key:
+                continue
+            stored = {field: entry[field] for field in STORED_TRACK_FIELDS if entry.get(field) is not None}
+            stream_url = entry.get("url") if entry.get("url") != entry.get("webpage_url") else None
+            track_rows.append((
+                entry_key, json.dumps(stored), stream_url, self._stream_expiry(stream_url, now),
+                now + self.metadata_ttl, now
+            ))
+            track_keys.append(entry_key)
+        if not track_keys:
+            return
+
+        key = normalize_lookup_key(query)
+        with self._lock:
+            try:
+                conn = self._connect()
+                conn.execute("BEGIN")
+                conn.executemany("""
+                    INSERT INTO tracks (key, data_json, stream_url, stream_expires_at, metadata_expires_at, last_access)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(key) DO UPDATE SET
+                        data_json = excluded.data_json,
+                        stream_url = COALESCE(excluded.stream_url, tracks.stream_url),
+                        stream_expires_at = CASE WHEN excluded.stream_url IS NOT NULL
+                                                 THEN excluded.stream_expires_at ELSE tracks.stream_expires_at END,
+                        metadata_expires_at = excluded.metadata_expires_at,
+                        last_access = excluded.last_access
+                """, track_rows)
+                # Searches, playlists and aliased URLs need a lookup row pointing at the tracks
+                if is_list or key != track_keys[0]:
+                    conn.execute("""
+                        INSERT OR REPLACE INTO lookups (key, title, webpage_url, is_list, track_keys, expires_at, last_access)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """, (key, info.get("title"), info.get("webpage_url"), int(is_list and not key.startswith("search:")),
+                          json.dumps(track_keys), now + self.metadata_ttl, now))
+                conn.execute("COMMIT")
+                self.stats["stores"] += 1
+                self._writes_since_evict += 1
+                if self._writes_since_evict >= 50:
+                    self._writes_since_evict = 0
+                    self._evict(conn, now)
+            except sqlite3.Error as e:
+                logging.error(f"🎵 Metadata cache write error: {e}")
+                if self._conn is not None and self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """Drop expired rows, then least recently used ones beyond max_entries."""
+        removed = conn.execute("DELETE FROM tracks WHERE metadata_expires_at < ?", (now,)).rowcount
+        removed += conn.execute("DELETE FROM lookups WHERE expires_at < ?", (now,)).rowcount
+        for table in ("tracks", "lookups"):
+            overflow = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                removed += conn.execute(
+                    f"DELETE FROM {table} WHERE key IN (SELECT key FROM {table} ORDER BY last_access LIMIT ?)",
+                    (overflow,)
+                ).rowcount
+        if removed:
+            self.stats["evictions"] += removed
+            logging.info(f"🧹 Metadata cache evicted {removed} entries")
+
+    def extract_info(self, ytdl, query: str, need_stream: bool = False) -> Optional[Dict[str, Any]]:
+        """Cache-through wrapper around ``ytdl.extract_info(query, download=False)``; blocking, run it in an executor."""
+        cached = self.get(query, need_stream=need_stream)
+        if cached is not None:
+            return cached
+        info = ytdl.extract_info(query, download=False)
+        if info:
+            self.put(query, info)
+        return info
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["stream_hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": ((self.stats["hits"] + self.stats["stream_hits"]) / lookups * 100) if lookups else 0.0
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# Global metadata cache instance
+metadata_cache = TrackMetadataCache()
@@ -0,0 +1,510 @@
+# core/migrations.py
+# Versioned, checksummed schema migrations for the bot database, plus hot-path index checks
+
+import hashlib
+import logging
+import re
+import sqlite3
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+class MigrationError(Exception):
+    """The database's migration history doesn't match the migrations in the code."""
+
+
+@dataclass(frozen=True)
+class AddColumns:
+    """
+    Add whichever of `columns` (name, definition) `table` lacks. Replaces the
+    old ``try: ALTER TABLE ... except: pass`` upgrades, which also swallowed
+    real errors and skipped every later ALTER in the same block.
+    """
+    table: str
+    columns: Tuple[Tuple[str, str], ...]
+
+
+@dataclass(frozen=True)
+class IfSupported:
+    """
+    Statements that need an optional SQLite feature (an extension such as
+    FTS5). They run under a savepoint; if this SQLite can't run them they are
+    rolled back with a warning and the rest of the migration still applies.
+    Code using the feature checks ``sqlite_master`` for what it created.
+    """
+    feature: str
+    statements: Tuple[str, ...]
+
+
+Step = Union[str, AddColumns, IfSupported]
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    steps: Tuple[Step, ...]
+
+    @property
+    def checksum(self) -> str:
+        digest = hashlib.sha256()
+        for step in self.steps:
+            text = step if isinstance(step, str) else repr(step)
+            digest.update(_WHITESPACE.sub(" ", text).strip().encode())
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+
+@dataclass(frozen=True)
+class RequiredIndex:
+    """A hot query path: some index on `table` must start with `columns`, else `name` is created."""
+    table: str
+    columns: Tuple[str, ...]
+    name: str
+
+    @property
+    def create_sql(self) -> str:
+        return f"CREATE INDEX IF NOT EXISTS {self.name} ON {self.table} ({', '.join(self.columns)})"
+
+
+# Never edit a migration once released: its checksum is recorded and checked on startup.
+# Change the schema by appending a new version.
+MIGRATIONS: Tuple[Migration, ...] = (
+    Migration(1, "baseline", (
+        # Game and economy
+        "CREATE TABLE IF NOT EXISTS players (user_id INTEGER PRIMARY KEY, fragments INTEGER DEFAULT 100, data_shards INTEGER DEFAULT 0, last_daily TEXT, daily_streak INTEGER DEFAULT 0, log_keys INTEGER DEFAULT 1, lives INTEGER DEFAULT 3, level INTEGER DEFAULT 1, xp INTEGER DEFAULT 0)",
+        "CREATE TABLE IF NOT EXISTS game_sessions (user_id INTEGER PRIMARY KEY, story_context TEXT, difficulty TEXT DEFAULT 'normal', last_played TEXT, is_active INTEGER DEFAULT 0)",
+        "CREATE TABLE IF NOT EXISTS artifacts (artifact_id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL UNIQUE, description TEXT, rarity TEXT NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS inventory (user_id INTEGER, artifact_id INTEGER, FOREIGN KEY (user_id) REFERENCES players (user_id), FOREIGN KEY (artifact_id) REFERENCES artifacts (artifact_id), PRIMARY KEY (user_id, artifact_id))",
+        "CREATE TABLE IF NOT EXISTS sentient_logs (log_id INTEGER PRIMARY KEY AUTOINCREMENT, content TEXT NOT NULL, timestamp DATETIME NOT NULL, log_type TEXT DEFAULT 'general')",
+        "CREATE TABLE IF NOT EXISTS player_items (user_id INTEGER, item_id TEXT NOT NULL, quantity INTEGER NOT NULL, FOREIGN KEY (user_id) REFERENCES players (user_id), PRIMARY KEY (user_id, item_id))",
+        "CREATE TABLE IF NOT EXISTS playlists (playlist_id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, creator_id INTEGER NOT NULL, guild_id INTEGER NOT NULL, is_public INTEGER DEFAULT 0, track_data TEXT NOT NULL, UNIQUE(name, guild_id))",
+        "CREATE TABLE IF NOT EXISTS command_usage (command_name TEXT, user_id INTEGER, guild_id INTEGER, timestamp DATETIME, PRIMARY KEY (command_name, user_id, timestamp))",
+        """CREATE TABLE IF NOT EXISTS user_quests (
+            quest_id TEXT PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            description TEXT NOT NULL,
+            quest_type TEXT NOT NULL,
+            target INTEGER NOT NULL,
+            current_progress INTEGER DEFAULT 0,
+            reward INTEGER NOT NULL,
+            status TEXT DEFAULT 'active',
+            date_assigned TEXT NOT NULL
+        )""",
+        # One layout for achievements and user_stats: the union of what the bot and OpureDatabase each created
+        """CREATE TABLE IF NOT EXISTS achievements (
+            achievement_id TEXT PRIMARY KEY,
+            user_id INTEGER,
+            achievement_name TEXT,
+            description TEXT,
+            category TEXT,
+            rarity TEXT,
+            fragments_reward INTEGER,
+            unlocked_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            progress_data TEXT,
+            source_activity TEXT
+        )""",
+        """CREATE TABLE IF NOT EXISTS user_stats (
+            user_id INTEGER PRIMARY KEY,
+            messages_sent INTEGER DEFAULT 0,
+            commands_used INTEGER DEFAULT 0,
+            music_tracks_played INTEGER DEFAULT 0,
+            achievements_earned INTEGER DEFAULT 0,
+            music_time_listened INTEGER DEFAULT 0,
+            music_minutes INTEGER DEFAULT 0,
+            songs_queued INTEGER DEFAULT 0,
+            games_completed INTEGER DEFAULT 0,
+            daily_streak INTEGER DEFAULT 0,
+            social_interactions INTEGER DEFAULT 0,
+            unique_achievements INTEGER DEFAULT 0,
+            juice_wrld_tracks_played INTEGER DEFAULT 0,
+            favorite_genres TEXT DEFAULT '[]',
+            last_activity DATETIME DEFAULT CURRENT_TIMESTAMP
+        )""",
+        """CREATE TABLE IF NOT EXISTS daily_quests (
+            quest_id TEXT PRIMARY KEY,
+            user_id INTEGER,
+            quest_type TEXT,
+            quest_name TEXT,
+            description TEXT,
+            target_value INTEGER,
+            current_progress INTEGER DEFAULT 0,
+            fragment_reward INTEGER,
+            created_date TEXT,
+            completed_at TEXT,
+            is_completed INTEGER DEFAULT 0
+        )""",
+        """CREATE TABLE IF NOT EXISTS sync_events (
+            sync_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_type TEXT NOT NULL,
+            data TEXT NOT NULL,
+            timestamp REAL NOT NULL,
+            processed INTEGER DEFAULT 0
+        )""",
+        """CREATE TABLE IF NOT EXISTS bounties (
+            bounty_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            description TEXT NOT NULL,
+            fragment_reward INTEGER NOT NULL,
+            xp_reward INTEGER DEFAULT 0,
+            difficulty TEXT DEFAULT 'normal',
+            category TEXT DEFAULT 'general',
+            category_id INTEGER DEFAULT 1,
+            requirements TEXT,
+            created_date TEXT NOT NULL,
+            expires_date TEXT,
+            is_active INTEGER DEFAULT 1,
+            is_trending INTEGER DEFAULT 0,
+            completion_count INTEGER DEFAULT 0,
+            max_completions INTEGER DEFAULT -1
+        )""",
+        # Profiles, music analysis and bookkeeping
+        """CREATE TABLE IF NOT EXISTS user_profiles (
+            user_id INTEGER PRIMARY KEY,
+            username TEXT,
+            fragments INTEGER DEFAULT 0,
+            level INTEGER DEFAULT 1,
+            xp INTEGER DEFAULT 0,
+            lives INTEGER DEFAULT 3,
+            daily_streak INTEGER DEFAULT 0,
+            last_daily DATETIME,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )""",
+        """CREATE TABLE IF NOT EXISTS song_features (
+            song_id TEXT PRIMARY KEY,
+            title TEXT,
+            artist TEXT,
+            album TEXT,
+            features_json TEXT,
+            analyzed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            is_juice_wrld INTEGER DEFAULT 0,
+            mood TEXT,
+            energy_level REAL,
+            tempo INTEGER,
+            genre TEXT
+        )""",
+        """CREATE TABLE IF NOT EXISTS user_music_preferences (
+            user_id INTEGER,
+            genre TEXT,
+            play_count INTEGER DEFAULT 1,
+            last_played DATETIME DEFAULT CURRENT_TIMESTAMP,
+            avg_rating REAL DEFAULT 0,
+            PRIMARY KEY (user_id, genre)
+        )""",
+        """CREATE TABLE IF NOT EXISTS rate_limits (
+            user_id INTEGER,
+            operation TEXT,
+            request_count INTEGER DEFAULT 1,
+            window_start DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, operation)
+        )""",
+        """CREATE TABLE IF NOT EXISTS performance_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            operation TEXT,
+            execution_time_ms REAL,
+            success INTEGER DEFAULT 1,
+            error_message TEXT,
+            user_id INTEGER,
+            gpu_utilization REAL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_achievements_user_id ON achievements (user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_achievements_category ON achievements (category)",
+        "CREATE INDEX IF NOT EXISTS idx_achievements_rarity ON achievements (rarity)",
+        "CREATE INDEX IF NOT EXISTS idx_daily_quests_user_id ON daily_quests (user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_daily_quests_date ON daily_quests (created_date)",
+        "CREATE INDEX IF NOT EXISTS idx_song_features_is_juice ON song_features (is_juice_wrld)",
+        "CREATE INDEX IF NOT EXISTS idx_song_features_mood ON song_features (mood)",
+        "CREATE INDEX IF NOT EXISTS idx_performance_logs_timestamp ON performance_logs (timestamp)",
+    )),
+    Migration(2, "reconcile_columns", (
+        # Databases created by older builds have one of the two layouts, or neither's later additions.
+        # ALTER TABLE can't add a column with a non-constant default, so last_activity is added bare.
+        AddColumns("sentient_logs", (("log_type", "TEXT DEFAULT 'general'"),)),
+        AddColumns("achievements", (
+            ("progress_data", "TEXT"),
+            ("source_activity", "TEXT"),
+        )),
+        AddColumns("user_stats", (
+            ("messages_sent", "INTEGER DEFAULT 0"),
+            ("commands_used", "INTEGER DEFAULT 0"),
+            ("music_tracks_played", "INTEGER DEFAULT 0"),
+            ("achievements_earned", "INTEGER DEFAULT 0"),
+            ("music_time_listened", "INTEGER DEFAULT 0"),
+            ("music_minutes", "INTEGER DEFAULT 0"),
+            ("songs_queued", "INTEGER DEFAULT 0"),
+            ("games_completed", "INTEGER DEFAULT 0"),
+            ("daily_streak", "INTEGER DEFAULT 0"),
+            ("social_interactions", "INTEGER DEFAULT 0"),
+            ("unique_achievements", "INTEGER DEFAULT 0"),
+            ("juice_wrld_tracks_played", "INTEGER DEFAULT 0"),
+            ("favorite_genres", "TEXT DEFAULT '[]'"),
+            ("last_activity", "DATETIME"),
+        )),
+        AddColumns("bounties", (
+            ("category_id", "INTEGER DEFAULT 1"),
+            ("is_trending", "INTEGER DEFAULT 0"),
+            ("creator_type", "TEXT DEFAULT 'user'"),
+            ("current_participants", "INTEGER DEFAULT 0"),
+        )),
+        AddColumns("song_features", (
+            ("is_juice_wrld", "INTEGER DEFAULT 0"),
+            ("mood", "TEXT"),
+            ("energy_level", "REAL"),
+            ("tempo", "INTEGER"),
+            ("genre", "TEXT"),
+        )),
+        # The sync broadcaster selects user_id from sync_events; the triggers now fill it in
+        AddColumns("sync_events", (("user_id", "INTEGER"),)),
+        "DROP TRIGGER IF EXISTS user_stats_sync_trigger",
+        """CREATE TRIGGER user_stats_sync_trigger
+            AFTER UPDATE ON user_stats
+            FOR EACH ROW
+        BEGIN
+            INSERT INTO sync_events (
+                event_type, user_id, data, timestamp, processed
+            ) VALUES (
+                'user_stats_update',
+                NEW.user_id,
+                json_object(
+                    'user_id', NEW.user_id,
+                    'commands_old', OLD.commands_used,
+                    'commands_new', NEW.commands_used,
+                    'stats_old', json_object('messages_sent', OLD.messages_sent, 'achievements', OLD.achievements_earned),
+                    'stats_new', json_object('messages_sent', NEW.messages_sent, 'achievements', NEW.achievements_earned)
+                ),
+                unixepoch(),
+                0
+            );
+        END""",
+        "DROP TRIGGER IF EXISTS economy_sync_trigger",
+        """CREATE TRIGGER economy_sync_trigger
+            AFTER UPDATE ON players
+            FOR EACH ROW
+            WHEN OLD.fragments != NEW.fragments
+        BEGIN
+            INSERT INTO sync_events (
+                event_type, user_id, data, timestamp, processed
+            ) VALUES (
+                'economy_update',
+                NEW.user_id,
+                json_object(
+                    'user_id', NEW.user_id,
+                    'old_balance', OLD.fragments,
+                    'new_balance', NEW.fragments,
+                    'change', NEW.fragments - OLD.fragments
+                ),
+                unixepoch(),
+                0
+            );
+        END""",
+    )),
+    Migration(3, "hot_path_indexes", (
+        "CREATE INDEX IF NOT EXISTS idx_command_usage_user_time ON command_usage (user_id, timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_command_usage_timestamp ON command_usage (timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_sync_events_timestamp ON sync_events (timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_user_stats_last_activity ON user_stats (last_activity)",
+        "CREATE INDEX IF NOT EXISTS idx_user_quests_user ON user_quests (user_id)",
+    )),
+    Migration(4, "playlist_tracks_and_song_history", (
+        # Previously created by PlaylistStore.ensure_schema and SongHistorySink.start on every startup
+        """CREATE TABLE IF NOT EXISTS playlist_tracks (
+            playlist_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            webpage_url TEXT NOT NULL,
+            title TEXT,
+            duration REAL,
+            data_json TEXT NOT NULL,
+            PRIMARY KEY (playlist_id, position)
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_playlists_guild_name ON playlists (guild_id, name COLLATE NOCASE)",
+        """CREATE TRIGGER IF NOT EXISTS playlists_tracks_ad AFTER DELETE ON playlists BEGIN
+            DELETE FROM playlist_tracks WHERE playlist_id = old.playlist_id;
+        END""",
+        IfSupported("fts5", (
+            "CREATE VIRTUAL TABLE IF NOT EXISTS playlists_fts USING fts5("
+            "name, content='playlists', content_rowid='playlist_id', prefix='1 2 3')",
+            """CREATE TRIGGER IF NOT EXISTS playlists_fts_ai AFTER INSERT ON playlists BEGIN
+                INSERT INTO playlists_fts(rowid, name) VALUES (new.playlist_id, new.name);
+            END""",
+            """CREATE TRIGGER IF NOT EXISTS playlists_fts_ad AFTER DELETE ON playlists BEGIN
+                INSERT INTO playlists_fts(playlists_fts, rowid, name) VALUES ('delete', old.playlist_id, old.name);
+            END""",
+            """CREATE TRIGGER IF NOT EXISTS playlists_fts_au AFTER UPDATE OF name ON playlists BEGIN
+                INSERT INTO playlists_fts(playlists_fts, rowid, name) VALUES ('delete', old.playlist_id, old.name);
+                INSERT INTO playlists_fts(rowid, name) VALUES (new.playlist_id, new.name);
+            END""",
+            "INSERT INTO playlists_fts(playlists_fts) VALUES ('rebuild')",
+        )),
+        """CREATE TABLE IF NOT EXISTS song_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            guild_id INTEGER NOT NULL,
+            title TEXT NOT NULL,
+            webpage_url TEXT,
+            uploader TEXT,
+            duration REAL,
+            listened_seconds REAL,
+            played_at TEXT NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_song_history_user ON song_history (user_id, played_at)",
+    )),
+)
+
+# Checked on every startup; an index whose leading columns match (a primary key counts) satisfies each
+REQUIRED_INDEXES: Tuple[RequiredIndex, ...] = (
+    RequiredIndex("command_usage", ("user_id", "timestamp"), "idx_command_usage_user_time"),
+    RequiredIndex("command_usage", ("timestamp",), "idx_command_usage_timestamp"),
+    RequiredIndex("player_items", ("user_id",), "idx_player_items_user"),
+    RequiredIndex("sync_events", ("timestamp",), "idx_sync_events_timestamp"),
+    RequiredIndex("user_stats", ("last_activity",), "idx_user_stats_last_activity"),
+    RequiredIndex("achievements", ("user_id",), "idx_achievements_user_id"),
+    RequiredIndex("daily_quests", ("user_id",), "idx_daily_quests_user_id"),
+    RequiredIndex("user_quests", ("user_id",), "idx_user_quests_user"),
+    RequiredIndex("song_features", ("mood",), "idx_song_features_mood"),
+    RequiredIndex("song_history", ("user_id", "played_at"), "idx_song_history_user"),
+    RequiredIndex("playlist_tracks", ("playlist_id",), "idx_playlist_tracks_playlist"),
+)
+
+
+class MigrationRunner:
+    """
+    Brings the database up to the latest migration.
+
+    Applied versions are recorded in ``schema_migrations`` with their
+    checksums. A current database costs one SELECT there plus one query for
+    the index check, instead of a CREATE ... IF NOT EXISTS per table. Each
+    pending migration runs in its own transaction together with its record,
+    so a failure leaves the database at the previous version. A checksum
+    that no longer matches means a released migration was edited, and
+    startup stops rather than guessing.
+    """
+
+    def __init__(self, db, migrations: Sequence[Migration] = MIGRATIONS,
+                 required_indexes: Sequence[RequiredIndex] = REQUIRED_INDEXES):
+        versions = [migration.version for migration in migrations]
+        if versions != sorted(set(versions)):
+            raise MigrationError(f"Migration versions must be unique and ascending: {versions}")
+        self.db = db
+        self.migrations = list(migrations)
+        self.required_indexes = list(required_indexes)
+
+    async def applied(self) -> Optional[Dict[int, str]]:
+        """version -> checksum already applied; None if the database has never been migrated"""
+        try:
+            rows = await self.db.fetch_all("SELECT version, checksum FROM schema_migrations")
+        except Exception as e:
+            if "no such table" not in str(e):
+                raise
+            return None
+        return {version: checksum for version, checksum in rows}
+
+    async def run(self) -> List[str]:
+        """Apply pending migrations, then check indexes; returns the names of the migrations applied"""
+        applied = await self.applied()
+        for migration in self.migrations:
+            recorded = (applied or {}).get(migration.version)
+            if recorded is not None and recorded != migration.checksum:
+                raise MigrationError(
+                    f"Migration {migration.version} ({migration.name}) changed after it was applied; "
+                    f"add a new migration instead of editing it"
+                )
+
+        pending = [migration for migration in self.migrations if migration.version not in (applied or {})]
+        if pending and applied is None:
+            await self.db.write("""CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                checksum TEXT NOT NULL,
+                applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )""")
+        for migration in pending:
+            await self._apply(migration)
+            logging.info(f"🗄️ Applied schema migration {migration.version}: {migration.name}")
+        if pending:
+            # Cached reads may predate the new layout
+            self.db.pool.cache.clear()
+
+        await self.ensure_indexes()
+        return [migration.name for migration in pending]
+
+    async def _apply(self, migration: Migration):
+        async with self.db.transaction() as conn:
+            # sqlite3 doesn't open a transaction for DDL on its own
+            if not conn.in_transaction:
+                await conn.execute("BEGIN")
+            for step in migration.steps:
+                if isinstance(step, AddColumns):
+                    await self._add_columns(conn, step)
+                elif isinstance(step, IfSupported):
+                    await self._if_supported(conn, step)
+                else:
+                    await conn.execute(step)
+            await conn.execute(
+                "INSERT INTO schema_migrations (version, name, checksum) VALUES (?, ?, ?)",
+                (migration.version, migration.name, migration.checksum)
+            )
+
+    @staticmethod
+    async def _add_columns(conn, step: AddColumns):
+        async with conn.execute(f"PRAGMA table_info({step.table})") as cursor:
+            existing = {row[1] for row in await cursor.fetchall()}
+        if not existing:
+            return  # Table doesn't exist here; nothing to upgrade
+        for name, definition in step.columns:
+            if name not in existing:
+                await conn.execute(f"ALTER TABLE {step.table} ADD COLUMN {name} {definition}")
+
+    @staticmethod
+    async def _if_supported(conn, step: IfSupported):
+        await conn.execute("SAVEPOINT if_supported")
+        try:
+            for statement in step.statements:
+                await conn.execute(statement)
+        except sqlite3.OperationalError as e:
+            await conn.execute("ROLLBACK TO if_supported")
+            logging.warning(f"🗄️ SQLite lacks {step.feature}, skipping the schema that needs it: {e}")
+        await conn.execute("RELEASE if_supported")
+
+    async def missing_indexes(self) -> List[RequiredIndex]:
+        """Required indexes with no index on their table starting with the required columns"""
+        tables = sorted({index.table for index in self.required_indexes})
+        placeholders = ", ".join("?" for _ in tables)
+        # Every index column of every table involved, in one query; tables without indexes give one NULL row
+        rows = await self.db.fetch_all(f"""
+            SELECT m.name, il.name, ii.seqno, ii.name
+            FROM sqlite_master AS m
+            LEFT JOIN pragma_index_list(m.name) AS il
+            LEFT JOIN pragma_index_info(il.name) AS ii
+            WHERE m.type = 'table' AND m.name IN ({placeholders})
+        """, tables)
+
+        existing_tables = set()
+        columns: Dict[Tuple[str, str], Dict[int, str]] = {}
+        for table, index, seqno, column in rows:
+            existing_tables.add(table)
+            if index is not None and column is not None:
+                columns.setdefault((table, index), {})[seqno] = column
+        leading = {}
+        for (table, _), by_seqno in columns.items():
+            leading.setdefault(table, []).append(tuple(by_seqno[i] for i in sorted(by_seqno)))
+
+        return [
+            required for required in self.required_indexes
+            if required.table in existing_tables and not any(
+                found[:len(required.columns)] == required.columns for found in leading.get(required.table, ())
+            )
+        ]
+
+    async def ensure_indexes(self) -> List[str]:
+        """Create any missing hot-path index, warning about each; returns their names"""
+        created = []
+        for required in await self.missing_indexes():
+            logging.warning(f"🗄️ Missing index for hot query path {required.table}({', '.join(required.columns)}), creating {required.name}")
+            await self.db.write(required.create_sql)
+            created.append(required.name)
+        return created
@@ -12,6 +12,8 @@ import json
 import discord
 from collections import deque, defaultdict
 
+from core.query_registry import query_registry
+
 @dataclass
 class SystemMetrics:
     timestamp: float
@@ -89,7 +91,9 @@ class OpureMonitoringDashboard:
             "response_time_warning": 2.0,
             "response_time_critical": 5.0,
             "error_rate_warning": 10,  # errors per minute
-            "error_rate_critical": 30
+            "error_rate_critical": 30,
+            "db_query_p95_warning": 0.25,  # seconds, per statement
+            "db_query_min_calls": 20  # before a statement's p95 counts
         }
         
         # Tasks
@@ -373,6 +377,18 @@ class OpureMonitoringDashboard:
                 f"Average response time {metrics.avg_response_time:.2f}s - getting a bit sluggish!"
             )
         
+        # Slow SQL statements under real load
+        for statement in query_registry.get_stats(top=5, order_by="p95_ms")["top"]:
+            if statement["calls"] >= self.thresholds["db_query_min_calls"] and \
+                    statement["p95_ms"] >= self.thresholds["db_query_p95_warning"] * 1000:
+                await self._create_alert(
+                    f"db_slow_query_{statement['name']}",
+                    "warning",
+                    "🐢 Slow Database Query",
+                    f"{statement['name']} p95 {statement['p95_ms']:.0f}ms over {statement['calls']} calls"
+                    + (f", full scan of {', '.join(statement['full_scans'])}" if statement["full_scans"] else "")
+                )
+        
         # Special Juice WRLD milestone alerts
         if metrics.juice_wrld_plays_today > 0 and metrics.juice_wrld_plays_today % 100 == 0:
             await self._create_alert(
@@ -485,11 +501,19 @@ class OpureMonitoringDashboard:
             "status": status,
             "system": asdict(latest_system),
             "bot": asdict(latest_bot),
+            "database": self.get_database_status(),
             "active_alerts": len(active_alerts),
             "critical_alerts": len(critical_alerts),
             "uptime": time.time() - (self.system_metrics[0].timestamp if self.system_metrics else time.time())
         }
     
+    def get_database_status(self, top: int = 10) -> Dict[str, Any]:
+        """Pool and cache counters plus the most expensive SQL statements"""
+        pool = None
+        if hasattr(self.bot, 'db') and hasattr(self.bot.db, 'pool'):
+            pool = asdict(self.bot.db.pool.get_stats())
+        return {"pool": pool, "queries": query_registry.get_stats(top=top)}
+    
     def get_historical_data(self, hours: int = 1) -> Dict[str, List]:
         """Get historical metrics data"""
         cutoff_time = time.time() - (hours * 3600)
@@ -5,21 +5,27 @@ import asyncio
 import yt_dlp
 import time
 import logging
+from collections import OrderedDict, deque
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Dict, List, Optional, Callable, Any
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
+import itertools
 import json
 import hashlib
 import os
 from pathlib import Path
 
+from core.metadata_cache import metadata_cache, normalize_lookup_key
+from core.text_normalization import estimate_mood, is_juice_wrld_track
+
 class ProcessingStatus(Enum):
     PENDING = "pending"
     PROCESSING = "processing"
     COMPLETED = "completed"
     FAILED = "failed"
     CACHED = "cached"
+    CANCELLED = "cancelled"
 
 @dataclass
 class MusicProcessingJob:
@@ -42,6 +48,16 @@ class MusicProcessingJob:
         if self.callbacks is None:
             self.callbacks = []
 
+@dataclass
+class _Extraction:
+    """One yt-dlp extraction shared by every job currently asking for the same URL"""
+    key: str
+    url: str
+    guild_id: int
+    priority: int
+    jobs: List[MusicProcessingJob] = field(default_factory=list)
+    started: bool = False
+
 class BackgroundMusicProcessor:
     """
     Advanced background music processor for Opure.bot
@@ -52,17 +68,21 @@ class BackgroundMusicProcessor:
     def __init__(self, max_workers: int = 4, cache_size: int = 500):
         self.max_workers = max_workers
         self.cache_size = cache_size
-        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="MusicWorker")
+        self._create_executors()
         
-        # Processing queues by priority
-        self.high_priority_queue = asyncio.Queue()
-        self.normal_priority_queue = asyncio.Queue()
-        self.urgent_queue = asyncio.Queue()
+        # Single scheduler: priority -> guild_id -> FIFO of extractions.
+        # Guilds are served round-robin within a priority so one huge import can't starve others.
+        self.pending: Dict[int, "OrderedDict[int, deque]"] = {3: OrderedDict(), 2: OrderedDict(), 1: OrderedDict()}
+        self.pending_count = 0
+        self.job_available = asyncio.Condition()
+        self.extractions: Dict[str, _Extraction] = {}  # In-flight extractions by normalized URL
+        self._job_counter = itertools.count()
         
         # Job tracking
         self.active_jobs: Dict[str, MusicProcessingJob] = {}
         self.completed_jobs: Dict[str, MusicProcessingJob] = {}
-        self.cache: Dict[str, Dict] = {}
+        # Resolved metadata is shared with the music cog via the persistent cache
+        self.cache = metadata_cache
         
         # Worker tasks
         self.workers: List[asyncio.Task] = []
@@ -74,6 +94,8 @@ class BackgroundMusicProcessor:
             "cache_hits": 0,
             "cache_misses": 0,
             "failed_jobs": 0,
+            "deduplicated_jobs": 0,
+            "cancelled_jobs": 0,
             "avg_processing_time": 0,
             "active_workers": 0
         }
@@ -110,6 +132,9 @@ class BackgroundMusicProcessor:
             return
         
         self.running = True
+        if self.executors_shut_down:
+            # Started again after stop(), e.g. a cog reload with the same module-global processor
+            self._create_executors()
         
         # Start worker tasks
         for i in range(self.max_workers):
@@ -125,6 +150,8 @@ class BackgroundMusicProcessor:
     async def stop(self):
         """Stop all workers and cleanup"""
         self.running = False
+        async with self.job_available:
+            self.job_available.notify_all()
         
         # Cancel all workers
         for worker in self.workers:
@@ -132,15 +159,34 @@ class BackgroundMusicProcessor:
         
         # Wait for workers to finish
         await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        
+        # Nothing will run the jobs still waiting, so fail them now; ordered resolves waiting on them move on
+        for priority in self.pending:
+            self.pending[priority].clear()
+        self.pending_count = 0
+        self.extractions.clear()
+        for job in list(self.active_jobs.values()):
+            await self._handle_job_error(job, "Music processor stopped")
+            self.active_jobs.pop(job.id, None)
+            self.completed_jobs[job.id] = job
         
-        # Shutdown executor
+        # Shutdown executors
         self.executor.shutdown(wait=False)
+        self.cache_executor.shutdown(wait=False)
+        self.executors_shut_down = True
         
         logging.info("🎵 Music processor stopped")
     
+    def _create_executors(self):
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="MusicWorker")
+        # Cache reads get their own thread so they never queue behind slow extractions
+        self.cache_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="MusicCache")
+        self.executors_shut_down = False
+    
     def _generate_job_id(self, url: str, requester_id: int) -> str:
         """Generate unique job ID"""
-        data = f"{url}_{requester_id}_{time.time()}"
+        data = f"{url}_{requester_id}_{time.time()}_{next(self._job_counter)}"
         return hashlib.md5(data.encode()).hexdigest()[:12]
     
     def _get_cache_key(self, url: str) -> str:
@@ -162,35 +208,52 @@ class BackgroundMusicProcessor:
         Returns:
             job_id: Unique identifier for this processing job
         """
-        
         # Check cache first
-        cache_key = self._get_cache_key(url)
-        if cache_key in self.cache:
-            self.stats["cache_hits"] += 1
-            
-            # Create fake job for cached result
-            job_id = self._generate_job_id(url, requester_id)
-            job = MusicProcessingJob(
-                id=job_id,
-                url=url,
-                requester_id=requester_id,
-                guild_id=guild_id,
-                status=ProcessingStatus.CACHED,
-                result=self.cache[cache_key],
-                completed_at=time.time()
-            )
-            
-            if callback:
-                job.callbacks.append(callback)
-                # Execute callback immediately for cached result
-                try:
-                    await callback(job.result, None)
-                except Exception as e:
-                    logging.error(f"Callback error for cached result: {e}")
-            
-            self.completed_jobs[job_id] = job
-            return job_id
+        cached_info = await asyncio.get_event_loop().run_in_executor(self.cache_executor, self.cache.get, url)
+        cached_result = self._shape_info(cached_info, url) if cached_info else None
+        if cached_result:
+            return await self._complete_from_cache(url, requester_id, guild_id, cached_result, callback)
+        
+        async with self.job_available:
+            job_id = self._submit(url, requester_id, guild_id, priority, callback)
+            self.job_available.notify()
+        return job_id
+    
+    async def _complete_from_cache(self, url: str, requester_id: int, guild_id: int,
+                                   cached_result: Dict, callback: Optional[Callable]) -> str:
+        """Record a cache hit as an already-finished job and run its callback"""
+        self.stats["cache_hits"] += 1
         
+        # Create fake job for cached result
+        job_id = self._generate_job_id(url, requester_id)
+        job = MusicProcessingJob(
+            id=job_id,
+            url=url,
+            requester_id=requester_id,
+            guild_id=guild_id,
+            status=ProcessingStatus.CACHED,
+            result=cached_result,
+            completed_at=time.time()
+        )
+        
+        if callback:
+            job.callbacks.append(callback)
+            # Execute callback immediately for cached result
+            try:
+                await callback(job.result, None)
+            except Exception as e:
+                logging.error(f"Callback error for cached result: {e}")
+        
+        self.completed_jobs[job_id] = job
+        return job_id
+    
+    def _submit(self, url: str, requester_id: int, guild_id: int, priority: int,
+                callback: Optional[Callable]) -> str:
+        """
+        Create a job for a cache miss and schedule its extraction (or join one
+        already in flight). Call with ``job_available`` held and notify after.
+        """
+        priority = max(1, min(3, priority))
         self.stats["cache_misses"] += 1
         
         # Create new processing job
@@ -207,86 +270,176 @@ class BackgroundMusicProcessor:
         if callback:
             job.callbacks.append(callback)
         
-        # Add to appropriate queue based on priority
-        if priority == 3:
-            await self.urgent_queue.put(job)
-        elif priority == 2:
-            await self.high_priority_queue.put(job)
-        else:
-            await self.normal_priority_queue.put(job)
-        
         self.active_jobs[job_id] = job
         
+        # Piggyback on an extraction that's already queued or running for this URL
+        key = normalize_lookup_key(url)
+        extraction = self.extractions.get(key)
+        if extraction:
+            extraction.jobs.append(job)
+            if extraction.started:
+                job.status = ProcessingStatus.PROCESSING
+                job.started_at = time.time()
+            elif priority > extraction.priority:
+                self._unschedule(extraction)
+                extraction.priority = priority
+                self._schedule(extraction)
+            self.stats["deduplicated_jobs"] += 1
+            logging.info(f"🎵 Job {job_id} joined in-flight extraction for {url[:50]}")
+            return job_id
+        
+        extraction = _Extraction(key=key, url=url, guild_id=guild_id, priority=priority, jobs=[job])
+        self.extractions[key] = extraction
+        self._schedule(extraction)
+        
         logging.info(f"🎵 Queued music processing job {job_id} (priority: {priority})")
         return job_id
     
+    def _schedule(self, extraction: _Extraction):
+        """Append an extraction to its guild's FIFO at its priority"""
+        guilds = self.pending[extraction.priority]
+        if extraction.guild_id not in guilds:
+            guilds[extraction.guild_id] = deque()
+        guilds[extraction.guild_id].append(extraction)
+        self.pending_count += 1
+    
+    def _unschedule(self, extraction: _Extraction):
+        """Remove a not-yet-started extraction from the scheduler"""
+        guilds = self.pending[extraction.priority]
+        jobs = guilds.get(extraction.guild_id)
+        if jobs is None:
+            return
+        try:
+            jobs.remove(extraction)
+            self.pending_count -= 1
+        except ValueError:
+            return
+        if not jobs:
+            del guilds[extraction.guild_id]
+    
+    def _next_extraction(self) -> Optional[_Extraction]:
+        """Highest priority first, round-robin across guilds, FIFO within a guild"""
+        for priority in (3, 2, 1):
+            guilds = self.pending[priority]
+            if not guilds:
+                continue
+            guild_id, jobs = next(iter(guilds.items()))
+            extraction = jobs.popleft()
+            if jobs:
+                guilds.move_to_end(guild_id)
+            else:
+                del guilds[guild_id]
+            self.pending_count -= 1
+            return extraction
+        return None
+    
+    def cancel_job(self, job_id: str) -> bool:
+        """
+        Cancel a pending or running job. The shared extraction is only dropped
+        once no other job is waiting on it; a running yt-dlp call can't be
+        interrupted, but its result will no longer reach this job's callbacks,
+        which get a "cancelled" error instead.
+        """
+        job = self.active_jobs.get(job_id)
+        if not job:
+            return False
+        
+        extraction = self.extractions.get(normalize_lookup_key(job.url))
+        if extraction and job in extraction.jobs:
+            extraction.jobs.remove(job)
+            if not extraction.jobs and not extraction.started:
+                self._unschedule(extraction)
+                del self.extractions[extraction.key]
+        
+        job.status = ProcessingStatus.CANCELLED
+        job.error = "cancelled"
+        job.completed_at = time.time()
+        del self.active_jobs[job_id]
+        self.completed_jobs[job_id] = job
+        self.stats["cancelled_jobs"] += 1
+        
+        # Callers waiting on the job (ordered resolves) see it as failed and skip it
+        for callback in job.callbacks:
+            asyncio.create_task(self._run_error_callback(callback, job.error))
+        return True
+    
+    @staticmethod
+    async def _run_error_callback(callback: Callable, error: str):
+        try:
+            await callback(None, error)
+        except Exception as e:
+            logging.error(f"Error callback failed: {e}")
+    
     async def _worker(self, worker_name: str):
         """Background worker that processes music jobs"""
         logging.info(f"🎵 {worker_name} started")
         
         while self.running:
+            extraction = None
             try:
-                job = None
+                # Sleep until there's work instead of polling the queues
+                async with self.job_available:
+                    await self.job_available.wait_for(lambda: self.pending_count > 0 or not self.running)
+                    if not self.running:
+                        break
+                    extraction = self._next_extraction()
                 
-                # Check queues in priority order
-                try:
-                    job = await asyncio.wait_for(self.urgent_queue.get(), timeout=0.1)
-                except asyncio.TimeoutError:
-                    try:
-                        job = await asyncio.wait_for(self.high_priority_queue.get(), timeout=0.1)
-                    except asyncio.TimeoutError:
-                        try:
-                            job = await asyncio.wait_for(self.normal_priority_queue.get(), timeout=1.0)
-                        except asyncio.TimeoutError:
-                            continue
-                
-                if job is None:
+                if extraction is None:
                     continue
                 
                 self.stats["active_workers"] += 1
-                await self._process_job(job, worker_name)
-                self.stats["active_workers"] -= 1
+                try:
+                    await self._process_job(extraction, worker_name)
+                finally:
+                    self.stats["active_workers"] -= 1
                 
             except asyncio.CancelledError:
                 break
             except Exception as e:
                 logging.error(f"Worker {worker_name} error: {e}")
-                if job:
-                    await self._handle_job_error(job, str(e))
+                if extraction:
+                    for job in list(extraction.jobs):
+                        await self._handle_job_error(job, str(e))
         
         logging.info(f"🎵 {worker_name} stopped")
     
-    async def _process_job(self, job: MusicProcessingJob, worker_name: str):
-        """Process a single music job"""
-        job.status = ProcessingStatus.PROCESSING
-        job.started_at = time.time()
+    async def _process_job(self, extraction: _Extraction, worker_name: str):
+        """Process one extraction and fan its result out to every job waiting on it"""
+        extraction.started = True
+        started_at = time.time()
+        for job in extraction.jobs:
+            job.status = ProcessingStatus.PROCESSING
+            job.started_at = started_at
         
         try:
-            logging.info(f"🎵 {worker_name} processing {job.id}: {job.url[:50]}...")
+            logging.info(f"🎵 {worker_name} processing {extraction.url[:50]}... for {len(extraction.jobs)} job(s)")
             
             # Extract info in executor to avoid blocking
             loop = asyncio.get_event_loop()
             result = await loop.run_in_executor(
                 self.executor,
                 self._extract_music_info,
-                job.url
+                extraction.url
             )
-            
-            if result:
+        except Exception as e:
+            result = None
+            error = str(e)
+        else:
+            error = None if result else "Failed to extract music information"
+        finally:
+            # New requests for this URL start a fresh extraction from here on
+            self.extractions.pop(extraction.key, None)
+        
+        completed_at = time.time()
+        for job in list(extraction.jobs):
+            try:
+                if error:
+                    await self._handle_job_error(job, error)
+                    continue
+                
                 job.result = result
                 job.status = ProcessingStatus.COMPLETED
-                job.completed_at = time.time()
-                
-                # Cache the result
-                cache_key = self._get_cache_key(job.url)
-                self.cache[cache_key] = result
-                
-                # Limit cache size
-                if len(self.cache) > self.cache_size:
-                    # Remove oldest 20% of cache
-                    items_to_remove = list(self.cache.keys())[:self.cache_size // 5]
-                    for key in items_to_remove:
-                        del self.cache[key]
+                job.completed_at = completed_at
                 
                 # Execute callbacks
                 for callback in job.callbacks:
@@ -294,36 +447,37 @@ class BackgroundMusicProcessor:
                         await callback(result, None)
                     except Exception as e:
                         logging.error(f"Callback error: {e}")
-                
-                # Update statistics
-                processing_time = job.completed_at - job.started_at
-                self.stats["total_processed"] += 1
-                
-                # Update average processing time
-                current_avg = self.stats["avg_processing_time"]
-                total_jobs = self.stats["total_processed"]
-                self.stats["avg_processing_time"] = (current_avg * (total_jobs - 1) + processing_time) / total_jobs
-                
-                logging.info(f"✅ {worker_name} completed {job.id} in {processing_time:.2f}s")
-                
-            else:
-                raise Exception("Failed to extract music information")
+            finally:
+                # Move job to completed
+                self.active_jobs.pop(job.id, None)
+                self.completed_jobs[job.id] = job
+        
+        if not error:
+            # Update statistics
+            processing_time = completed_at - started_at
+            self.stats["total_processed"] += 1
             
-        except Exception as e:
-            await self._handle_job_error(job, str(e))
-        
-        finally:
-            # Move job to completed
-            if job.id in self.active_jobs:
-                del self.active_jobs[job.id]
-            self.completed_jobs[job.id] = job
+            # Update average processing time
+            current_avg = self.stats["avg_processing_time"]
+            total_jobs = self.stats["total_processed"]
+            self.stats["avg_processing_time"] = (current_avg * (total_jobs - 1) + processing_time) / total_jobs
+            
+            logging.info(f"✅ {worker_name} completed {extraction.url[:50]} in {processing_time:.2f}s")
     
     def _extract_music_info(self, url: str) -> Optional[Dict]:
         """Extract music information using yt-dlp (runs in executor)"""
         try:
-            # Enhanced extraction with Juice WRLD detection
-            info = self.ytdl.extract_info(url, download=False)
-            
+            # Goes through the shared cache so re-queued tracks skip the network
+            info = self.cache.extract_info(self.ytdl, url)
+            return self._shape_info(info, url)
+                
+        except Exception as e:
+            logging.error(f"Music extraction error: {e}")
+            return None
+    
+    def _shape_info(self, info: Optional[Dict], url: str) -> Optional[Dict]:
+        """Convert a raw yt-dlp info dict into the processor's result format"""
+        try:
             if not info:
                 return None
             
@@ -390,34 +544,11 @@ class BackgroundMusicProcessor:
     
     def _is_juice_wrld_track(self, title: str, artist: str) -> bool:
         """Check if track is by Juice WRLD"""
-        juice_indicators = [
-            "juice wrld", "juice world", "jarad higgins", "999",
-            "juicewrld", "juice", "grad a productions"
-        ]
-        
-        full_text = f"{title} {artist}".lower()
-        return any(indicator in full_text for indicator in juice_indicators)
+        return is_juice_wrld_track(title, artist)
     
     def _estimate_mood(self, title: str, artist: str) -> str:
-        """Basic mood estimation based on title/artist"""
-        title_lower = title.lower()
-        
-        # Sad/emotional keywords
-        sad_keywords = ["sad", "cry", "tear", "hurt", "pain", "lonely", "empty", "miss", "broken"]
-        if any(keyword in title_lower for keyword in sad_keywords):
-            return "sad"
-        
-        # Happy/energetic keywords  
-        happy_keywords = ["happy", "party", "dance", "celebrate", "joy", "energy", "pump", "hype"]
-        if any(keyword in title_lower for keyword in happy_keywords):
-            return "happy"
-        
-        # Chill/relaxed keywords
-        chill_keywords = ["chill", "relax", "calm", "peaceful", "slow", "ambient", "lo-fi", "lofi"]
-        if any(keyword in title_lower for keyword in chill_keywords):
-            return "chill"
-        
-        return "neutral"
+        """Basic mood estimation (sad > happy > chill > neutral) from title keywords"""
+        return estimate_mood(title)
     
     async def _handle_job_error(self, job: MusicProcessingJob, error: str):
         """Handle job processing error"""
@@ -472,16 +603,90 @@ class BackgroundMusicProcessor:
     
     def get_queue_stats(self) -> Dict[str, Any]:
         """Get current queue and processing statistics"""
+        def queued(priority: int) -> int:
+            return sum(len(jobs) for jobs in self.pending[priority].values())
+        
         return {
-            "urgent_queue_size": self.urgent_queue.qsize(),
-            "high_priority_queue_size": self.high_priority_queue.qsize(),
-            "normal_queue_size": self.normal_priority_queue.qsize(),
+            "urgent_queue_size": queued(3),
+            "high_priority_queue_size": queued(2),
+            "normal_queue_size": queued(1),
+            "in_flight_extractions": len(self.extractions),
             "active_jobs": len(self.active_jobs),
             "completed_jobs": len(self.completed_jobs),
-            "cache_size": len(self.cache),
+            "metadata_cache": self.cache.get_stats(),
             **self.stats
         }
     
+    async def resolve_in_order(self, urls: List[str], requester_id: int, guild_id: int,
+                               on_ready: Callable, eager: int = 3, first_timeout: float = 40.0) -> asyncio.Event:
+        """
+        Resolve many URLs in parallel but hand them back in their original order
+        
+        `on_ready(index, result)` is awaited for each successfully resolved URL,
+        strictly in list order, as soon as it and everything before it finished.
+        Failed entries are skipped. The first URL is queued as urgent and the next
+        few as high priority so playback can start before the rest resolve.
+        
+        The whole list is checked against the metadata cache in one batch and
+        every miss is scheduled at once. Returns as soon as the first entry has
+        been handed back (or everything failed), or after `first_timeout`
+        seconds, with an event that is set once every URL has been handed back
+        or skipped.
+        """
+        finished = asyncio.Event()
+        first_released = asyncio.Event()
+        results: Dict[int, Optional[Dict]] = {}
+        release_lock = asyncio.Lock()
+        next_index = 0
+        
+        if not urls:
+            finished.set()
+            return finished
+        
+        async def release():
+            nonlocal next_index
+            async with release_lock:
+                while next_index in results:
+                    result = results.pop(next_index)
+                    if result:
+                        try:
+                            await on_ready(next_index, result)
+                        except Exception as e:
+                            logging.error(f"Ordered resolve callback error: {e}")
+                        first_released.set()
+                    next_index += 1
+                if next_index >= len(urls):
+                    finished.set()
+                    first_released.set()
+        
+        def make_callback(index: int):
+            async def callback(result, error):
+                results[index] = None if error else result
+                await release()
+            return callback
+        
+        cached_infos = await asyncio.get_event_loop().run_in_executor(self.cache_executor, self.cache.get_many, urls)
+        
+        hits = []
+        async with self.job_available:
+            for index, (url, cached_info) in enumerate(zip(urls, cached_infos)):
+                cached_result = self._shape_info(cached_info, url) if cached_info else None
+                if cached_result:
+                    hits.append((index, url, cached_result))
+                    continue
+                priority = 3 if index == 0 else 2 if index < eager else 1
+                self._submit(url, requester_id, guild_id, priority, make_callback(index))
+            self.job_available.notify_all()
+        
+        for index, url, cached_result in hits:
+            await self._complete_from_cache(url, requester_id, guild_id, cached_result, make_callback(index))
+        
+        try:
+            await asyncio.wait_for(first_released.wait(), timeout=first_timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"🎵 No entry of {len(urls)} resolved within {first_timeout:g}s, the rest keep resolving")
+        return finished
+    
     async def wait_for_job(self, job_id: str, timeout: float = 30.0) -> Optional[Dict]:
         """Wait for a job to complete and return the result"""
         start_time = time.time()
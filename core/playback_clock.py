@@ -0,0 +1,91 @@
+# core/playback_clock.py
+# Monotonic playback position for a music instance, published to clients as anchors
+
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+class PlaybackClock:
+    """
+    Where the current track is, in seconds, accounting for pause, resume and seek.
+
+    The position is kept as an anchor: the position at some ``time.monotonic()``
+    instant plus a rate (1 while playing, 0 while paused or stopped), so reading
+    it never drifts and wall-clock jumps can't move it. Every discontinuity
+    (start, pause, resume, seek, stop) re-anchors and bumps ``epoch``.
+
+    ``anchor()`` is what clients get: the same position stamped with server
+    wall time in ms, so they interpolate ``position + rate * (now - anchored_at)``
+    locally and only need a new anchor when the epoch changes.
+    """
+
+    def __init__(self, monotonic: Callable[[], float] = time.monotonic, wall: Callable[[], float] = time.time):
+        self._monotonic = monotonic
+        self._wall = wall
+        self.epoch = 0
+        self.duration: Optional[float] = None
+        self.active = False  # A track is loaded
+        self.running = False  # ...and audio is advancing
+        self._position = 0.0
+        self._anchored_at = monotonic()
+
+    def _reanchor(self, position: float):
+        if self.duration:
+            position = min(position, float(self.duration))
+        self._position = max(0.0, position)
+        self._anchored_at = self._monotonic()
+        self.epoch += 1
+
+    def position(self) -> float:
+        """Seconds into the current track."""
+        if not self.running:
+            return self._position
+        position = self._position + (self._monotonic() - self._anchored_at)
+        return min(position, float(self.duration)) if self.duration else position
+
+    # --- Discontinuities ---
+
+    def start(self, duration: Optional[float] = None, position: float = 0.0):
+        """A track started playing at `position` seconds."""
+        self.duration = duration or None
+        self.active = True
+        self.running = True
+        self._reanchor(position)
+
+    def pause(self) -> bool:
+        if not self.running:
+            return False
+        self._reanchor(self.position())
+        self.running = False
+        return True
+
+    def resume(self) -> bool:
+        if not self.active or self.running:
+            return False
+        self._reanchor(self._position)
+        self.running = True
+        return True
+
+    def seek(self, position: float):
+        """Jump to `position`; a paused track stays paused."""
+        self._reanchor(position)
+
+    def stop(self):
+        self.active = False
+        self.running = False
+        self.duration = None
+        self._reanchor(0.0)
+
+    # --- Wire format ---
+
+    def anchor(self) -> Dict[str, Any]:
+        """The clock as clients see it; valid until the next ``epoch``."""
+        return {
+            "epoch": self.epoch,
+            "position": round(self.position(), 3),
+            "anchored_at": int(self._wall() * 1000),
+            "rate": 1.0 if self.running else 0.0,
+            "is_playing": self.running,
+            "active": self.active,
+            "duration": self.duration,
+        }
@@ -0,0 +1,168 @@
+# core/playlist_store.py
+# Saved playlists stored as one indexed row per track instead of a JSON blob
+
+import json
+import logging
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from core.database_manager import OpureDatabase
+from core.metadata_cache import STORED_TRACK_FIELDS
+
+_TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+def _track_row(entry: Dict[str, Any]) -> Optional[Tuple[str, str, Optional[float], str]]:
+    """(webpage_url, title, duration, data_json) for a yt-dlp entry, or None if it can't be replayed."""
+    if not entry:
+        return None
+    webpage_url = entry.get('webpage_url') or entry.get('original_url') or entry.get('url')
+    if not webpage_url:
+        return None
+    stored = {field: entry[field] for field in STORED_TRACK_FIELDS if entry.get(field) is not None}
+    stored['webpage_url'] = webpage_url
+    stored.setdefault('title', 'Unknown Title')
+    return webpage_url, stored['title'], entry.get('duration'), json.dumps(stored)
+
+
+class PlaylistStore:
+    """
+    Playlist access for the music cog on top of the bot's OpureDatabase.
+
+    Tracks live in ``playlist_tracks`` keyed by (playlist_id, position), so
+    appending, removing and paging touch only the rows involved. Positions
+    are an ordering key and may have gaps; track numbers shown to users are
+    ranks, not positions. Names are searchable through an FTS5 index when
+    SQLite has it, otherwise through a (guild_id, name NOCASE) prefix index.
+    """
+
+    def __init__(self, db: OpureDatabase):
+        self.db = db
+        self.fts_enabled = False
+
+    async def prepare(self):
+        """
+        Check for the FTS5 name index and move any legacy ``track_data`` blobs
+        into rows. The tables themselves come from schema migration 4.
+        """
+        async with self.db.execute("SELECT 1 FROM sqlite_master WHERE name = 'playlists_fts'") as cursor:
+            self.fts_enabled = await cursor.fetchone() is not None
+        if not self.fts_enabled:
+            logging.warning("🎵 FTS5 unavailable, playlist search falls back to prefix index")
+
+        if await self.migrate_legacy_blobs():
+            await self.db.commit()
+
+    async def migrate_legacy_blobs(self) -> int:
+        """Explode ``playlists.track_data`` JSON into track rows; migrated playlists keep an empty blob."""
+        async with self.db.execute("SELECT playlist_id, track_data FROM playlists WHERE track_data != '[]'") as cursor:
+            legacy = await cursor.fetchall()
+
+        migrated = 0
+        for playlist_id, track_data in legacy:
+            try:
+                entries = json.loads(track_data) or []
+            except (TypeError, ValueError):
+                logging.error(f"🎵 Playlist {playlist_id} has unreadable track data, leaving it untouched")
+                continue
+            await self._append_rows(playlist_id, entries)
+            await self.db.execute("UPDATE playlists SET track_data = '[]' WHERE playlist_id = ?", (playlist_id,))
+            migrated += 1
+
+        if migrated:
+            logging.info(f"🎵 Migrated {migrated} playlist(s) to per-track rows")
+        return migrated
+
+    async def _append_rows(self, playlist_id: int, entries: Iterable[Dict[str, Any]]) -> int:
+        rows = [(playlist_id, playlist_id, *row) for row in map(_track_row, entries) if row]
+        if rows:
+            # Each row takes the next position on the writer itself, so concurrent appends can't collide
+            await self.db.executemany("""
+                INSERT INTO playlist_tracks (playlist_id, position, webpage_url, title, duration, data_json)
+                SELECT ?, COALESCE((SELECT MAX(position) FROM playlist_tracks WHERE playlist_id = ?), -1) + 1, ?, ?, ?, ?
+            """, rows)
+        return len(rows)
+
+    # --- Playlists ---
+
+    async def create(self, name: str, creator_id: int, guild_id: int, is_public: int,
+                     entries: Iterable[Dict[str, Any]]) -> Tuple[int, int]:
+        """Create a playlist; returns (playlist_id, tracks stored)."""
+        async with self.db.execute(
+            "INSERT INTO playlists (name, creator_id, guild_id, is_public, track_data) VALUES (?, ?, ?, ?, '[]')",
+            (name, creator_id, guild_id, is_public)
+        ) as cursor:
+            playlist_id = cursor.lastrowid
+        stored = await self._append_rows(playlist_id, entries)
+        await self.db.commit()
+        return playlist_id, stored
+
+    async def get(self, playlist_id: int) -> Optional[Dict[str, Any]]:
+        async with self.db.execute("""
+            SELECT name, creator_id, guild_id, is_public,
+                   (SELECT COUNT(*) FROM playlist_tracks WHERE playlist_id = playlists.playlist_id)
+            FROM playlists WHERE playlist_id = ?
+        """, (playlist_id,)) as cursor:
+            row = await cursor.fetchone()
+        if not row:
+            return None
+        return {
+            'id': playlist_id, 'name': row[0], 'creator_id': row[1], 'guild_id': row[2],
+            'is_public': bool(row[3]), 'track_count': row[4]
+        }
+
+    async def delete(self, playlist_id: int):
+        # Track rows and the search index are cleaned up by triggers
+        await self.db.execute("DELETE FROM playlists WHERE playlist_id = ?", (playlist_id,))
+        await self.db.commit()
+
+    async def search(self, guild_id: int, user_id: int, text: str, limit: int = 25) -> List[Tuple[int, str]]:
+        """Playlists visible to `user_id` whose name has words starting with the words in `text`."""
+        tokens = _TOKEN_PATTERN.findall(text or "")
+        visible = "p.guild_id = ? AND (p.is_public = 1 OR p.creator_id = ?)"
+        if not tokens:
+            query = f"SELECT p.playlist_id, p.name FROM playlists p WHERE {visible} ORDER BY p.name COLLATE NOCASE LIMIT ?"
+            params = (guild_id, user_id, limit)
+        elif self.fts_enabled:
+            match = " ".join(f'"{token}"*' for token in tokens)
+            query = (f"SELECT p.playlist_id, p.name FROM playlists_fts f JOIN playlists p ON p.playlist_id = f.rowid "
+                     f"WHERE playlists_fts MATCH ? AND {visible} ORDER BY f.rank LIMIT ?")
+            params = (match, guild_id, user_id, limit)
+        else:
+            prefix = text.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            query = (f"SELECT p.playlist_id, p.name FROM playlists p WHERE {visible} "
+                     f"AND p.name LIKE ? ESCAPE '\\' ORDER BY p.name COLLATE NOCASE LIMIT ?")
+            params = (guild_id, user_id, prefix + "%", limit)
+
+        async with self.db.execute(query, params) as cursor:
+            return [(row[0], row[1]) for row in await cursor.fetchall()]
+
+    # --- Tracks ---
+
+    async def tracks(self, playlist_id: int, offset: int = 0, limit: int = -1) -> List[Dict[str, Any]]:
+        """Tracks in playlist order; pass offset/limit to read a single page."""
+        async with self.db.execute(
+            "SELECT data_json FROM playlist_tracks WHERE playlist_id = ? ORDER BY position LIMIT ? OFFSET ?",
+            (playlist_id, limit, offset)
+        ) as cursor:
+            return [json.loads(row[0]) for row in await cursor.fetchall()]
+
+    async def append(self, playlist_id: int, entry: Dict[str, Any]) -> bool:
+        added = await self._append_rows(playlist_id, [entry])
+        await self.db.commit()
+        return added > 0
+
+    async def remove_at(self, playlist_id: int, index: int) -> Optional[Dict[str, Any]]:
+        """Remove the track at zero-based `index`; returns it, or None if out of range."""
+        if index < 0:
+            return None
+        async with self.db.execute(
+            "SELECT position, data_json FROM playlist_tracks WHERE playlist_id = ? ORDER BY position LIMIT 1 OFFSET ?",
+            (playlist_id, index)
+        ) as cursor:
+            row = await cursor.fetchone()
+        if not row:
+            return None
+        await self.db.execute("DELETE FROM playlist_tracks WHERE playlist_id = ? AND position = ?", (playlist_id, row[0]))
+        await self.db.commit()
+        return json.loads(row[1])
@@ -0,0 +1,183 @@
+# core/query_cache.py
+# LRU + TTL query result cache with table/row invalidation for DatabasePool
+
+import re
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Hashable, Iterable, Optional, Set, Tuple, Union
+
+# A dependency is a whole table ("user_stats") or one row of it (("user_stats", user_id))
+Dependency = Union[str, Tuple[str, Any]]
+Tag = Tuple[str, Any]  # (table, row key or None for table-wide)
+
+MISS = object()
+
+_READ_TABLES = re.compile(r'\b(?:FROM|JOIN)\s+["`\[]?(\w+)', re.IGNORECASE)
+_WRITE_TABLE = re.compile(r'^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)\s+["`\[]?(\w+)', re.IGNORECASE)
+
+
+def read_tables(query: str) -> FrozenSet[str]:
+    """Tables a SELECT reads from, lower-cased"""
+    return frozenset(table.lower() for table in _READ_TABLES.findall(query))
+
+
+def written_table(query: str) -> Optional[str]:
+    """Table an INSERT/REPLACE/UPDATE/DELETE writes to, lower-cased; None for anything else"""
+    match = _WRITE_TABLE.match(query)
+    return match.group(1).lower() if match else None
+
+
+def _tag(dependency: Dependency) -> Tag:
+    if isinstance(dependency, tuple):
+        return (dependency[0].lower(), dependency[1])
+    return (dependency.lower(), None)
+
+
+def estimate_size(value: Any) -> int:
+    """Rough bytes held by a cached result (rows are tuples of scalars)"""
+    size = sys.getsizeof(value)
+    if isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item) for item in value)
+    elif isinstance(value, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    return size
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    expires_at: float
+    size: int
+    tags: FrozenSet[Tag]
+
+
+class QueryCache:
+    """
+    Query results by cache key, least recently used evicted first.
+
+    Entries expire after their TTL and the whole cache stays under
+    `max_bytes` / `max_entries`. Every entry records what it depends on: whole
+    tables, or single rows (``("user_stats", user_id)``). A write to one row
+    evicts that row's entries and the table-wide ones (aggregates, top-N
+    lists) but leaves other rows' entries alone; a write without a row evicts
+    everything that depends on the table.
+
+    Reads racing a write are handled with per-table generations: take a
+    ``stamp()`` before querying and pass it to ``put()``, which drops the
+    result if any of its tables was invalidated, or the cache cleared, in between.
+    """
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024, max_entries: int = 10000, default_ttl: float = 300.0,
+                 clock=time.monotonic):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._clock = clock
+        self.entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self.total_bytes = 0
+        self._by_tag: Dict[Tag, Set[Hashable]] = {}
+        self._by_table: Dict[str, Set[Hashable]] = {}
+        self._generations: Dict[str, int] = {}
+        self._epoch = 0  # bumped by clear(), which also covers tables no entry or write has named yet
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0, "stale_puts": 0}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, count=False) is not MISS
+
+    # --- Lookup ---
+
+    def get(self, key: Hashable, count: bool = True) -> Any:
+        """The cached value, or ``MISS``"""
+        entry = self.entries.get(key)
+        if entry is not None and entry.expires_at <= self._clock():
+            self._remove(key)
+            self.stats["expirations"] += 1
+            entry = None
+        if entry is None:
+            if count:
+                self.stats["misses"] += 1
+            return MISS
+        self.entries.move_to_end(key)
+        if count:
+            self.stats["hits"] += 1
+        return entry.value
+
+    def stamp(self, tables: Iterable[str]) -> int:
+        # Generations and the epoch only grow, so an unchanged sum means none of the tables changed
+        return self._epoch + sum(self._generations.get(table.lower(), 0) for table in tables)
+
+    def put(self, key: Hashable, value: Any, depends_on: Iterable[Dependency] = (), ttl: Optional[float] = None,
+            stamp: Optional[int] = None):
+        tags = frozenset(_tag(dependency) for dependency in depends_on)
+        if stamp is not None and stamp != self.stamp({table for table, _ in tags}):
+            self.stats["stale_puts"] += 1
+            return
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        if key in self.entries:
+            self._remove(key)
+
+        self.entries[key] = CacheEntry(value, self._clock() + (self.default_ttl if ttl is None else ttl), size, tags)
+        self.total_bytes += size
+        for tag in tags:
+            self._by_tag.setdefault(tag, set()).add(key)
+            self._by_table.setdefault(tag[0], set()).add(key)
+
+        while self.entries and (self.total_bytes > self.max_bytes or len(self.entries) > self.max_entries):
+            self._remove(next(iter(self.entries)))
+            self.stats["evictions"] += 1
+
+    # --- Invalidation ---
+
+    def _remove(self, key: Hashable):
+        entry = self.entries.pop(key)
+        self.total_bytes -= entry.size
+        for table, row in entry.tags:
+            for index, index_key in ((self._by_tag, (table, row)), (self._by_table, table)):
+                keys = index.get(index_key)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del index[index_key]
+
+    def pop(self, key: Hashable):
+        if key in self.entries:
+            self._remove(key)
+
+    def invalidate(self, table: str, row: Any = None) -> int:
+        """
+        Evict entries depending on `table` (every one of them), or with `row`
+        only those on that row plus the table-wide ones. Returns how many went.
+        """
+        table = table.lower()
+        self._generations[table] = self._generations.get(table, 0) + 1
+        if row is None:
+            keys = set(self._by_table.get(table, ()))
+        else:
+            keys = self._by_tag.get((table, None), set()) | self._by_tag.get((table, row), set())
+        for key in keys:
+            self._remove(key)
+        self.stats["invalidations"] += len(keys)
+        return len(keys)
+
+    def clear(self):
+        self._epoch += 1
+        self.entries.clear()
+        self._by_tag.clear()
+        self._by_table.clear()
+        self.total_bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self.entries),
+            "bytes": self.total_bytes,
+            "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,162 @@
+# core/query_registry.py
+# Named SQL statements with per-statement latency, row counts and query plan checks
+
+import hashlib
+import logging
+import os
+import re
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+_WHITESPACE = re.compile(r'\s+')
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_VERB_TABLE = re.compile(r'^(\w+)(?:\s+OR\s+\w+)?(?:.*?\b(?:FROM|INTO|UPDATE|TABLE|EXISTS)\s+["`\[]?(\w+))?', re.IGNORECASE | re.DOTALL)
+# "SCAN users" (3.36+) or "SCAN TABLE users"; index scans and subqueries aren't flagged
+_FULL_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)$')
+
+
+def normalize_sql(query: str) -> str:
+    """Whitespace collapsed and literals replaced, so f-string variants share one statement"""
+    return _LITERALS.sub("?", _WHITESPACE.sub(" ", query).strip())
+
+
+def full_scans(plan: List[tuple]) -> List[str]:
+    """Tables an ``EXPLAIN QUERY PLAN`` result reads without an index"""
+    tables = []
+    for row in plan:
+        match = _FULL_SCAN.match(str(row[-1]))
+        if match and match.group(1) != "CONSTANT":
+            tables.append(match.group(1))
+    return tables
+
+
+class Statement:
+    """One named SQL statement and its measurements."""
+
+    def __init__(self, name: str, sql: str, samples: int = 512):
+        self.name = name
+        self.sql = sql
+        self.calls = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.total_rows = 0
+        self.max_rows = 0
+        self.latencies: deque = deque(maxlen=samples)
+        self.plan: Optional[List[str]] = None
+        self.full_scans: List[str] = []
+        self.explaining = False
+
+    def record(self, seconds: float, rows: int = 0, error: bool = False):
+        self.calls += 1
+        self.total_time += seconds
+        self.latencies.append(seconds)
+        if error:
+            self.errors += 1
+            return
+        self.total_rows += rows
+        self.max_rows = max(self.max_rows, rows)
+
+    def percentile(self, fraction: float, ordered: Optional[List[float]] = None) -> float:
+        """Latency at `fraction`; pass `ordered` (already sorted) to skip sorting again"""
+        if ordered is None:
+            ordered = sorted(self.latencies)
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+    def to_dict(self) -> Dict[str, Any]:
+        ordered = sorted(self.latencies)
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "errors": self.errors,
+            "total_ms": round(self.total_time * 1000, 2),
+            "p50_ms": round(self.percentile(0.50, ordered) * 1000, 3),
+            "p95_ms": round(self.percentile(0.95, ordered) * 1000, 3),
+            "p99_ms": round(self.percentile(0.99, ordered) * 1000, 3),
+            "avg_rows": round(self.total_rows / max(1, self.calls - self.errors), 2),
+            "max_rows": self.max_rows,
+            "full_scans": self.full_scans,
+            "plan": self.plan,
+            "sql": self.sql[:200],
+        }
+
+
+class QueryRegistry:
+    """
+    Every SQL statement the bot runs, by name.
+
+    Statements registered with ``register(name, sql)`` keep that name; any
+    other SQL is named from its verb, table and a hash of its normalized text
+    (``select:user_stats#3fa2c1``), so ad-hoc strings in cogs are measured
+    too. ``DatabasePool`` reports each execution here.
+
+    With `debug` on (``DB_QUERY_DEBUG=1``) each statement's query plan is
+    checked once, on first use, and tables read without an index are flagged
+    in the stats and logged.
+    """
+
+    def __init__(self, debug: bool = False, max_statements: int = 2000):
+        self.debug = debug
+        self.max_statements = max_statements
+        self.statements: Dict[str, Statement] = {}  # name -> statement
+        self._by_sql: Dict[str, Statement] = {}  # normalized SQL -> statement
+        self._by_text: Dict[str, Statement] = {}  # exact text -> statement, skips normalizing on the hot path
+
+    def register(self, name: str, sql: str) -> str:
+        """Name `sql`; returns it unchanged so it can be assigned to a module constant."""
+        statement = self.statements.get(name)
+        if statement is None:
+            statement = self.statements[name] = Statement(name, normalize_sql(sql))
+        self._by_sql[normalize_sql(sql)] = statement
+        self._by_text[sql] = statement
+        return sql
+
+    def statement_for(self, sql: str) -> Statement:
+        statement = self._by_text.get(sql)
+        if statement is not None:
+            return statement
+        normalized = normalize_sql(sql)
+        statement = self._by_sql.get(normalized)
+        if statement is None:
+            if len(self.statements) >= self.max_statements:
+                statement = self.statements.setdefault("other", Statement("other", "(unregistered overflow)"))
+            else:
+                statement = Statement(self._auto_name(normalized), normalized)
+                self.statements[statement.name] = statement
+            self._by_sql[normalized] = statement
+        if len(self._by_text) < self.max_statements * 4:
+            self._by_text[sql] = statement
+        return statement
+
+    @staticmethod
+    def _auto_name(normalized: str) -> str:
+        match = _VERB_TABLE.match(normalized)
+        verb = match.group(1).lower() if match else "sql"
+        table = match.group(2) if match and match.group(2) else ""
+        digest = hashlib.sha1(normalized.encode()).hexdigest()[:6]
+        return f"{verb}:{table}#{digest}" if table else f"{verb}#{digest}"
+
+    def needs_plan(self, statement: Statement) -> bool:
+        return self.debug and statement.plan is None and not statement.explaining and statement.name != "other"
+
+    def record_plan(self, statement: Statement, plan: List[tuple]):
+        statement.plan = [str(row[-1]) for row in plan]
+        statement.full_scans = full_scans(plan)
+        if statement.full_scans:
+            logging.warning(f"🐢 Full table scan of {', '.join(statement.full_scans)} in {statement.name}: {statement.sql[:120]}")
+
+    def get_stats(self, top: int = 20, order_by: str = "total_ms") -> Dict[str, Any]:
+        rows = sorted((s.to_dict() for s in self.statements.values() if s.calls),
+                      key=lambda row: row[order_by], reverse=True)
+        return {
+            "debug": self.debug,
+            "statements": len(self.statements),
+            "calls": sum(s.calls for s in self.statements.values()),
+            "full_scan_statements": sorted(s.name for s in self.statements.values() if s.full_scans),
+            "top": rows[:top],
+        }
+
+
+# Global query registry instance
+query_registry = QueryRegistry(debug=os.getenv("DB_QUERY_DEBUG", "").lower() in ("1", "true", "yes"))
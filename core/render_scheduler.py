@@ -0,0 +1,90 @@
+# core/render_scheduler.py
+# Coalescing, rate-aware scheduler for messages that get re-rendered often
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+
+class CoalescingRenderer:
+    """
+    Turns bursts of "something changed, redraw" requests into a single render.
+
+    ``render`` is awaited at most once per ``coalesce_delay`` and never more often
+    than the current interval allows; it should return False when it decided
+    nothing visible changed (so no request was sent). The interval widens when
+    Discord starts throttling us - either an edit takes long enough that the
+    library must have waited on an exhausted bucket, or we get a 429 - and
+    relaxes back to ``min_interval`` once edits are fast again.
+    """
+
+    def __init__(self, render: Callable[[], Awaitable[bool]], coalesce_delay: float = 0.75,
+                 min_interval: float = 1.0, max_interval: float = 30.0, slow_edit_threshold: float = 1.5,
+                 name: str = "renderer"):
+        self.render = render
+        self.coalesce_delay = coalesce_delay
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.slow_edit_threshold = slow_edit_threshold
+        self.name = name
+        self.interval = min_interval
+        self.last_render_at = 0.0
+        self._dirty = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"requests": 0, "renders": 0, "skipped_unchanged": 0, "backoffs": 0, "rate_limited": 0}
+
+    def request(self):
+        """Mark the message dirty; the render happens shortly, merged with any other requests."""
+        self.stats["requests"] += 1
+        self._dirty.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def _back_off(self, minimum: float = 0.0):
+        self.interval = min(self.max_interval, max(self.interval * 2, minimum, self.min_interval))
+        self.stats["backoffs"] += 1
+
+    async def _run(self):
+        while True:
+            await self._dirty.wait()
+            # Let the burst settle, and respect the current (possibly backed-off) interval
+            wait = max(self.coalesce_delay, self.last_render_at + self.interval - time.monotonic())
+            await asyncio.sleep(wait)
+            self._dirty.clear()
+
+            started = time.monotonic()
+            try:
+                rendered = await self.render()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                retry_after = getattr(e, "retry_after", None)
+                if getattr(e, "status", None) == 429 or retry_after is not None:
+                    self.stats["rate_limited"] += 1
+                    self._back_off(retry_after or 0.0)
+                    self._dirty.set()  # Try again once the bucket refills
+                else:
+                    logging.error(f"{self.name} render failed: {e}")
+                self.last_render_at = time.monotonic()
+                continue
+
+            if not rendered:
+                self.stats["skipped_unchanged"] += 1
+                continue
+
+            self.stats["renders"] += 1
+            self.last_render_at = time.monotonic()
+            if self.last_render_at - started >= self.slow_edit_threshold:
+                self._back_off()
+            else:
+                self.interval = max(self.min_interval, self.interval * 0.75)
+
+    def cancel(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._task = None
+        self._dirty.clear()
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, "interval": self.interval}
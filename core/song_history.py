@@ -0,0 +1,196 @@
+# core/song_history.py
+# Buffered song-history sink shared by every music instance
+
+import asyncio
+import datetime
+import logging
+from collections import OrderedDict, deque
+from dataclasses import asdict, dataclass
+from typing import Any, Deque, Dict, List, Optional
+
+# Firestore rejects batches larger than this
+FIRESTORE_BATCH_LIMIT = 500
+
+
+@dataclass
+class PlayedTrack:
+    user_id: int
+    guild_id: int
+    title: str
+    webpage_url: str
+    uploader: str
+    duration: Optional[float]
+    listened_seconds: float
+    played_at: datetime.datetime
+
+
+@dataclass
+class ListeningStats:
+    plays: int = 0
+    listened_seconds: float = 0.0
+    last_played_at: Optional[datetime.datetime] = None
+
+
+class SongHistorySink:
+    """
+    Collects finished tracks from all music instances and writes them in
+    batches: to the local ``song_history`` table and, when Firebase is
+    configured, to each requester's Firestore ``song_history`` collection
+    through batched writes. The pending buffer is bounded (oldest events are
+    dropped under sustained backpressure) and a final flush runs on stop.
+
+    Recently played tracks per user are kept in small ring buffers so
+    listening stats never need a query.
+    """
+
+    def __init__(self, flush_interval: float = 10.0, batch_size: int = 100, max_pending: int = 5000,
+                 recent_per_user: int = 20, max_tracked_users: int = 5000):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.pending: Deque[PlayedTrack] = deque(maxlen=max_pending)
+        self.recent_per_user = recent_per_user
+        self.max_tracked_users = max_tracked_users
+        self.recent: "OrderedDict[int, Deque[PlayedTrack]]" = OrderedDict()
+        self.user_stats: "OrderedDict[int, ListeningStats]" = OrderedDict()
+        self.db = None
+        self.firestore_db = None
+        self.firestore_root: Optional[str] = None
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"recorded": 0, "dropped": 0, "flushes": 0, "sqlite_rows": 0, "firestore_docs": 0, "failures": 0}
+
+    async def start(self, db, firestore_db=None, firestore_root: Optional[str] = None):
+        """
+        Attach storage backends and start the flush loop. `firestore_root` is
+        the path above ``users/``; the ``song_history`` table comes from schema
+        migration 4.
+        """
+        self.db = db
+        self.firestore_db = firestore_db
+        self.firestore_root = firestore_root
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stop the flush loop and write out whatever is still buffered."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def record(self, user_id: int, guild_id: int, song_data: Dict[str, Any], listened_seconds: float = 0.0) -> PlayedTrack:
+        """Queue a finished track for persistence and update the in-memory stats. Never blocks."""
+        event = PlayedTrack(
+            user_id=user_id,
+            guild_id=guild_id,
+            title=song_data.get('title', 'Unknown Title'),
+            webpage_url=song_data.get('webpage_url', '#'),
+            uploader=song_data.get('uploader', 'Unknown Uploader'),
+            duration=song_data.get('duration'),
+            listened_seconds=round(max(0.0, listened_seconds), 1),
+            played_at=datetime.datetime.now(datetime.timezone.utc)
+        )
+        if len(self.pending) == self.pending.maxlen:
+            self.stats["dropped"] += 1
+        self.pending.append(event)
+        self.stats["recorded"] += 1
+
+        recent = self.recent.pop(user_id, None) or deque(maxlen=self.recent_per_user)
+        recent.append(event)
+        self.recent[user_id] = recent
+        stats = self.user_stats.pop(user_id, None) or ListeningStats()
+        stats.plays += 1
+        stats.listened_seconds += event.listened_seconds
+        stats.last_played_at = event.played_at
+        self.user_stats[user_id] = stats
+        while len(self.user_stats) > self.max_tracked_users:
+            evicted, _ = self.user_stats.popitem(last=False)
+            self.recent.pop(evicted, None)
+
+        if len(self.pending) >= self.batch_size:
+            self._wakeup.set()
+        return event
+
+    def recent_for_user(self, user_id: int, limit: int = 10) -> List[PlayedTrack]:
+        """Most recent first."""
+        recent = self.recent.get(user_id)
+        return list(reversed(recent))[:limit] if recent else []
+
+    def get_user_stats(self, user_id: int) -> Dict[str, Any]:
+        stats = self.user_stats.get(user_id) or ListeningStats()
+        return {**asdict(stats), "recent": [event.title for event in self.recent_for_user(user_id, 5)]}
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        async with self._flush_lock:
+            while self.pending:
+                batch = [self.pending.popleft() for _ in range(min(self.batch_size, len(self.pending)))]
+                if not await self._write_batch(batch):
+                    # Put the batch back (oldest first) and retry on the next tick
+                    room = self.pending.maxlen - len(self.pending)
+                    self.pending.extendleft(reversed(batch[-room:] if room else []))
+                    self.stats["dropped"] += len(batch) - min(room, len(batch))
+                    return
+                self.stats["flushes"] += 1
+
+    async def _write_batch(self, batch: List[PlayedTrack]) -> bool:
+        if self.db is not None:
+            try:
+                await self.db.executemany(
+                    "INSERT INTO song_history (user_id, guild_id, title, webpage_url, uploader, duration, listened_seconds, played_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(e.user_id, e.guild_id, e.title, e.webpage_url, e.uploader, e.duration, e.listened_seconds,
+                      e.played_at.isoformat()) for e in batch]
+                )
+                await self.db.commit()
+                self.stats["sqlite_rows"] += len(batch)
+            except Exception as e:
+                self.stats["failures"] += 1
+                logging.error(f"🎵 Song history SQLite flush failed: {e}")
+                return False
+
+        if self.firestore_db is not None and self.firestore_root:
+            try:
+                await asyncio.to_thread(self._write_firestore, batch)
+                self.stats["firestore_docs"] += len(batch)
+            except Exception as e:
+                # The local table already has these rows; don't hold the buffer hostage to Firestore
+                self.stats["failures"] += 1
+                logging.error(f"🎵 Song history Firestore flush failed: {e}")
+        return True
+
+    def _write_firestore(self, batch: List[PlayedTrack]):
+        for start in range(0, len(batch), FIRESTORE_BATCH_LIMIT):
+            write = self.firestore_db.batch()
+            for event in batch[start:start + FIRESTORE_BATCH_LIMIT]:
+                doc = self.firestore_db.collection(f"{self.firestore_root}/users/{event.user_id}/song_history").document()
+                write.set(doc, {
+                    "title": event.title,
+                    "webpage_url": event.webpage_url,
+                    "uploader": event.uploader,
+                    "requester_id": str(event.user_id),
+                    "guild_id": str(event.guild_id),
+                    "listened_seconds": event.listened_seconds,
+                    "timestamp": event.played_at
+                })
+            write.commit()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "pending": len(self.pending), "tracked_users": len(self.user_stats)}
+
+
+# Global song history sink
+song_history = SongHistorySink()
@@ -0,0 +1,146 @@
+# core/streaming_search.py
+# Flat, streaming yt-dlp extraction for searches and playlists
+
+import asyncio
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+_SEARCH_PREFIX = re.compile(r'^[a-z]+search(?:\d+|all)?:', re.IGNORECASE)
+# Redirects (e.g. watch?v=..&list=.. -> the playlist tab) followed before giving up
+_MAX_URL_HOPS = 3
+_DONE = object()
+
+
+def search_target(query: str, results: int = 1) -> str:
+    """The yt-dlp input for `query`: URLs and explicit ``xxsearch:`` queries as-is, anything else a YouTube search."""
+    if query.lower().startswith(("http://", "https://")) or _SEARCH_PREFIX.match(query):
+        return query
+    return f"ytsearch{results}:{query}"
+
+
+def flat_placeholder(entry: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    A queue entry built from a flat-extracted result: enough to display, with
+    ``webpage_url`` for the prefetcher/player loop to resolve just before playback.
+    """
+    if not entry:
+        return None
+    url = entry.get('webpage_url') or entry.get('url')
+    if url and not url.startswith(("http://", "https://")):
+        # Older extractors return bare video ids for flat YouTube entries
+        url = f"https://www.youtube.com/watch?v={entry.get('id') or url}" if entry.get('ie_key', 'Youtube') == 'Youtube' else None
+    if not url:
+        return None
+    thumbnails = entry.get('thumbnails') or []
+    return {
+        'webpage_url': url,
+        'title': entry.get('title') or url,
+        'duration': entry.get('duration'),
+        'uploader': entry.get('uploader') or entry.get('channel') or 'Unknown Uploader',
+        'thumbnail': entry.get('thumbnail') or (thumbnails[-1].get('url') if thumbnails else None),
+    }
+
+
+class FlatEntryStream:
+    """
+    Streams placeholder entries out of ``ytdl.extract_info(..., process=False)``.
+
+    yt-dlp hands back playlist and search entries as a lazy generator that
+    fetches one page at a time, so a worker thread walks it and forwards each
+    entry to the event loop as soon as it exists. The caller can queue the
+    first page while later pages of a long playlist are still downloading.
+    `ytdl` should be configured with ``extract_flat`` so entries stay unresolved.
+    """
+
+    def __init__(self, ytdl, query: str, limit: Optional[int] = None):
+        self.ytdl = ytdl
+        self.query = query
+        self.limit = limit
+        self.title: Optional[str] = None
+        self.count = 0
+        self.started_at = 0.0
+        self.first_entry_after: Optional[float] = None
+        self._entries: Optional[asyncio.Queue] = None
+        self._stop = threading.Event()
+        self._finished = False
+        self._error: Optional[Exception] = None
+
+    def start(self) -> "FlatEntryStream":
+        loop = asyncio.get_running_loop()
+        self._entries = asyncio.Queue()
+        self.started_at = time.monotonic()
+        loop.run_in_executor(None, self._produce, loop)
+        return self
+
+    def close(self):
+        """Stop walking the playlist after the current page."""
+        self._stop.set()
+
+    @property
+    def finished(self) -> bool:
+        return self._finished
+
+    def _emit(self, loop: asyncio.AbstractEventLoop, item):
+        try:
+            loop.call_soon_threadsafe(self._entries.put_nowait, item)
+        except RuntimeError:
+            self._stop.set()  # Event loop closed underneath us
+
+    def _produce(self, loop: asyncio.AbstractEventLoop):
+        try:
+            result = self.ytdl.extract_info(self.query, download=False, process=False)
+            hops = 0
+            while result and result.get('_type') in ('url', 'url_transparent') and hops < _MAX_URL_HOPS:
+                result = self.ytdl.extract_info(result['url'], download=False, process=False, ie_key=result.get('ie_key'))
+                hops += 1
+            if not result:
+                return
+            self.title = result.get('title')
+            entries = result.get('entries')
+            for entry in (entries if entries is not None else [result]):
+                if self._stop.is_set():
+                    break
+                placeholder = flat_placeholder(entry)
+                if placeholder:
+                    self._emit(loop, placeholder)
+                    self.count += 1
+                    if self.limit and self.count >= self.limit:
+                        break
+        except Exception as e:
+            self._emit(loop, e)
+        finally:
+            self._emit(loop, _DONE)
+
+    async def next_batch(self) -> List[Dict[str, Any]]:
+        """
+        Wait for at least one entry and return every entry available right now;
+        an empty list once the stream is exhausted. Errors from yt-dlp are raised.
+        """
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+        if self._finished:
+            return []
+        batch = []
+        item = await self._entries.get()
+        while True:
+            if item is _DONE:
+                self._finished = True
+                break
+            if isinstance(item, Exception):
+                self._finished = True
+                self.close()
+                if not batch:
+                    raise item
+                self._error = item  # Hand over what arrived first; raise on the next call
+                break
+            batch.append(item)
+            try:
+                item = self._entries.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+        if batch and self.first_entry_after is None:
+            self.first_entry_after = time.monotonic() - self.started_at
+        return batch
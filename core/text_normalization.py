@@ -0,0 +1,181 @@
+# core/text_normalization.py
+# Shared, precompiled title/artist normalization and keyword matching for music features
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, Optional, Sequence
+
+# Each former chain of re.sub calls collapsed into one pass. Every pattern is
+# guarded by a plain substring check, since most titles contain none of them.
+_TITLE_NOISE = re.compile(
+    r'\((?:feat|ft|prod)\..*?\)|\[(?:feat|ft|prod)\..*?\]'
+    r'|\((?:remix|explicit|official video|lyrics)\)|\[(?:remix|explicit|official video|lyrics)\]',
+    re.IGNORECASE
+)
+_ARTIST_NOISE = re.compile(r'\s*\(?VEVO\)?|\s*-\s*Official Artist Channel', re.IGNORECASE)
+_QUERY_BRACKETS = re.compile(r'\s*(?:\([^)]*\)|\[[^\]]*\])\s*')
+_QUERY_FEATURING = re.compile(r'\s*\bf(?:ea)?t\b\.?\s*', re.IGNORECASE)
+_QUERY_DASH = re.compile(r'\s+-\s+')
+_NON_WORD = re.compile(r'[\W_]+', re.UNICODE)
+_WHITESPACE = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=4096)
+def normalize_text(text: str) -> str:
+    """Casefolded, accent-compatible, punctuation-free form used for matching and cache keys."""
+    if not text:
+        return ""
+    return _NON_WORD.sub(" ", unicodedata.normalize("NFKC", text).casefold()).strip()
+
+
+@lru_cache(maxsize=4096)
+def clean_track_title(title: str) -> str:
+    """Strip feat./prod. credits and (Remix)/(Explicit)/(Official Video)/(Lyrics) tags."""
+    title = title or ''
+    if '(' in title or '[' in title:
+        title = _TITLE_NOISE.sub('', title)
+    return title.strip()
+
+
+@lru_cache(maxsize=4096)
+def clean_artist_name(artist: str) -> str:
+    """Strip VEVO and "Official Artist Channel" decorations from channel names."""
+    artist = artist or ''
+    lowered = artist.lower()
+    if 'vevo' in lowered or 'official artist channel' in lowered:
+        artist = _ARTIST_NOISE.sub('', artist)
+    return artist.strip()
+
+
+@lru_cache(maxsize=4096)
+def clean_query(query: str) -> str:
+    """Drop bracketed text, ft./feat. and " - " separators so a title searches well."""
+    query = query or ''
+    if '(' in query or '[' in query:
+        query = _QUERY_BRACKETS.sub(' ', query)
+    lowered = query.lower()
+    if 'ft' in lowered or 'feat' in lowered:
+        query = _QUERY_FEATURING.sub(' ', query)
+    if '-' in query:
+        query = _QUERY_DASH.sub(' ', query)
+    return _WHITESPACE.sub(' ', query).strip()
+
+
+class KeywordMatcher:
+    """
+    Matches many keywords against a text with one regex pass at most.
+
+    Keywords and text are both run through ``normalize_text`` and keywords
+    must start at a word boundary, so "cry" matches "crying" but "pain" no
+    longer matches "Spain". A cheap substring prefilter on each keyword's
+    first word skips the regex for the common no-match case. Keywords can be
+    grouped into categories; the first category (in construction order)
+    with a hit wins in ``classify``.
+    """
+
+    def __init__(self, categories: Dict[str, Iterable[str]]):
+        self.category_for: Dict[str, str] = {}
+        self.order: Sequence[str] = list(categories)
+        for category, keywords in categories.items():
+            for keyword in keywords:
+                self.category_for.setdefault(normalize_text(keyword), category)
+        alternation = "|".join(re.escape(k) for k in sorted(self.category_for, key=len, reverse=True) if k)
+        self._pattern = re.compile(rf'(?<!\w)(?:{alternation})') if alternation else None
+        self._literals = tuple({keyword.split()[0] for keyword in self.category_for if keyword})
+
+    @lru_cache(maxsize=4096)
+    def categories_in(self, text: str) -> FrozenSet[str]:
+        if self._pattern is None:
+            return frozenset()
+        folded = unicodedata.normalize("NFKC", text).casefold()
+        if not any(literal in folded for literal in self._literals):
+            return frozenset()
+        return frozenset(self.category_for[m.group(0)] for m in self._pattern.finditer(normalize_text(text)))
+
+    def matches(self, text: str) -> bool:
+        return bool(self.categories_in(text))
+
+    def classify(self, text: str, default: Optional[str] = None) -> Optional[str]:
+        found = self.categories_in(text)
+        for category in self.order:
+            if category in found:
+                return category
+        return default
+
+
+JUICE_WRLD_MATCHER = KeywordMatcher({
+    "juice_wrld": ["juice wrld", "juice world", "jarad higgins", "999", "juicewrld", "juice", "grad a productions"],
+})
+
+MOOD_MATCHER = KeywordMatcher({
+    "sad": ["sad", "cry", "tear", "hurt", "pain", "lonely", "empty", "miss", "broken"],
+    "happy": ["happy", "party", "dance", "celebrate", "joy", "energy", "pump", "hype"],
+    "chill": ["chill", "relax", "calm", "peaceful", "slow", "ambient", "lo-fi", "lofi"],
+})
+
+
+def is_juice_wrld_track(title: str, artist: str) -> bool:
+    return JUICE_WRLD_MATCHER.matches(f"{title} {artist}")
+
+
+def estimate_mood(title: str) -> str:
+    return MOOD_MATCHER.classify(title, default="neutral")
+
+
+if __name__ == "__main__":
+    # Microbenchmark: python -m core.text_normalization
+    import timeit
+
+    base = [
+        ("Juice WRLD - Lucid Dreams (Official Music Video) [Explicit]", "Juice WRLD - Official Artist Channel"),
+        ("Lofi Hip Hop Radio (feat. Someone) [prod. Somebody]", "ChilledCowVEVO"),
+        ("Party All Night (Remix) (Lyrics)", "Random Uploader"),
+        ("Tears in the Rain - Slowed + Reverb", "Some Channel"),
+    ]
+    # Distinct titles so the cold run never hits the memo caches
+    samples = [(f"{title} {i}", artist) for i in range(250) for title, artist in base]
+
+    def legacy(title, artist):
+        # The per-call re.sub chains and substring scans this module replaced
+        t = title
+        for pattern in (r'\(feat\..*?\)|\[feat\..*?\]|\(ft\..*?\)|\[ft\..*?\]', r'\(prod\..*?\)|\[prod\..*?\]',
+                        r'\(remix\)|\[remix\]', r'\(explicit\)|\[explicit\]',
+                        r'\(official video\)|\[official video\]', r'\(lyrics\)|\[lyrics\]'):
+            t = re.sub(pattern, '', t, flags=re.IGNORECASE)
+        a = re.sub(r'\s*\(?VEVO\)?|\s*-\s*Official Artist Channel', '', artist, flags=re.IGNORECASE).strip()
+        q = re.sub(r'\s*\(.*?\)\s*|\s*\[.*?\]\s*', '', f"{a} - {t.strip()}").strip()
+        q = re.sub(r'\s*ft\s*\.?\s*|\s*feat\s*\.?\s*', ' ', q, flags=re.IGNORECASE)
+        re.sub(r'\s+-\s+', ' ', q)
+        full = f"{title} {artist}".lower()
+        any(k in full for k in ("juice wrld", "juice world", "jarad higgins", "999", "juicewrld", "juice", "grad a productions"))
+        lowered = title.lower()
+        for keywords in (["sad", "cry", "tear", "hurt", "pain", "lonely", "empty", "miss", "broken"],
+                         ["happy", "party", "dance", "celebrate", "joy", "energy", "pump", "hype"],
+                         ["chill", "relax", "calm", "peaceful", "slow", "ambient", "lo-fi", "lofi"]):
+            if any(k in lowered for k in keywords):
+                break
+
+    def shared(title, artist):
+        clean_query(f"{clean_artist_name(artist)} - {clean_track_title(title)}")
+        is_juice_wrld_track(title, artist)
+        estimate_mood(title)
+
+    def clear_caches():
+        for cached in (normalize_text, clean_track_title, clean_artist_name, clean_query,
+                       JUICE_WRLD_MATCHER.categories_in, MOOD_MATCHER.categories_in):
+            cached.cache_clear()
+
+    def run(fn):
+        for title, artist in samples:
+            fn(title, artist)
+
+    runs = 20
+    per_track = len(samples) * runs
+    results = {
+        "legacy": timeit.timeit(lambda: run(legacy), number=runs),
+        "shared, cold cache": timeit.timeit(lambda: (clear_caches(), run(shared)), number=runs),
+        "shared, warm cache": timeit.timeit(lambda: run(shared), number=runs),
+    }
+    for label, seconds in results.items():
+        print(f"{label:>20}: {seconds / per_track * 1e6:6.2f} µs/track")
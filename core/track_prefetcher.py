@@ -0,0 +1,166 @@
+# core/track_prefetcher.py
+# Look-ahead track resolver for the music player loop
+
+import asyncio
+import re
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Iterable, Optional
+
+# YouTube (and most googlevideo mirrors) sign stream URLs with an absolute
+# expiry, either as a query parameter or as a path segment.
+_EXPIRE_PATTERN = re.compile(r'(?:[?&]expire=|/expire/)(\d{9,11})')
+
+
+def stream_url_expiry(stream_url: Optional[str]) -> Optional[float]:
+    """Return the epoch timestamp a signed stream URL stops working at, if known."""
+    if not stream_url:
+        return None
+    match = _EXPIRE_PATTERN.search(stream_url)
+    return float(match.group(1)) if match else None
+
+
+@dataclass
+class ResolvedTrack:
+    data: Dict
+    resolved_at: float
+    expires_at: float
+
+    @property
+    def is_fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+
+@dataclass
+class PrefetchMetrics:
+    """Aggregate prefetch counters shared by every music instance."""
+    hits: int = 0
+    misses: int = 0
+    inflight_waits: int = 0
+    expired: int = 0
+    failures: int = 0
+    gaps: deque = field(default_factory=lambda: deque(maxlen=200))
+
+    def record_gap(self, seconds: float):
+        self.gaps.append(max(0.0, seconds))
+
+    def get_stats(self) -> Dict:
+        lookups = self.hits + self.inflight_waits + self.misses
+        gaps = sorted(self.gaps)
+        return {
+            "hits": self.hits,
+            "inflight_waits": self.inflight_waits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "failures": self.failures,
+            "hit_rate": ((self.hits + self.inflight_waits) / lookups * 100) if lookups else 0.0,
+            "avg_gap": (sum(gaps) / len(gaps)) if gaps else 0.0,
+            "p95_gap": gaps[min(len(gaps) - 1, int(len(gaps) * 0.95))] if gaps else 0.0,
+            "last_gap": self.gaps[-1] if self.gaps else 0.0,
+        }
+
+
+class TrackPrefetcher:
+    """
+    Resolves stream URLs and metadata for the next few queued tracks while
+    the current one plays, so the player loop can swap tracks without waiting
+    on yt-dlp. Resolutions expire a safety margin before the signed stream
+    URL does, and never outlive ``ttl`` seconds.
+    """
+
+    def __init__(self, resolver: Callable[[str], Awaitable[Dict]], depth: int = 2,
+                 ttl: float = 1800.0, safety_margin: float = 300.0,
+                 metrics: Optional[PrefetchMetrics] = None):
+        self.resolver = resolver
+        self.depth = depth
+        self.ttl = ttl
+        self.safety_margin = safety_margin
+        self.metrics = metrics if metrics is not None else prefetch_metrics
+        self.resolved: Dict[str, ResolvedTrack] = {}
+        self.pending: Dict[str, asyncio.Task] = {}
+
+    def _expiry_for(self, data: Dict) -> float:
+        now = time.time()
+        expires_at = now + self.ttl
+        signed_expiry = stream_url_expiry(data.get('url'))
+        if signed_expiry:
+            expires_at = min(expires_at, signed_expiry - self.safety_margin)
+        return expires_at
+
+    async def _resolve(self, url: str):
+        try:
+            data = await self.resolver(url)
+            if data:
+                self.resolved[url] = ResolvedTrack(data=data, resolved_at=time.time(), expires_at=self._expiry_for(data))
+            return data
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.metrics.failures += 1
+            return None
+        finally:
+            self.pending.pop(url, None)
+
+    def schedule(self, upcoming: Iterable[Dict]):
+        """Start resolving the first ``depth`` upcoming entries that aren't already resolved or in flight."""
+        wanted = []
+        for entry in upcoming:
+            if len(wanted) >= self.depth:
+                break
+            url = entry.get('webpage_url') if isinstance(entry, dict) else None
+            if url:
+                wanted.append(url)
+
+        # Drop anything that fell out of the look-ahead window or went stale
+        for url in list(self.resolved):
+            if url not in wanted or not self.resolved[url].is_fresh:
+                del self.resolved[url]
+        for url in list(self.pending):
+            if url not in wanted:
+                self.pending.pop(url).cancel()
+
+        for url in wanted:
+            if url not in self.resolved and url not in self.pending:
+                self.pending[url] = asyncio.create_task(self._resolve(url))
+
+    async def take(self, url: str, timeout: float = 20.0) -> Optional[Dict]:
+        """
+        Return prefetched data for ``url`` (awaiting an in-flight resolution if
+        one exists), or None if the caller has to resolve it itself.
+        """
+        resolved = self.resolved.pop(url, None)
+        if resolved:
+            if resolved.is_fresh:
+                self.metrics.hits += 1
+                return resolved.data
+            self.metrics.expired += 1
+
+        task = self.pending.get(url)
+        if task:
+            try:
+                data = await asyncio.wait_for(asyncio.shield(task), timeout=timeout)
+            except asyncio.TimeoutError:
+                data = None
+            except asyncio.CancelledError:
+                # Only swallow the prefetch task being dropped, not our own cancellation
+                if not task.cancelled():
+                    raise
+                data = None
+            self.resolved.pop(url, None)
+            if data:
+                self.metrics.inflight_waits += 1
+                return data
+
+        self.metrics.misses += 1
+        return None
+
+    def clear(self):
+        for task in self.pending.values():
+            task.cancel()
+        self.pending.clear()
+        self.resolved.clear()
+
+
+# Global prefetch metrics
+prefetch_metrics = PrefetchMetrics()
@@ -0,0 +1,180 @@
+# core/track_queue.py
+# Indexable, observable track queue for music instances
+
+import asyncio
+import random
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+class TrackQueue:
+    """
+    Drop-in replacement for the asyncio.Queue each MusicInstance used to hold.
+
+    Keeps the awaitable get()/put() interface the player loop relies on, but
+    also supports indexed access, remove/move/insert and cheap snapshots so
+    UI code never has to drain and re-put the queue. Every mutation bumps
+    ``version`` and is recorded in a short change log, so broadcasters can
+    send deltas instead of the whole queue.
+    """
+
+    def __init__(self, history_size: int = 256):
+        self._items: List[Dict] = []
+        self._getters: deque = deque()
+        self._snapshot: Tuple[Dict, ...] = ()
+        self._snapshot_version = 0
+        self.version = 0
+        self.changes: deque = deque(maxlen=history_size)
+        self.listeners: List[Callable[[int, str, Dict[str, Any]], None]] = []
+
+    # --- Observation ---
+
+    def subscribe(self, listener: Callable[[int, str, Dict[str, Any]], None]):
+        """Register `listener(version, op, payload)` to be called after every mutation."""
+        self.listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable[[int, str, Dict[str, Any]], None]):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def _changed(self, op: str, **payload):
+        self.version += 1
+        self.changes.append((self.version, op, payload))
+        for listener in list(self.listeners):
+            try:
+                listener(self.version, op, payload)
+            except Exception:
+                pass
+
+    def changes_since(self, version: int) -> Optional[List[Tuple[int, str, Dict[str, Any]]]]:
+        """Changes made after `version`, or None if they've fallen out of the log (send a snapshot instead)."""
+        if version == self.version:
+            return []
+        if not self.changes or self.changes[0][0] > version + 1:
+            return None
+        return [change for change in self.changes if change[0] > version]
+
+    def snapshot(self) -> Tuple[Dict, ...]:
+        """Immutable view of the queue; rebuilt at most once per version."""
+        if self._snapshot_version != self.version:
+            self._snapshot = tuple(self._items)
+            self._snapshot_version = self.version
+        return self._snapshot
+
+    # --- asyncio.Queue compatible interface ---
+
+    def qsize(self) -> int:
+        return len(self._items)
+
+    def empty(self) -> bool:
+        return not self._items
+
+    def _wake_getter(self):
+        while self._getters:
+            getter = self._getters.popleft()
+            if not getter.done():
+                getter.set_result(None)
+                break
+
+    def put_nowait(self, item: Dict):
+        self._items.append(item)
+        self._changed("add", index=len(self._items) - 1, items=[item])
+        self._wake_getter()
+
+    async def put(self, item: Dict):
+        self.put_nowait(item)
+
+    def get_nowait(self) -> Dict:
+        if not self._items:
+            raise asyncio.QueueEmpty
+        item = self._items.pop(0)
+        self._changed("remove", index=0, count=1)
+        return item
+
+    async def get(self) -> Dict:
+        while not self._items:
+            getter = asyncio.get_running_loop().create_future()
+            self._getters.append(getter)
+            try:
+                await getter
+            except BaseException:
+                getter.cancel()
+                try:
+                    self._getters.remove(getter)
+                except ValueError:
+                    pass
+                # Pass the wakeup on if we were cancelled after being chosen
+                if self._items and not getter.cancelled():
+                    self._wake_getter()
+                raise
+        return self.get_nowait()
+
+    # --- Indexed operations ---
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self.snapshot())
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+    def peek(self, count: int = 1) -> List[Dict]:
+        return self._items[:count]
+
+    def extend(self, items: Iterable[Dict]):
+        items = list(items)
+        if not items:
+            return
+        start = len(self._items)
+        self._items.extend(items)
+        self._changed("add", index=start, items=items)
+        for _ in items:
+            self._wake_getter()
+
+    def insert(self, index: int, item: Dict):
+        index = max(0, min(index, len(self._items)))
+        self._items.insert(index, item)
+        self._changed("add", index=index, items=[item])
+        self._wake_getter()
+
+    def remove(self, index: int) -> Dict:
+        """Remove and return the item at `index` (raises IndexError)."""
+        if index < 0:
+            index += len(self._items)
+        item = self._items.pop(index)
+        self._changed("remove", index=index, count=1)
+        return item
+
+    def move(self, source: int, destination: int):
+        """Move the item at `source` so it ends up at `destination`."""
+        item = self._items.pop(source)
+        destination = max(0, min(destination, len(self._items)))
+        self._items.insert(destination, item)
+        self._changed("move", source=source, destination=destination)
+
+    def jump_to(self, index: int) -> List[Dict]:
+        """Drop everything before `index` so it plays next; returns the skipped items (raises IndexError)."""
+        if not 0 <= index < len(self._items):
+            raise IndexError(f"queue position {index} out of range")
+        skipped = self._items[:index]
+        if skipped:
+            del self._items[:index]
+            self._changed("remove", index=0, count=len(skipped))
+        return skipped
+
+    def shuffle(self):
+        random.shuffle(self._items)
+        self._changed("reset", items=list(self._items))
+
+    def replace(self, items: Iterable[Dict]):
+        self._items = list(items)
+        self._changed("reset", items=list(self._items))
+        for _ in self._items:
+            self._wake_getter()
+
+    def clear(self):
+        if self._items:
+            self._items.clear()
+            self._changed("reset", items=[])
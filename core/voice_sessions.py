@@ -0,0 +1,160 @@
+# core/voice_sessions.py
+# Voice connection manager shared by every music instance
+
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Dict, Optional
+
+import discord
+
+
+class VoiceSessionManager:
+    """
+    Owns the guild -> voice client mapping for the music cog.
+
+    Lookups are a dict hit instead of scans of ``bot.voice_clients``.
+    Concurrent connects to the same channel share one attempt, failed
+    attempts back off exponentially with jitter, and a connection that
+    outlived its music instance (or a cog reload) is adopted instead of
+    being torn down and rebuilt. It also tracks time-to-first-audio: from
+    a play request to the first ``voice_client.play`` of that instance.
+    """
+
+    def __init__(self, connect_timeout: float = 15.0, max_attempts: int = 4,
+                 base_delay: float = 0.5, max_delay: float = 8.0):
+        self.connect_timeout = connect_timeout
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sessions: Dict[int, discord.VoiceClient] = {}
+        self.connecting: Dict[int, asyncio.Task] = {}
+        self.first_audio_pending: Dict[int, float] = {}
+        self.first_audio_times: deque = deque(maxlen=200)
+        self.stats = {"connects": 0, "reused": 0, "moved": 0, "coalesced": 0, "retries": 0, "reconnects": 0, "failures": 0}
+
+    def get(self, guild: discord.Guild) -> Optional[discord.VoiceClient]:
+        """The live voice client for `guild`, adopting one discord.py already holds."""
+        voice_client = self.sessions.get(guild.id)
+        if voice_client is None or not voice_client.is_connected():
+            voice_client = guild.voice_client if guild.voice_client and guild.voice_client.is_connected() else None
+            if voice_client is None:
+                self.sessions.pop(guild.id, None)
+                return None
+            self.sessions[guild.id] = voice_client
+        return voice_client
+
+    async def connect(self, channel: discord.VoiceChannel) -> discord.VoiceClient:
+        """Connect to `channel`, reusing or moving the guild's session when there is one."""
+        existing = self.get(channel.guild)
+        if existing is not None:
+            if existing.channel.id == channel.id:
+                self.stats["reused"] += 1
+                return existing
+            # One voice connection per guild; moving is much cheaper than a new handshake
+            await existing.move_to(channel)
+            self.stats["moved"] += 1
+            return existing
+
+        task = self.connecting.get(channel.id)
+        if task is not None:
+            self.stats["coalesced"] += 1
+        else:
+            task = asyncio.create_task(self._connect_with_backoff(channel))
+            self.connecting[channel.id] = task
+            task.add_done_callback(lambda _: self.connecting.pop(channel.id, None))
+        return await asyncio.shield(task)
+
+    async def reconnect(self, channel: discord.VoiceChannel) -> Optional[discord.VoiceClient]:
+        """Drop a dead session and connect again; returns None if every attempt failed."""
+        self.stats["reconnects"] += 1
+        stale = self.sessions.pop(channel.guild.id, None) or channel.guild.voice_client
+        if stale is not None and not stale.is_connected():
+            try:
+                await stale.disconnect(force=True)
+            except Exception:
+                pass
+        try:
+            return await self.connect(channel)
+        except Exception as e:
+            logging.error(f"🔊 Voice reconnect to {channel.name} failed: {e}")
+            return None
+
+    async def _connect_with_backoff(self, channel: discord.VoiceChannel) -> discord.VoiceClient:
+        last_error: Optional[BaseException] = None
+        for attempt in range(self.max_attempts):
+            try:
+                voice_client = await asyncio.wait_for(
+                    channel.connect(self_deaf=True, timeout=self.connect_timeout), timeout=self.connect_timeout + 5
+                )
+                self.sessions[channel.guild.id] = voice_client
+                self.stats["connects"] += 1
+                return voice_client
+            except discord.ClientException as e:
+                # "Already connected" - a session exists that we didn't know about
+                adopted = self.get(channel.guild)
+                if adopted is not None:
+                    return await self.connect(channel)
+                last_error = e
+            except Exception as e:
+                last_error = e
+
+            # A half-open handshake blocks the next attempt until it's cleared
+            leftover = channel.guild.voice_client
+            if leftover is not None and not leftover.is_connected():
+                try:
+                    await leftover.disconnect(force=True)
+                except Exception:
+                    pass
+
+            if attempt < self.max_attempts - 1:
+                self.stats["retries"] += 1
+                delay = min(self.max_delay, self.base_delay * 2 ** attempt)
+                delay = random.uniform(delay / 2, delay)  # Equal jitter so guilds don't retry in lockstep
+                logging.warning(f"🔊 Voice connect to {channel.name} failed (attempt {attempt + 1}): {last_error}; retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+        self.stats["failures"] += 1
+        raise last_error or asyncio.TimeoutError()
+
+    async def disconnect(self, guild: discord.Guild):
+        voice_client = self.sessions.pop(guild.id, None) or guild.voice_client
+        if voice_client is not None:
+            try:
+                await voice_client.disconnect(force=True)
+            except Exception:
+                pass
+
+    def forget(self, guild_id: int):
+        self.sessions.pop(guild_id, None)
+
+    # --- Time to first audio ---
+
+    def expect_first_audio(self, instance_id: int, requested_at: Optional[float] = None):
+        """Start the time-to-first-audio clock for an instance that isn't playing yet."""
+        self.first_audio_pending.setdefault(instance_id, requested_at or time.monotonic())
+
+    def record_first_audio(self, instance_id: int) -> Optional[float]:
+        requested_at = self.first_audio_pending.pop(instance_id, None)
+        if requested_at is None:
+            return None
+        elapsed = time.monotonic() - requested_at
+        self.first_audio_times.append(elapsed)
+        return elapsed
+
+    def get_stats(self) -> Dict:
+        times = sorted(self.first_audio_times)
+        return {
+            **self.stats,
+            "sessions": len(self.sessions),
+            "connecting": len(self.connecting),
+            "ttfa_avg": (sum(times) / len(times)) if times else 0.0,
+            "ttfa_p95": times[min(len(times) - 1, int(len(times) * 0.95))] if times else 0.0,
+            "ttfa_last": self.first_audio_times[-1] if self.first_audio_times else 0.0,
+        }
+
+
+# Global voice session manager
+voice_sessions = VoiceSessionManager()
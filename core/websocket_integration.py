@@ -7,6 +7,8 @@ import websockets
 from typing import Dict, Any, Optional
 import datetime
 
+from core.activity_gateway import dashboard_channel
+
 class DashboardWebSocketClient:
     """WebSocket client for bot to communicate with dashboard"""
     
@@ -20,6 +22,11 @@ class DashboardWebSocketClient:
         
     async def connect(self):
         """Connect to WebSocket server"""
+        if getattr(self.bot, 'gateway', None):
+            # Dashboard clients are served in-process by the gateway; no socket needed
+            self.connected = True
+            await self.send_bot_update()
+            return
         try:
             self.websocket = await websockets.connect(
                 self.uri,
@@ -46,7 +53,8 @@ class DashboardWebSocketClient:
     
     async def send_update(self, update_type: str, data: Dict[str, Any]):
         """Send update to dashboard"""
-        if not self.connected or not self.websocket:
+        gateway = getattr(self.bot, 'gateway', None)
+        if not self.connected or not (self.websocket or gateway):
             return
         
         try:
@@ -56,6 +64,9 @@ class DashboardWebSocketClient:
                 "timestamp": int(datetime.datetime.now().timestamp() * 1000)
             }
             
+            if gateway:
+                gateway.publish(dashboard_channel('dashboard_all'), message)
+                return
             await self.websocket.send(json.dumps(message))
             
         except Exception as e:
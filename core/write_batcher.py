@@ -0,0 +1,271 @@
+# core/write_batcher.py
+# Write-behind group commit for command usage rows and user_stats counters
+
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from core.query_registry import query_registry
+
+# user_stats columns the batcher may increment; column names go into SQL, so nothing else is accepted
+COUNTER_COLUMNS = frozenset({"songs_queued", "commands_used"})
+
+INSERT_COMMAND_USAGE = query_registry.register("command_usage.insert", """
+    INSERT OR IGNORE INTO command_usage (command_name, user_id, guild_id, timestamp)
+    VALUES (?, ?, ?, ?)
+""")
+ENSURE_USER_STATS = query_registry.register("user_stats.ensure_row", "INSERT OR IGNORE INTO user_stats (user_id) VALUES (?)")
+class WriterBusy(Exception):
+    """The shared writer has another caller's uncommitted statements; the batch waits for them."""
+
+
+INCREMENT_COUNTER = {
+    column: query_registry.register(f"user_stats.increment_{column}",
+                                    f"UPDATE user_stats SET {column} = {column} + ? WHERE user_id = ?")
+    for column in COUNTER_COLUMNS
+}
+
+
+class WriteBatcher:
+    """
+    Buffers the writes every interaction makes and commits them together.
+
+    ``record_command`` appends a command_usage row and ``increment`` adds to a
+    user_stats counter; neither touches SQLite, so command latency no longer
+    includes a commit. Increments are merged per user and column, so a burst
+    of N commands from one user becomes a single UPDATE. Everything pending
+    is written in one transaction `flush_interval` seconds after the first
+    buffered event, or as soon as `max_events` are waiting, and on ``stop()``.
+
+    A failed flush puts its writes back to be retried with the next batch;
+    past `max_buffered` events the oldest usage rows are dropped instead of
+    growing without bound while the database is unavailable.
+
+    The batch only runs when the writer has no open transaction. Callers of
+    the ``execute()``-now, ``commit()``-later shim share that connection,
+    and committing or rolling back the batch would take their pending
+    statements along; the flush is deferred until they commit instead.
+    """
+
+    def __init__(self, db, flush_interval: float = 0.25, max_events: int = 500, max_buffered: int = 50000):
+        self.db = db
+        self.flush_interval = flush_interval
+        self.max_events = max_events
+        self.max_buffered = max_buffered
+        self.usage_rows: List[Tuple] = []
+        self.counters: Dict[int, Dict[Optional[str], int]] = defaultdict(lambda: defaultdict(int))
+        self.pending_events = 0
+        self._has_pending = asyncio.Event()
+        self._full = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"events": 0, "flushes": 0, "usage_rows": 0, "counter_updates": 0,
+                      "failed_flushes": 0, "deferred_flushes": 0, "dropped_rows": 0, "last_flush_ms": 0.0}
+
+    # --- Buffering ---
+
+    def _added(self):
+        self.pending_events += 1
+        self.stats["events"] += 1
+        self._has_pending.set()
+        if self.pending_events >= self.max_events:
+            self._full.set()
+
+    def record_command(self, command_name: str, user_id: int, guild_id: int, timestamp: str):
+        """Queue a command_usage row."""
+        self.usage_rows.append((command_name, user_id, guild_id, timestamp))
+        self._added()
+
+    def increment(self, user_id: int, column: Optional[str] = None, amount: int = 1):
+        """
+        Add `amount` to a user_stats counter. With no column the user's row is
+        only created, which is all some activity types ever did.
+        """
+        if column is not None and column not in COUNTER_COLUMNS:
+            raise ValueError(f"Not a batched user_stats counter: {column}")
+        self.counters[user_id][column] += amount if column else 0
+        self._added()
+
+    # --- Flushing ---
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await self._has_pending.wait()
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                if not await self.flush() and self.pending_events:
+                    await asyncio.sleep(self.flush_interval)  # Deferred; the writer is mid-transaction
+            except Exception as e:
+                logging.error(f"💾 Write batch failed, retrying with the next one: {e}")
+                # Don't spin on a database that keeps failing
+                await asyncio.sleep(self.flush_interval)
+
+    async def flush(self) -> int:
+        """Write everything buffered in one transaction; returns the number of events written."""
+        async with self._flush_lock:
+            usage_rows, counters, events = self.usage_rows, self.counters, self.pending_events
+            self.usage_rows = []
+            self.counters = defaultdict(lambda: defaultdict(int))
+            self.pending_events = 0
+            self._has_pending.clear()
+            self._full.clear()
+            if not events:
+                return 0
+
+            started = time.perf_counter()
+            try:
+                await self._write(usage_rows, counters)
+            except WriterBusy:
+                self.stats["deferred_flushes"] += 1
+                self._requeue(usage_rows, counters, events)
+                return 0
+            except BaseException:
+                # Includes cancellation mid-write, so stop() still gets these into the final flush
+                self.stats["failed_flushes"] += 1
+                self._requeue(usage_rows, counters, events)
+                raise
+
+            self.stats["flushes"] += 1
+            self.stats["usage_rows"] += len(usage_rows)
+            self.stats["last_flush_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            return events
+
+    async def _write(self, usage_rows: List[Tuple], counters: Dict[int, Dict[Optional[str], int]]):
+        by_column: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        for user_id, columns in counters.items():
+            for column, amount in columns.items():
+                if column and amount:
+                    by_column[column].append((amount, user_id))
+
+        async with self.db.pool.write_access() as conn:
+            # Checked under the write lock, so nobody can open one between this and BEGIN
+            if conn.in_transaction:
+                raise WriterBusy()
+            await conn.execute("BEGIN")
+            try:
+                if usage_rows:
+                    await self._executemany(conn, INSERT_COMMAND_USAGE, usage_rows)
+                if counters:
+                    await self._executemany(conn, ENSURE_USER_STATS, [(user_id,) for user_id in counters])
+                for column, params in by_column.items():
+                    await self._executemany(conn, INCREMENT_COUNTER[column], params)
+            except BaseException:
+                await conn.rollback()
+                raise
+            await conn.commit()
+        self.stats["counter_updates"] += sum(len(params) for params in by_column.values())
+
+        # Writes on the raw connection bypass the pool's invalidation
+        if usage_rows:
+            self.db.invalidate("command_usage")
+        for user_id in counters:
+            self.db.invalidate("user_stats", user_id)
+
+    async def _executemany(self, conn, query: str, params_list: List[Tuple]):
+        async with self.db.pool.measure(query) as sample:
+            cursor = await conn.executemany(query, params_list)
+            sample.rows = max(cursor.rowcount, 0)
+
+    def _requeue(self, usage_rows: List[Tuple], counters: Dict[int, Dict[Optional[str], int]], events: int):
+        self.usage_rows[:0] = usage_rows
+        for user_id, columns in counters.items():
+            for column, amount in columns.items():
+                self.counters[user_id][column] += amount
+        self.pending_events += events
+        overflow = len(self.usage_rows) - self.max_buffered
+        if overflow > 0:
+            del self.usage_rows[:overflow]
+            self.pending_events -= overflow
+            self.stats["dropped_rows"] += overflow
+        self._has_pending.set()
+
+    async def stop(self):
+        """Stop the flush loop and write whatever is still buffered."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            # A deferred flush gets a few more chances for the writer's open transaction to commit
+            for _ in range(20):
+                await self.flush()
+                if not self.pending_events:
+                    break
+                await asyncio.sleep(self.flush_interval)
+        except Exception as e:
+            logging.error(f"💾 Final write batch failed, {self.pending_events} events lost: {e}")
+        else:
+            if self.pending_events:
+                logging.error(f"💾 Writer stayed mid-transaction, {self.pending_events} buffered events lost")
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, "pending": self.pending_events}
+
+
+
+if __name__ == "__main__":
+    # Benchmark: python -m core.write_batcher [commands] [users]
+    #   per-command commits (the old on_interaction path) vs batched, against a temp database
+    import os
+    import sys
+    import tempfile
+
+    from core.database_manager import OpureDatabase
+
+    commands = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    users = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    async def open_db(path: str) -> OpureDatabase:
+        db = OpureDatabase(path)
+        await db.connect()
+        await db.execute("CREATE TABLE IF NOT EXISTS command_usage (command_name TEXT, user_id INTEGER, guild_id INTEGER, timestamp DATETIME, PRIMARY KEY (command_name, user_id, timestamp))")
+        await db.execute("CREATE TABLE IF NOT EXISTS user_stats (user_id INTEGER PRIMARY KEY, commands_used INTEGER DEFAULT 0, songs_queued INTEGER DEFAULT 0)")
+        await db.commit()
+        return db
+
+    async def direct(db: OpureDatabase, i: int):
+        await db.execute("INSERT INTO command_usage (command_name, user_id, guild_id, timestamp) VALUES (?, ?, ?, ?)",
+                         ("play", i % users, 0, f"{time.time()}-{i}"))
+        await db.commit()
+        await db.execute("INSERT OR IGNORE INTO user_stats (user_id) VALUES (?)", (i % users,))
+        await db.execute("UPDATE user_stats SET commands_used = commands_used + 1 WHERE user_id = ?", (i % users,))
+        await db.commit()
+
+    async def main():
+        with tempfile.TemporaryDirectory() as tmp:
+            db = await open_db(os.path.join(tmp, "direct.db"))
+            started = time.perf_counter()
+            await asyncio.gather(*(direct(db, i) for i in range(commands)))
+            direct_rate = commands / (time.perf_counter() - started)
+            await db.close()
+
+            db = await open_db(os.path.join(tmp, "batched.db"))
+            batcher = WriteBatcher(db)
+            batcher.start()
+            started = time.perf_counter()
+            for i in range(commands):
+                batcher.record_command("play", i % users, 0, f"{time.time()}-{i}")
+                batcher.increment(i % users, "commands_used")
+                await asyncio.sleep(0)
+            await batcher.stop()
+            batched_rate = commands / (time.perf_counter() - started)
+            total = await db.fetch_value("SELECT SUM(commands_used) FROM user_stats")
+            await db.close()
+
+        print(f"per-command commits: {direct_rate:>10.0f} commands/s")
+        print(f"batched:             {batched_rate:>10.0f} commands/s ({batched_rate / direct_rate:.1f}x), "
+              f"{batcher.stats['flushes']} flushes, commands_used total {total}")
+
+    asyncio.run(main())
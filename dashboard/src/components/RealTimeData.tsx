@@ -428,7 +428,7 @@ export default function RealTimeData({ realTimeData, isConnected }: any) {
                 WebSocket Health
               </h4>
               <p className="text-xs text-gray-400">
-                Port 8001 • Bot Connection Status
+                Port 8000 • Bot Connection Status
               </p>
             </div>
           </div>
@@ -29,7 +29,7 @@ interface WebSocketState {
 
 export function useWebSocket(options: UseWebSocketOptions = {}) {
   const {
-    url = 'ws://localhost:8001',
+    url = 'ws://localhost:8000/dashboard',
     reconnectAttempts = 5,
     reconnectDelay = 5000,
     onConnect,
@@ -242,35 +242,11 @@ class GPUAIEngine:
             return {"tempo": 120, "energy": 0.5, "mood": "neutral"}
     
     def _analyze_audio_gpu(self, audio_path: str) -> Dict[str, Any]:
-        """GPU-accelerated audio feature extraction"""
+        """Audio feature extraction; shares the FFmpeg + NumPy analysis the music cog's pipeline uses"""
         try:
-            # Load audio
-            y, sr = librosa.load(audio_path, duration=30)  # Analyze first 30 seconds
-            
-            # Extract features (some can be GPU-accelerated)
-            features = {
-                "tempo": float(librosa.tempo(y=y, sr=sr)[0]),
-                "spectral_centroid": float(np.mean(librosa.feature.spectral_centroid(y=y, sr=sr))),
-                "spectral_rolloff": float(np.mean(librosa.feature.spectral_rolloff(y=y, sr=sr))),
-                "zero_crossing_rate": float(np.mean(librosa.feature.zero_crossing_rate(y))),
-                "mfcc": librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13).mean(axis=1).tolist(),
-                "chroma": librosa.feature.chroma_stft(y=y, sr=sr).mean(axis=1).tolist(),
-                "energy": float(np.sum(y**2)),
-                "duration": len(y) / sr
-            }
-            
-            # Classify mood based on features
-            if features["energy"] > 0.01 and features["tempo"] > 120:
-                mood = "energetic"
-            elif features["tempo"] < 80:
-                mood = "calm"
-            elif features["spectral_centroid"] > 2000:
-                mood = "bright"
-            else:
-                mood = "neutral"
-            
-            features["mood"] = mood
-            return features
+            # A 20s FFmpeg-decoded window instead of a full librosa.load of the first 30s
+            from core.audio_features import analyze_stream
+            return analyze_stream(audio_path, 0.0, 20.0)
             
         except Exception as e:
             print(f"[ERROR] Audio feature extraction error: {e}")
@@ -18,28 +18,30 @@ import psutil
 import GPUtil
 from websockets.server import WebSocketServerProtocol
 
-# Configure logging with Windows-compatible paths
 base_path = Path(__file__).parent.absolute()
-logs_dir = base_path / 'logs'
-logs_dir.mkdir(exist_ok=True)
-
-# Create stream handler with UTF-8 encoding for Windows
-stream_handler = logging.StreamHandler()
-if sys.platform.startswith('win'):
-    import codecs
-    sys.stdout = codecs.getwriter('utf-8')(sys.stdout.buffer, 'strict')
-    sys.stderr = codecs.getwriter('utf-8')(sys.stderr.buffer, 'strict')
-
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(logs_dir / 'websocket.log', encoding='utf-8'),
-        stream_handler
-    ]
-)
 logger = logging.getLogger(__name__)
 
+def configure_logging():
+    """Standalone-process logging with Windows-compatible paths (the bot configures its own)"""
+    logs_dir = base_path / 'logs'
+    logs_dir.mkdir(exist_ok=True)
+    
+    # Create stream handler with UTF-8 encoding for Windows
+    stream_handler = logging.StreamHandler()
+    if sys.platform.startswith('win'):
+        import codecs
+        sys.stdout = codecs.getwriter('utf-8')(sys.stdout.buffer, 'strict')
+        sys.stderr = codecs.getwriter('utf-8')(sys.stderr.buffer, 'strict')
+    
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(logs_dir / 'websocket.log', encoding='utf-8'),
+            stream_handler
+        ]
+    )
+
 class DashboardWebSocketServer:
     """Real-time WebSocket server for dashboard communication"""
     
@@ -50,6 +52,7 @@ class DashboardWebSocketServer:
         self.connected_clients: Set[WebSocketServerProtocol] = set()
         self.last_performance_update = 0
         self.performance_cache = {}
+        self.gateway = None  # Set by attach() when served from the bot's Activity gateway
         
         # Event-driven architecture with channels
         self.event_channels = {
@@ -148,6 +151,15 @@ class DashboardWebSocketServer:
         if not self.connected_clients:
             return
         
+        if self.gateway:
+            # Serialized once, queued per client by the gateway
+            self.gateway.publish(self._gateway_key('*'), {
+                "type": event_type,
+                "data": data,
+                "timestamp": int(time.time() * 1000)
+            })
+            return
+        
         message = json.dumps({
             "type": event_type,
             "data": data,
@@ -177,6 +189,15 @@ class DashboardWebSocketServer:
         if channel not in self.event_channels or not self.event_channels[channel]:
             return
         
+        if self.gateway:
+            self.gateway.publish(self._gateway_key(channel), {
+                "type": event_type,
+                "data": data,
+                "timestamp": int(time.time() * 1000),
+                "channel": channel
+            })
+            return
+        
         message = json.dumps({
             "type": event_type,
             "data": data,
@@ -206,29 +227,44 @@ class DashboardWebSocketServer:
             
         logger.debug(f"📡 Broadcasted {event_type} to {len(self.event_channels[channel])} clients in channel {channel}")
     
+    def _query_one(self, query: str):
+        with sqlite3.connect(self.db_path) as conn:
+            return conn.execute(query).fetchone()
+    
+    async def _fetch_one(self, query: str):
+        """Run a read on a worker thread, since attach() puts these on the bot's event loop"""
+        return await asyncio.get_running_loop().run_in_executor(None, self._query_one, query)
+    
+    @staticmethod
+    def _read_gpu():
+        """(load %, memory used MB) of the first GPU; nvidia-smi can take most of a second"""
+        gpus = GPUtil.getGPUs()
+        if not gpus:
+            return 0, 0
+        gpu = gpus[0]  # First GPU (RTX 5070 Ti)
+        return gpu.load * 100, gpu.memoryUsed
+    
     async def get_bot_status(self) -> Dict[str, Any]:
         """Get current bot status from database"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.execute("""
-                    SELECT COUNT(DISTINCT user_id) as users,
-                           SUM(commands_used) as total_commands
-                    FROM user_stats
-                """)
-                result = cursor.fetchone()
-                
-                users = result[0] if result and result[0] else 0
-                total_commands = result[1] if result and result[1] else 0
-                
-                return {
-                    "status": "online",
-                    "users": users,
-                    "guilds": 1,  # Single server bot
-                    "commands_executed": total_commands,
-                    "uptime": int(time.time()) - 1640995200,  # Since Jan 1, 2022
-                    "memory_usage": psutil.virtual_memory().used // (1024 * 1024),  # MB
-                    "cpu_usage": psutil.cpu_percent()
-                }
+            result = await self._fetch_one("""
+                SELECT COUNT(DISTINCT user_id) as users,
+                       SUM(commands_used) as total_commands
+                FROM user_stats
+            """)
+            
+            users = result[0] if result and result[0] else 0
+            total_commands = result[1] if result and result[1] else 0
+            
+            return {
+                "status": "online",
+                "users": users,
+                "guilds": 1,  # Single server bot
+                "commands_executed": total_commands,
+                "uptime": int(time.time()) - 1640995200,  # Since Jan 1, 2022
+                "memory_usage": psutil.virtual_memory().used // (1024 * 1024),  # MB
+                "cpu_usage": psutil.cpu_percent()
+            }
         except Exception as e:
             logger.error(f"❌ Failed to get bot status: {e}")
             return {
@@ -244,19 +280,15 @@ class DashboardWebSocketServer:
     async def get_performance_data(self) -> Dict[str, Any]:
         """Get system performance data (RTX 5070 Ti optimized)"""
         try:
-            # CPU and Memory
-            cpu_percent = psutil.cpu_percent(interval=1)
+            # CPU and Memory (usage since the previous call, rather than sleeping a second to sample it)
+            cpu_percent = psutil.cpu_percent(interval=None)
             memory = psutil.virtual_memory()
             
             # GPU data (RTX 5070 Ti)
             gpu_usage = 0
             gpu_memory = 0
             try:
-                gpus = GPUtil.getGPUs()
-                if gpus:
-                    gpu = gpus[0]  # First GPU (RTX 5070 Ti)
-                    gpu_usage = gpu.load * 100
-                    gpu_memory = gpu.memoryUsed
+                gpu_usage, gpu_memory = await asyncio.get_running_loop().run_in_executor(None, self._read_gpu)
             except Exception:
                 pass  # GPU monitoring not critical
             
@@ -312,24 +344,22 @@ class DashboardWebSocketServer:
     async def get_ai_data(self) -> Dict[str, Any]:
         """Get AI system statistics"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                # Count AI requests (mock calculation)
-                cursor = conn.execute("""
-                    SELECT COUNT(*) as ai_requests 
-                    FROM user_stats 
-                    WHERE commands_used > 0
-                """)
-                result = cursor.fetchone()
-                ai_requests = result[0] if result else 0
-                
-                return {
-                    "model": "gpt-oss:20b",
-                    "requests_today": ai_requests,
-                    "average_response_time": 1200 + (psutil.cpu_percent() * 50),
-                    "memory_entries": ai_requests * 2,  # Estimate
-                    "personality_mode": "Scottish",
-                    "success_rate": 98.5
-                }
+            # Count AI requests (mock calculation)
+            result = await self._fetch_one("""
+                SELECT COUNT(*) as ai_requests 
+                FROM user_stats 
+                WHERE commands_used > 0
+            """)
+            ai_requests = result[0] if result else 0
+            
+            return {
+                "model": "gpt-oss:20b",
+                "requests_today": ai_requests,
+                "average_response_time": 1200 + (psutil.cpu_percent() * 50),
+                "memory_entries": ai_requests * 2,  # Estimate
+                "personality_mode": "Scottish",
+                "success_rate": 98.5
+            }
         except Exception as e:
             logger.error(f"❌ Failed to get AI data: {e}")
             return {"requests_today": 0, "success_rate": 0}
@@ -337,25 +367,23 @@ class DashboardWebSocketServer:
     async def get_gaming_data(self) -> Dict[str, Any]:
         """Get gaming hub statistics"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.execute("""
-                    SELECT SUM(games_completed) as total_games,
-                           COUNT(*) as players
-                    FROM user_stats
-                    WHERE games_completed > 0
-                """)
-                result = cursor.fetchone()
-                
-                total_games = result[0] if result and result[0] else 0
-                active_players = result[1] if result and result[1] else 0
-                
-                return {
-                    "activity_status": "online",
-                    "active_players": min(active_players, 25),  # Cap for realism
-                    "total_games_played": total_games,
-                    "daily_games": total_games // 30,  # Rough estimate
-                    "server_url": "https://opure.uk"
-                }
+            result = await self._fetch_one("""
+                SELECT SUM(games_completed) as total_games,
+                       COUNT(*) as players
+                FROM user_stats
+                WHERE games_completed > 0
+            """)
+            
+            total_games = result[0] if result and result[0] else 0
+            active_players = result[1] if result and result[1] else 0
+            
+            return {
+                "activity_status": "online",
+                "active_players": min(active_players, 25),  # Cap for realism
+                "total_games_played": total_games,
+                "daily_games": total_games // 30,  # Rough estimate
+                "server_url": "https://opure.uk"
+            }
         except Exception as e:
             logger.error(f"❌ Failed to get gaming data: {e}")
             return {"activity_status": "offline", "active_players": 0}
@@ -363,27 +391,25 @@ class DashboardWebSocketServer:
     async def get_economy_data(self) -> Dict[str, Any]:
         """Get economy system statistics"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.execute("""
-                    SELECT SUM(fragments) as total_fragments,
-                           COUNT(*) as active_users,
-                           AVG(fragments) as avg_balance
-                    FROM players
-                    WHERE fragments > 0
-                """)
-                result = cursor.fetchone()
-                
-                total_fragments = result[0] if result and result[0] else 0
-                active_users = result[1] if result and result[1] else 0
-                avg_balance = result[2] if result and result[2] else 0
-                
-                return {
-                    "total_fragments": total_fragments,
-                    "daily_transactions": active_users // 5,  # Estimate
-                    "active_traders": active_users,
-                    "shop_items": 50,  # Static for now
-                    "average_balance": round(avg_balance, 2)
-                }
+            result = await self._fetch_one("""
+                SELECT SUM(fragments) as total_fragments,
+                       COUNT(*) as active_users,
+                       AVG(fragments) as avg_balance
+                FROM players
+                WHERE fragments > 0
+            """)
+            
+            total_fragments = result[0] if result and result[0] else 0
+            active_users = result[1] if result and result[1] else 0
+            avg_balance = result[2] if result and result[2] else 0
+            
+            return {
+                "total_fragments": total_fragments,
+                "daily_transactions": active_users // 5,  # Estimate
+                "active_traders": active_users,
+                "shop_items": 50,  # Static for now
+                "average_balance": round(avg_balance, 2)
+            }
         except Exception as e:
             logger.error(f"❌ Failed to get economy data: {e}")
             return {"total_fragments": 0, "active_traders": 0}
@@ -491,6 +517,38 @@ class DashboardWebSocketServer:
         finally:
             await self.unregister_client(websocket)
     
+    @staticmethod
+    def _gateway_key(channel: str) -> tuple:
+        from core.activity_gateway import dashboard_channel
+        return dashboard_channel(channel)
+    
+    def attach(self, gateway, path: str = "/dashboard"):
+        """
+        Serve dashboard clients from the bot's Activity gateway instead of a
+        separate server on port 8001. Channel subscriptions become gateway
+        subscription sets, so broadcasts share its per-client send queues.
+        """
+        self.gateway = gateway
+        members = gateway.broadcaster.members
+        self.connected_clients = members.setdefault(self._gateway_key('*'), set())
+        for channel in self.event_channels:
+            self.event_channels[channel] = members.setdefault(self._gateway_key(channel), set())
+        gateway.add_endpoint(path, self.handle_gateway_client)
+        asyncio.create_task(self.performance_monitor())
+        logger.info(f"📊 Dashboard feed attached to gateway at {path}")
+    
+    async def handle_gateway_client(self, websocket, request):
+        """Gateway counterpart of handle_client (the gateway detaches the socket afterwards)"""
+        from core.activity_gateway import read_text_messages
+        try:
+            await self.register_client(websocket)
+            async for message in read_text_messages(websocket):
+                await self.handle_client_message(websocket, message)
+        except Exception as e:
+            logger.error(f"❌ Client handler error: {e}")
+        finally:
+            await self.unregister_client(websocket)
+    
     async def start_server(self):
         """Start the WebSocket server"""
         logger.info(f"🚀 Starting WebSocket server on {self.host}:{self.port}")
@@ -540,5 +598,6 @@ if __name__ == "__main__":
         print("🔧 Install with: pip install websockets gputil psutil")
         exit(1)
     
+    configure_logging()
     # Run the server
     asyncio.run(main())
\ No newline at end of file